@@ -2,7 +2,7 @@ from django import forms
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 
-from ..models import Producto, Categoria, UnidadMedida, Proveedor
+from ..models import Bodega, Producto, Categoria, UnidadMedida, Proveedor
 
 
 class ProductoPaso1Form(forms.ModelForm):
@@ -230,12 +230,39 @@ class ProductoPaso1Form(forms.ModelForm):
 
 
 class ProductoPaso2Form(forms.ModelForm):
-    """Formulario Paso 2: Stock y Control"""
+    """
+    Formulario Paso 2: Stock y Control.
+    El stock no se edita aquí: con `con_stock_inicial=True` el formulario pide
+    una cantidad y una bodega, y la vista la registra como ingreso.
+    """
+
+    def __init__(self, *args, con_stock_inicial=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        if con_stock_inicial:
+            self.fields['stock_inicial'] = forms.IntegerField(
+                required=False,
+                min_value=0,
+                initial=0,
+                label='Stock inicial',
+                widget=forms.NumberInput(attrs={
+                    'class': 'form-control',
+                    'placeholder': '0',
+                    'min': '0',
+                    'step': '1',
+                }),
+                help_text='Se registra como ingreso en la bodega elegida'
+            )
+            self.fields['bodega_inicial'] = forms.ModelChoiceField(
+                queryset=Bodega.objects.filter(activo=True),
+                required=False,
+                label='Bodega',
+                widget=forms.Select(attrs={'class': 'form-control'}),
+                help_text='Bodega que recibe el stock inicial'
+            )
     
     class Meta:
         model = Producto
         fields = [
-            'stock_actual',      # <-- Agrega este campo
             'stock_minimo',
             'stock_maximo',
             'punto_reorden',
@@ -244,7 +271,6 @@ class ProductoPaso2Form(forms.ModelForm):
             'requiere_serie',
         ]
         labels = {
-            'stock_actual': 'Stock actual',   # <-- Etiqueta
             'stock_minimo': 'Stock mínimo',
             'stock_maximo': 'Stock máximo',
             'punto_reorden': 'Punto de reorden',
@@ -253,13 +279,6 @@ class ProductoPaso2Form(forms.ModelForm):
             'requiere_serie': '¿Requiere control por serie?',
         }
         widgets = {
-            'stock_actual': forms.NumberInput(attrs={
-                'class': 'form-control',
-                'placeholder': '0',
-                'min': '0',
-                'step': '1',  # <-- Solo enteros
-                'value': '0',
-            }),
             'stock_minimo': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'placeholder': '0',
@@ -288,7 +307,6 @@ class ProductoPaso2Form(forms.ModelForm):
         }
         
         help_texts = {
-            'stock_actual': 'Cantidad inicial en inventario',
             'stock_minimo': 'Cantidad mínima requerida en inventario',
             'stock_maximo': 'Cantidad máxima permitida (opcional)',
             'punto_reorden': 'Cuando llegar a este stock, reabastecer (opcional)',
@@ -351,6 +369,9 @@ class ProductoPaso2Form(forms.ModelForm):
                     'El punto de reorden no puede ser mayor al stock máximo'
                 )
         
+        if cleaned_data.get('stock_inicial') and not cleaned_data.get('bodega_inicial'):
+            self.add_error('bodega_inicial', 'Indica la bodega que recibe el stock inicial')
+        
         return cleaned_data
 
 
@@ -0,0 +1,50 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.vencimientos import DIAS_ALERTA_VENCIMIENTO, actualizar_alertas_vencimiento, reporte_por_vencer
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula la alerta "por vencer" de los productos según sus lotes e ingresos con '
+        'fecha de vencimiento y muestra el reporte de próximos a vencer. Pensado para '
+        'ejecutarse una vez al día.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=DIAS_ALERTA_VENCIMIENTO,
+            help=f'Ventana de aviso en días (por defecto {DIAS_ALERTA_VENCIMIENTO})'
+        )
+        parser.add_argument('--reporte', action='store_true', help='Imprimir el reporte de próximos a vencer')
+        parser.add_argument('--csv', help='Guardar el reporte en este archivo CSV')
+
+    def handle(self, *args, **options):
+        dias = options['dias']
+        if dias < 0:
+            raise CommandError('--dias debe ser mayor o igual a 0')
+
+        activadas, desactivadas = actualizar_alertas_vencimiento(dias)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Alertas por vencer ({dias} días): {activadas} activada(s), {desactivadas} desactivada(s)'
+        ))
+
+        if not (options['reporte'] or options['csv']):
+            return
+        filas = reporte_por_vencer(dias)
+        if options['reporte']:
+            for f in filas:
+                estado = 'VENCIDO' if f['dias_restantes'] < 0 else f'{f["dias_restantes"]} día(s)'
+                self.stdout.write(
+                    f'{f["fecha_vencimiento"]}  {estado:>10}  {f["sku"]:<15} {f["nombre"][:30]:<30} '
+                    f'{f["origen"]}: {f["referencia"]} {f["bodega"]}  cant. {f["cantidad"]}'
+                )
+            self.stdout.write(f'{len(filas)} lote(s)/ingreso(s) por vencer')
+        if options['csv']:
+            columnas = ['sku', 'nombre', 'origen', 'referencia', 'bodega', 'fecha_vencimiento', 'dias_restantes', 'cantidad']
+            with open(options['csv'], 'w', newline='', encoding='utf-8') as archivo:
+                escritor = csv.DictWriter(archivo, fieldnames=columnas)
+                escritor.writeheader()
+                escritor.writerows(filas)
+            self.stdout.write(f'Reporte guardado en {options["csv"]}')
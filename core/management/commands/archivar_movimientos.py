@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import MovimientoInventario
+from core.services.archivo import ARCHIVO_LOTE, archivar_movimientos, corte_vigente, horizonte_archivo
+
+
+class Command(BaseCommand):
+    help = (
+        'Traslada al archivo los movimientos más antiguos que el horizonte, por lotes, '
+        'dejando saldos de apertura por producto y bodega.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=None,
+            help='Días que se mantienen en la tabla activa (por defecto settings.ARCHIVO_MOVIMIENTOS_DIAS)'
+        )
+        parser.add_argument('--lote', type=int, default=ARCHIVO_LOTE, help='Movimientos por transacción')
+        parser.add_argument('--simular', action='store_true', help='Solo informar cuántos movimientos se archivarían')
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else horizonte_archivo()
+        corte = timezone.now() - timedelta(days=dias)
+        anterior = corte_vigente()
+        self.stdout.write(f'Corte: {timezone.localtime(corte):%Y-%m-%d %H:%M} ({dias} días)')
+        if anterior:
+            self.stdout.write(f'Corte vigente: {timezone.localtime(anterior):%Y-%m-%d %H:%M}')
+
+        if options['simular']:
+            pendientes = MovimientoInventario.objects.filter(fecha__lt=corte).count()
+            self.stdout.write(f'Se archivarían {pendientes} movimientos')
+            return
+
+        def progreso(total):
+            self.stdout.write(f'{total} movimientos archivados...')
+
+        try:
+            total = archivar_movimientos(corte, options['lote'], progreso)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} movimientos archivados'))
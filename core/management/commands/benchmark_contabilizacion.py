@@ -0,0 +1,171 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import CharField, ProtectedError, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from core.models import (
+    AsignacionLote, Bodega, Categoria, ClaveIdempotencia, Lote, MovimientoInventario, Producto,
+    ResumenDiarioMovimientos, SnapshotStock, StockBodega, UnidadMedida, Usuario,
+)
+from core.services.inventario import registrar_movimiento
+
+SKU_BENCH = 'BENCH-HOT'
+BODEGA_BENCH = 'BENCH'
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+
+class Command(BaseCommand):
+    help = (
+        'Lanza N escritores concurrentes contra un mismo producto y reporta '
+        'throughput, latencia p50/p99 y actualizaciones perdidas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=8, help='Hilos escritores concurrentes')
+        parser.add_argument('--movimientos', type=int, default=200, help='Movimientos por escritor')
+        parser.add_argument(
+            '--modo', choices=['servicio', 'legacy'], default='servicio',
+            help='servicio: motor de contabilización con bloqueo; legacy: leer-modificar-guardar en Python'
+        )
+        parser.add_argument('--conservar', action='store_true', help='No borrar los datos del benchmark al terminar')
+        parser.add_argument(
+            '--confirmar', action='store_true',
+            help='Obligatorio: el benchmark escribe (y luego borra) datos en la base configurada'
+        )
+
+    def handle(self, *args, **options):
+        if not options['confirmar']:
+            raise CommandError(
+                'El benchmark crea el producto BENCH-HOT y contabiliza movimientos en la base de datos '
+                f'configurada ({connection.settings_dict["NAME"]}). Ejecútelo con --confirmar.'
+            )
+        escritores = options['escritores']
+        por_escritor = options['movimientos']
+        modo = options['modo']
+
+        producto, bodega, usuario = self._preparar()
+        stock_inicial = producto.stock_actual
+
+        latencias = []
+        errores = []
+        candado = threading.Lock()
+        barrera = threading.Barrier(escritores)
+
+        def escritor():
+            propias = []
+            fallos = 0
+            try:
+                barrera.wait()
+                for _ in range(por_escritor):
+                    t0 = time.perf_counter()
+                    try:
+                        if modo == 'servicio':
+                            registrar_movimiento(
+                                tipo_movimiento='ingreso', producto=producto, bodega=bodega,
+                                cantidad=1, usuario=usuario, motivo='benchmark',
+                            )
+                        else:
+                            self._contabilizar_legacy(producto.pk, bodega, usuario)
+                    except Exception:
+                        fallos += 1
+                        continue
+                    propias.append(time.perf_counter() - t0)
+            finally:
+                connection.close()
+                with candado:
+                    latencias.extend(propias)
+                    errores.append(fallos)
+
+        hilos = [threading.Thread(target=escritor) for _ in range(escritores)]
+        inicio = time.perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        duracion = time.perf_counter() - inicio
+
+        producto.refresh_from_db()
+        exitosos = len(latencias)
+        incremento = producto.stock_actual - stock_inicial
+        perdidas = exitosos - incremento
+        saldo_bodega = StockBodega.objects.filter(producto=producto).aggregate(t=Sum('cantidad'))['t'] or 0
+
+        self.stdout.write(f'Modo: {modo} | escritores: {escritores} | movimientos por escritor: {por_escritor}')
+        self.stdout.write(f'Movimientos confirmados: {exitosos} (errores: {sum(errores)})')
+        self.stdout.write(f'Duración: {duracion:.2f}s | throughput: {exitosos / duracion if duracion else 0:.1f} mov/s')
+        self.stdout.write(
+            f'Latencia p50: {_percentil(latencias, 50) * 1000:.1f} ms | '
+            f'p99: {_percentil(latencias, 99) * 1000:.1f} ms'
+        )
+        self.stdout.write(f'Stock producto: {producto.stock_actual} | suma saldos bodega: {saldo_bodega}')
+        estilo = self.style.SUCCESS if perdidas == 0 else self.style.ERROR
+        self.stdout.write(estilo(f'Actualizaciones perdidas: {perdidas}'))
+
+        if not options['conservar']:
+            self._limpiar(producto, bodega)
+
+    def _preparar(self):
+        usuario = Usuario.objects.filter(rol='ADMIN').first() or Usuario.objects.first()
+        if not usuario:
+            raise CommandError('Se necesita al menos un usuario (perfil) para registrar movimientos.')
+        categoria = Categoria.objects.first() or Categoria.objects.create(nombre='Benchmark')
+        unidad = UnidadMedida.objects.first() or UnidadMedida.objects.create(codigo='UN', nombre='Unidad')
+        producto, _ = Producto.objects.get_or_create(
+            sku=SKU_BENCH,
+            defaults={
+                'nombre': 'Producto benchmark contabilización',
+                'categoria': categoria,
+                'uom_compra': unidad,
+                'uom_venta': unidad,
+                'activo': False,
+            },
+        )
+        bodega, _ = Bodega.objects.get_or_create(
+            codigo=BODEGA_BENCH, defaults={'nombre': 'Bodega benchmark', 'activo': False}
+        )
+        return producto, bodega, usuario
+
+    @staticmethod
+    def _contabilizar_legacy(producto_id, bodega, usuario):
+        """Reproduce el flujo anterior: leer, sumar en Python y guardar"""
+        with transaction.atomic():
+            producto = Producto.objects.get(pk=producto_id)
+            MovimientoInventario.objects.create(
+                tipo_movimiento='ingreso', producto=producto, bodega=bodega,
+                cantidad=1, usuario=usuario, fecha=timezone.now(), motivo='benchmark',
+            )
+            producto.stock_actual += 1
+            producto.save()
+
+    def _limpiar(self, producto, bodega):
+        """Borra todo lo que la contabilización escribió para el producto del benchmark"""
+        with transaction.atomic():
+            movimientos = MovimientoInventario.objects.filter(producto=producto)
+            ClaveIdempotencia.objects.filter(
+                operacion='movimiento',
+                referencia__in=movimientos.annotate(ref=Cast('pk', CharField())).values('ref'),
+            ).delete()
+            AsignacionLote.objects.filter(lote__producto=producto).delete()
+            Lote.objects.filter(producto=producto).delete()
+            ResumenDiarioMovimientos.objects.filter(producto=producto).delete()
+            SnapshotStock.objects.filter(producto=producto).delete()
+            StockBodega.objects.filter(producto=producto).delete()
+            movimientos.delete()
+            producto.delete()
+        try:
+            bodega.delete()
+        except ProtectedError:
+            # La bodega del benchmark tiene datos ajenos: se conserva
+            pass
+        self.stdout.write('Datos del benchmark eliminados.')
@@ -0,0 +1,107 @@
+import multiprocessing
+import resource
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.http import QueryDict
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font, PatternFill
+
+from core.services.exportacion import EXPORTACIONES, generar_exportacion
+
+
+def _rss_actual_kb():
+    """RSS actual del proceso en KB (Linux)"""
+    try:
+        with open('/proc/self/status') as fh:
+            for linea in fh:
+                if linea.startswith('VmRSS:'):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _legacy_xlsx(queryset, columnas):
+    """Flujo anterior: libro en memoria, estilo por celda y BytesIO completo"""
+    wb = Workbook()
+    ws = wb.active
+    encabezado = Font(bold=True, color='FFFFFF')
+    relleno = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
+    centro = Alignment(horizontal='center', vertical='center')
+    for col, c in enumerate(columnas, 1):
+        celda = ws.cell(row=1, column=col, value=c.titulo)
+        celda.font = encabezado
+        celda.fill = relleno
+        celda.alignment = centro
+    for fila, obj in enumerate(queryset, 2):
+        for col, c in enumerate(columnas, 1):
+            celda = ws.cell(row=fila, column=col, value=c.valor(obj))
+            celda.alignment = centro
+    salida = BytesIO()
+    wb.save(salida)
+    return len(salida.getvalue())
+
+
+def _medir(entidad, variante, limite, cola):
+    """Se ejecuta en un proceso hijo para que el pico de RSS sea propio de la variante"""
+    base_kb = _rss_actual_kb()
+    spec = EXPORTACIONES[entidad]
+    queryset = spec['consulta'](QueryDict())
+    if isinstance(queryset, list):
+        # Solo la tabla activa: sin filtro de fechas no se incluye el archivo
+        queryset = queryset[0]
+    if limite:
+        queryset = queryset[:limite]
+    # Fuera del tramo medido, igual para todas las variantes
+    filas = queryset.count()
+    inicio = time.perf_counter()
+    if variante == 'legacy-xlsx':
+        tamano = _legacy_xlsx(queryset, spec['columnas'])
+    else:
+        tamano = 0
+        for bloque in generar_exportacion(queryset, spec['columnas'], variante,
+                                          titulo=spec['titulo'], etiqueta_total=spec['etiqueta_total']):
+            tamano += len(bloque)
+    duracion = time.perf_counter() - inicio
+    pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    connections.close_all()
+    cola.put((filas, duracion, tamano, max(pico_kb - base_kb, 0)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la exportación anterior (openpyxl en memoria) con el motor por bloques '
+        '(xlsx/csv/jsonl): filas/s y pico de memoria de cada variante.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entidad', choices=sorted(EXPORTACIONES), default='movimientos')
+        parser.add_argument(
+            '--formatos', default='legacy-xlsx,xlsx,csv,jsonl',
+            help='Variantes separadas por coma (legacy-xlsx, xlsx, csv, jsonl)'
+        )
+        parser.add_argument('--limite', type=int, default=0, help='Máximo de filas a exportar (0 = todas)')
+
+    def handle(self, *args, **options):
+        entidad = options['entidad']
+        variantes = [v.strip() for v in options['formatos'].split(',') if v.strip()]
+        ctx = multiprocessing.get_context('fork')
+
+        self.stdout.write(f'Entidad: {entidad} | límite: {options["limite"] or "sin límite"}')
+        self.stdout.write(f'{"Variante":<12} {"Filas":>9} {"Seg":>8} {"Filas/s":>10} {"MB":>8} {"Pico RSS MB":>12}')
+        for variante in variantes:
+            # Cada hijo abre su propia conexión; no heredar la del padre
+            connections.close_all()
+            cola = ctx.Queue()
+            proceso = ctx.Process(target=_medir, args=(entidad, variante, options['limite'], cola))
+            proceso.start()
+            filas, duracion, tamano, pico_kb = cola.get()
+            proceso.join()
+            self.stdout.write(
+                f'{variante:<12} {filas:>9} {duracion:>8.2f} '
+                f'{filas / duracion if duracion else 0:>10.0f} '
+                f'{tamano / 1048576:>8.2f} {pico_kb / 1024:>12.1f}'
+            )
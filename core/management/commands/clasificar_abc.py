@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.clasificacion import DIAS_CONSUMO, UMBRAL_A, UMBRAL_B, clasificar_abc
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula el valor de consumo anual de cada producto (salidas × costo promedio), '
+        'lo clasifica en A/B/C y muestra la valorización del inventario por clase. '
+        'Pensado para ejecutarse periódicamente (p. ej. cada noche o cada semana).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=DIAS_CONSUMO, help='Días de salidas a considerar')
+        parser.add_argument('--umbral-a', type=float, default=UMBRAL_A, help='Participación acumulada de la clase A')
+        parser.add_argument('--umbral-b', type=float, default=UMBRAL_B, help='Participación acumulada hasta la clase B')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1:
+            raise CommandError('--dias debe ser mayor que 0')
+        if not 0 < options['umbral_a'] <= options['umbral_b'] <= 1:
+            raise CommandError('Se requiere 0 < --umbral-a <= --umbral-b <= 1')
+
+        resumen = clasificar_abc(
+            dias=options['dias'], umbral_a=options['umbral_a'], umbral_b=options['umbral_b']
+        )
+        for clase in ('A', 'B', 'C'):
+            datos = resumen.get(clase)
+            if datos:
+                self.stdout.write(
+                    f"Clase {clase}: {datos['productos']} productos · consumo ${datos['consumo']:,.0f} "
+                    f"· inventario ${datos['inventario']:,.0f}"
+                )
+        total = sum(datos['productos'] for datos in resumen.values())
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} productos clasificados'))
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from core.models import Usuario, Producto, Proveedor, MovimientoInventario, Categoria, Bodega
+from core.models import Usuario, Producto, Proveedor, MovimientoInventario, Categoria, Bodega, ResumenDiarioMovimientos
 from django.contrib.auth.models import User
 
 class Command(BaseCommand):
@@ -9,6 +9,7 @@ class Command(BaseCommand):
         self.stdout.write('Eliminando datos de prueba...')
         
         MovimientoInventario.objects.all().delete()
+        ResumenDiarioMovimientos.objects.all().delete()
         Producto.objects.all().delete()
         Proveedor.objects.all().delete()
         Categoria.objects.all().delete()
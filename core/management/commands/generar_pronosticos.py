@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.consultas import parsear_fecha
+from core.services.pronosticos import generar_pronosticos, ultimo_pronostico
+
+
+class Command(BaseCommand):
+    help = (
+        'Actualiza los pronósticos de demanda de todos los productos activos con las salidas '
+        'hasta ayer, continuando desde el último cálculo. Pensado para ejecutarse cada noche, '
+        'antes de generar_sugerencias_reposicion.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', help='Último día de historia a considerar (YYYY-MM-DD, por defecto ayer)')
+        parser.add_argument('--reconstruir', action='store_true', help='Recalcular desde cero en vez de continuar')
+
+    def handle(self, *args, **options):
+        hasta = None
+        if options['hasta']:
+            hasta = parsear_fecha(options['hasta'])
+            if hasta is None:
+                raise CommandError(f'--hasta: fecha inválida "{options["hasta"]}"')
+
+        self.stdout.write(f'Último pronóstico: {ultimo_pronostico() or "ninguno"}')
+        total = generar_pronosticos(hasta=hasta, reconstruir=options['reconstruir'])
+        if total:
+            self.stdout.write(self.style.SUCCESS(f'✓ {total} productos pronosticados al {ultimo_pronostico()}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Los pronósticos ya están al día'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.consultas import parsear_fecha
+from core.services.snapshots import generar_snapshots, ultimo_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera los snapshots diarios de stock por producto y bodega de forma incremental '
+        '(desde el último generado hasta ayer). Pensado para ejecutarse una vez al día.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', help='Último día a generar (YYYY-MM-DD, por defecto ayer)')
+        parser.add_argument(
+            '--reconstruir-desde',
+            help='Borrar y regenerar desde este día (YYYY-MM-DD), p. ej. tras cargas masivas fuera de la contabilización'
+        )
+
+    def handle(self, *args, **options):
+        hasta = self._fecha(options['hasta'], '--hasta')
+        reconstruir = self._fecha(options['reconstruir_desde'], '--reconstruir-desde')
+
+        anterior = ultimo_snapshot()
+        self.stdout.write(f'Último snapshot: {anterior or "ninguno"}')
+
+        def progreso(dia):
+            if dia.day == 1:
+                self.stdout.write(f'... {dia:%Y-%m}')
+
+        try:
+            dias = generar_snapshots(hasta=hasta, reconstruir_desde=reconstruir, progreso=progreso)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'✓ {dias} día(s) generados; último snapshot: {ultimo_snapshot()}'))
+
+    @staticmethod
+    def _fecha(valor, opcion):
+        if not valor:
+            return None
+        fecha = parsear_fecha(valor)
+        if fecha is None:
+            raise CommandError(f'{opcion}: fecha inválida "{valor}"')
+        return fecha
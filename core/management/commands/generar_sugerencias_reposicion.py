@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.reposicion import DIAS_COBERTURA, DIAS_DEMANDA, generar_sugerencias_reposicion
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula las sugerencias de reposición por proveedor preferente a partir de la '
+        'demanda reciente, el stock y el lead time. Pensado para ejecutarse una vez al día.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=DIAS_DEMANDA, help='Días de salidas para medir la demanda')
+        parser.add_argument('--cobertura', type=int, default=DIAS_COBERTURA,
+                            help='Días de demanda a cubrir sobre el punto de reorden (sin stock máximo)')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1:
+            raise CommandError('--dias debe ser mayor que 0')
+        if options['cobertura'] < 0:
+            raise CommandError('--cobertura debe ser mayor o igual a 0')
+
+        total = generar_sugerencias_reposicion(options['dias'], options['cobertura'])
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} sugerencias de reposición generadas'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.idempotencia import IDEMPOTENCIA_LOTE, limpiar_claves, vigencia_claves
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra las claves de idempotencia vencidas (por defecto settings.IDEMPOTENCIA_HORAS). '
+        'Pensado para ejecutarse periódicamente.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, help=f'Antigüedad mínima en horas (por defecto {vigencia_claves()})')
+        parser.add_argument('--lote', type=int, default=IDEMPOTENCIA_LOTE, help='Claves por DELETE')
+
+    def handle(self, *args, **options):
+        if options['horas'] is not None and options['horas'] < 0:
+            raise CommandError('--horas debe ser mayor o igual a 0')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        def progreso(total):
+            self.stdout.write(f'... {total} claves borradas')
+
+        total = limpiar_claves(options['horas'], options['lote'], progreso)
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} claves de idempotencia vencidas borradas'))
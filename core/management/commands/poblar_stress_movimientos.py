@@ -2,16 +2,23 @@ import random
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from core.models import Producto, Proveedor, Bodega, Usuario, MovimientoInventario
+from core.models import Producto, Proveedor, Bodega, Usuario, MovimientoInventario, StockBodega
+from core.services.costos import recalcular_costo_productos, redondear_costo
+from core.services.inventario import calcular_variacion
+from core.services.reconciliacion import reconciliar_tramo
+from core.services.resumen import reconstruir_resumen
+from core.services.snapshots import marcar_dias_afectados
 from django.contrib.auth import get_user_model
 
-TIPOS = ['ingreso', 'salida', 'ajuste', 'devolucion', 'transferencia']
+# Las transferencias van en pares (registrar_transferencia); aquí solo movimientos simples
+TIPOS = ['ingreso', 'salida', 'ajuste', 'devolucion']
 
 class Command(BaseCommand):
     help = 'Genera movimientos de inventario masivos para pruebas de stress'
 
     def add_arguments(self, parser):
         parser.add_argument('--cantidad', type=int, default=10000, help='Cantidad de movimientos a crear')
+        parser.add_argument('--lote', type=int, default=1000, help='Movimientos por bulk_create')
 
     def handle(self, *args, **options):
         cantidad = options['cantidad']
@@ -39,13 +46,23 @@ class Command(BaseCommand):
             usuarios.append(Usuario.objects.create(user=u, rol='ADMIN'))
 
         self.stdout.write(self.style.SUCCESS(f'Creando {cantidad} movimientos de inventario...'))
+        # Se insertan con bulk_create, pero con la variación que habría aplicado la
+        # contabilización (saldos en memoria); al final se cuadran stock y costos.
+        saldos = {
+            (s.producto_id, s.bodega_id): s.cantidad for s in StockBodega.objects.all()
+        }
+        proveedores_de = {}
+        pendientes = []
+        afectados = set()
         base_fecha = timezone.now() - timedelta(days=365)
         for i in range(cantidad):
             fecha = base_fecha + timedelta(days=random.randint(0, 364), hours=random.randint(0, 23), minutes=random.randint(0, 59))
             tipo = random.choice(TIPOS)
             producto = random.choice(productos)
             # Seleccionar proveedor asociado al producto si existe
-            proveedores_producto = list(producto.proveedores.all())
+            if producto.pk not in proveedores_de:
+                proveedores_de[producto.pk] = list(producto.proveedores.all())
+            proveedores_producto = proveedores_de[producto.pk]
             if proveedores_producto:
                 proveedor = random.choice(proveedores_producto)
             else:
@@ -57,10 +74,15 @@ class Command(BaseCommand):
             serie = f'Serie-{random.randint(1, 1000)}' if random.random() < 0.2 else ''
             fecha_venc = fecha.date() + timedelta(days=random.randint(30, 365)) if random.random() < 0.1 else None
             doc_num = f'DOC-{random.randint(1000,9999)}' if random.random() < 0.5 else ''
-            MovimientoInventario.objects.create(
+            clave = (producto.pk, bodega.pk)
+            variacion = calcular_variacion(tipo, cantidad_mov, saldos.get(clave, 0))
+            saldos[clave] = saldos.get(clave, 0) + variacion
+            movimiento = MovimientoInventario(
                 fecha=fecha,
                 tipo_movimiento=tipo,
                 cantidad=cantidad_mov,
+                variacion_stock=variacion,
+                costo_unitario=redondear_costo((producto.costo_estandar or 1) * random.randint(80, 120) / 100) if tipo == 'ingreso' else None,
                 producto=producto,
                 proveedor=proveedor,
                 bodega=bodega,
@@ -70,6 +92,24 @@ class Command(BaseCommand):
                 fecha_vencimiento=fecha_venc,
                 documento_numero=doc_num,
             )
+            movimiento.texto_busqueda = movimiento.componer_texto_busqueda()
+            pendientes.append(movimiento)
+            afectados.add(producto.pk)
+            if len(pendientes) >= options['lote']:
+                MovimientoInventario.objects.bulk_create(pendientes)
+                pendientes = []
             if (i+1) % 1000 == 0:
                 self.stdout.write(f'{i+1} movimientos creados...')
+        if pendientes:
+            MovimientoInventario.objects.bulk_create(pendientes)
+
+        if afectados:
+            self.stdout.write('Cuadrando stock y costo promedio con el libro...')
+            # La reconciliación deja los saldos, stock_actual y la alerta de bajo stock al día
+            reconciliar_tramo(min(afectados), max(afectados) + 1, corregir=True)
+            recalcular_costo_productos(afectados)
+            # bulk_create no pasa por la contabilización: el resumen diario se rehace desde el libro
+            self.stdout.write('Reconstruyendo el resumen diario de movimientos...')
+            reconstruir_resumen(desde=timezone.localtime(base_fecha).date())
+            marcar_dias_afectados(base_fecha)
         self.stdout.write(self.style.SUCCESS('Movimientos de inventario generados correctamente.'))
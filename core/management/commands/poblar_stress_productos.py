@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from core.models import Producto, Categoria, UnidadMedida, Proveedor, ProveedorProducto
+from core.services.alertas import recalcular_alerta_bajo_stock
 import random
 
 class Command(BaseCommand):
@@ -29,6 +30,8 @@ class Command(BaseCommand):
             )
             productos.append(producto)
         Producto.objects.bulk_create(productos, batch_size=1000)
+        # bulk_create no pasa por Producto.save(): la alerta se calcula en un UPDATE
+        recalcular_alerta_bajo_stock(Producto.objects.filter(sku__startswith='ST-PROD-'))
         nuevos_productos = Producto.objects.order_by('-id')[:10000]
         relaciones = []
         for producto in nuevos_productos:
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.services.trabajos import ejecutar_trabajo, reencolar_trabajos_colgados, tomar_siguiente_trabajo
+
+
+class Command(BaseCommand):
+    help = 'Worker de exportaciones: atiende la cola de TrabajoExportacion fuera del ciclo de request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesar lo pendiente y terminar')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos de espera con la cola vacía')
+        parser.add_argument(
+            '--colgados-minutos', type=int, default=30,
+            help='Reencolar trabajos EN_PROCESO sin avance por más de estos minutos'
+        )
+
+    def handle(self, *args, **options):
+        reencolados = reencolar_trabajos_colgados(options['colgados_minutos'])
+        if reencolados:
+            self.stdout.write(self.style.WARNING(f'Trabajos reencolados: {reencolados}'))
+
+        while True:
+            close_old_connections()
+            trabajo = tomar_siguiente_trabajo()
+            if trabajo is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            self.stdout.write(f'Procesando #{trabajo.pk} ({trabajo.entidad}.{trabajo.formato})...')
+            try:
+                trabajo = ejecutar_trabajo(trabajo)
+            except Exception as exc:
+                self.stdout.write(self.style.ERROR(f'#{trabajo.pk} falló: {exc}'))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'#{trabajo.pk} listo: {trabajo.total_filas} filas -> {trabajo.archivo.name}'
+            ))
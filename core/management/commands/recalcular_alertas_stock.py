@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.alertas import ALERTAS_LOTE, recalcular_alertas_por_lotes
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula Producto.alerta_bajo_stock en tramos de id (p. ej. tras cargas con '
+        'bulk_create o cambios con queryset.update())'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=ALERTAS_LOTE, help='Productos por UPDATE')
+        parser.add_argument('--desde-id', type=int, default=0, help='Retomar desde este id')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        def progreso(hasta_id, total):
+            self.stdout.write(f'Hasta id {hasta_id}: {total} alertas corregidas')
+
+        total = recalcular_alertas_por_lotes(options['lote'], options['desde_id'], progreso)
+        self.stdout.write(self.style.SUCCESS(f'✓ Alerta de bajo stock corregida en {total} productos'))
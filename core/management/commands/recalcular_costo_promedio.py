@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services.costos import RECALCULO_CHUNK_SIZE, RECALCULO_LOTE, recalcular_costos_promedio
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye Producto.costo_promedio desde el libro de movimientos, por tramos '
+        'de productos (una lectura ordenada y un UPDATE con CASE por tramo).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=RECALCULO_LOTE, help='Productos por tramo')
+        parser.add_argument('--chunk', type=int, default=RECALCULO_CHUNK_SIZE, help='Filas por lectura del libro')
+        parser.add_argument(
+            '--historico', action='store_true',
+            help='Recorrer también el archivo y corregir el costo de los saldos de apertura'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+
+        def progreso(revisados, corregidos):
+            self.stdout.write(f'{revisados} productos revisados, {corregidos} corregidos...')
+
+        revisados, corregidos = recalcular_costos_promedio(
+            lote=options['lote'], historico=options['historico'],
+            chunk_size=options['chunk'], progreso=progreso,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {revisados} productos revisados, {corregidos} con costo corregido '
+            f'en {time.perf_counter() - inicio:.1f} s'
+        ))
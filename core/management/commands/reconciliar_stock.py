@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.models import Bodega, Producto
+from core.services.reconciliacion import RECONCILIACION_LOTE, reconciliar_tramo, tramos_de_productos
+
+
+def _tramo(args):
+    """Se ejecuta en un proceso del pool con su propia conexión"""
+    desde_id, hasta_id, corregir, lote = args
+    try:
+        return reconciliar_tramo(desde_id, hasta_id, corregir=corregir, lote=lote)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula el stock esperado por producto y bodega desde el libro de movimientos '
+        '(agregados agrupados), informa las diferencias y, con --corregir, las repara en bloque. '
+        'El trabajo se reparte en un pool de procesos por tramos de id de producto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Procesos del pool (1 = sin pool)')
+        parser.add_argument('--tramos', type=int, default=0, help='Tramos de id (por defecto 4 por proceso)')
+        parser.add_argument('--lote', type=int, default=RECONCILIACION_LOTE, help='Productos por transacción')
+        parser.add_argument('--corregir', action='store_true', help='Reparar saldos, stock total y variaciones desalineadas')
+        parser.add_argument('--mostrar', type=int, default=50, help='Diferencias a listar en el informe')
+
+    def handle(self, *args, **options):
+        procesos = max(options['procesos'], 1)
+        tramos = tramos_de_productos(options['tramos'] or procesos * 4)
+        tareas = [(desde, hasta, options['corregir'], options['lote']) for desde, hasta in tramos]
+        inicio = time.perf_counter()
+        self.stdout.write(f'{len(tramos)} tramos de productos en {procesos} proceso(s)...')
+
+        if procesos == 1:
+            resultados = [reconciliar_tramo(*tarea) for tarea in tareas]
+        else:
+            # Cada hijo abre su propia conexión; no heredar la del padre
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('fork')) as pool:
+                resultados = list(pool.map(_tramo, tareas))
+
+        revisados = sum(r.productos for r in resultados)
+        diferencias = [d for r in resultados for d in r.diferencias]
+        desalineados = sum(r.movimientos_corregidos for r in resultados)
+        duracion = time.perf_counter() - inicio
+
+        por_bodega = [d for d in diferencias if d.bodega_id is not None]
+        por_producto = [d for d in diferencias if d.bodega_id is None]
+        self.stdout.write(
+            f'{revisados} productos revisados en {duracion:.1f} s: '
+            f'{len(por_producto)} con stock total distinto, {len(por_bodega)} saldos de bodega distintos, '
+            f'{desalineados} movimientos con variación desalineada'
+        )
+
+        mostrar = diferencias[:options['mostrar']]
+        if mostrar:
+            skus = dict(Producto.objects.filter(pk__in={d.producto_id for d in mostrar}).values_list('pk', 'sku'))
+            bodegas = dict(Bodega.objects.values_list('pk', 'codigo'))
+            self.stdout.write(f'{"SKU":<20} {"Bodega":<12} {"Esperado":>10} {"Registrado":>11} {"Dif.":>8}')
+            for d in mostrar:
+                bodega = bodegas.get(d.bodega_id, '?') if d.bodega_id is not None else 'TOTAL'
+                self.stdout.write(
+                    f'{skus.get(d.producto_id, d.producto_id):<20} {bodega:<12} '
+                    f'{d.esperado:>10} {d.registrado:>11} {d.esperado - d.registrado:>8}'
+                )
+            if len(diferencias) > len(mostrar):
+                self.stdout.write(f'... y {len(diferencias) - len(mostrar)} más')
+
+        if not diferencias and not desalineados:
+            self.stdout.write(self.style.SUCCESS('✓ El stock cuadra con el libro'))
+        elif options['corregir']:
+            self.stdout.write(self.style.SUCCESS('✓ Diferencias corregidas'))
+        else:
+            self.stdout.write(self.style.WARNING('Ejecute con --corregir para repararlas'))
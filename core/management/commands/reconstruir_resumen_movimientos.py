@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.consultas import parsear_fecha
+from core.services.resumen import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = (
+        'Rehace el resumen diario de movimientos (dashboard y reportes) desde el libro, '
+        'incluido el archivo. Usar una vez tras la migración o después de cargas masivas '
+        'que no pasan por la contabilización; ejecutarlo sin contabilizaciones en curso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Rehacer solo desde este día (YYYY-MM-DD); por defecto, todo')
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            desde = parsear_fecha(options['desde'])
+            if desde is None:
+                raise CommandError(f'--desde: fecha inválida "{options["desde"]}"')
+
+        def progreso(dia, total):
+            self.stdout.write(f'... {dia:%Y-%m-%d}: {total} filas')
+
+        total = reconstruir_resumen(desde=desde, progreso=progreso)
+        self.stdout.write(self.style.SUCCESS(f'✓ Resumen diario reconstruido: {total} filas'))
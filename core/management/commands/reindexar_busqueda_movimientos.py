@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.services.busqueda import REINDEXAR_LOTE, TABLAS_BUSQUEDA, reindexar_por_lotes
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula texto_busqueda de los movimientos activos y archivados en tramos de id '
+        '(p. ej. tras cargas con bulk_create)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=REINDEXAR_LOTE, help='Movimientos por UPDATE')
+        parser.add_argument('--desde-id', type=int, default=0, help='Retomar desde este id (en cada tabla)')
+        parser.add_argument(
+            '--tabla', choices=sorted(TABLAS_BUSQUEDA),
+            help='Solo la tabla activa o solo el archivo (por defecto, ambas)'
+        )
+
+    def handle(self, *args, **options):
+        def progreso(tabla, hasta_id, total):
+            self.stdout.write(f'[{tabla}] hasta id {hasta_id}: {total} movimientos reindexados')
+
+        tablas = (options['tabla'],) if options['tabla'] else tuple(TABLAS_BUSQUEDA)
+        total = reindexar_por_lotes(options['lote'], options['desde_id'], progreso, tablas)
+        self.stdout.write(self.style.SUCCESS(f'✓ Texto de búsqueda actualizado en {total} movimientos'))
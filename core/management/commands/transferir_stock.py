@@ -0,0 +1,53 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Bodega, Usuario
+from core.services.transferencias import lineas_por_sku, registrar_transferencia
+
+
+class Command(BaseCommand):
+    help = (
+        'Registra una transferencia entre bodegas desde un CSV con columnas sku,cantidad '
+        '(p. ej. el traslado de apertura de una tienda). Se contabiliza completa o no se contabiliza.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='CSV con encabezado sku,cantidad')
+        parser.add_argument('--origen', required=True, help='Código de la bodega de origen')
+        parser.add_argument('--destino', required=True, help='Código de la bodega de destino')
+        parser.add_argument('--usuario', required=True, help='Username del responsable')
+        parser.add_argument('--documento', help='Número de documento de la transferencia')
+        parser.add_argument('--motivo', help='Motivo de la transferencia')
+
+    def handle(self, *args, **options):
+        try:
+            origen = Bodega.objects.get(codigo=options['origen'])
+            destino = Bodega.objects.get(codigo=options['destino'])
+        except Bodega.DoesNotExist:
+            raise CommandError('Bodega de origen o destino inexistente')
+        usuario = Usuario.objects.filter(user__username=options['usuario']).first()
+        if usuario is None:
+            raise CommandError(f'No existe el usuario "{options["usuario"]}"')
+
+        try:
+            with open(options['archivo'], newline='', encoding='utf-8-sig') as archivo:
+                filas = [(fila.get('sku'), fila.get('cantidad')) for fila in csv.DictReader(archivo)]
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        try:
+            transferencia_id = registrar_transferencia(
+                origen=origen,
+                destino=destino,
+                lineas=lineas_por_sku(filas),
+                usuario=usuario,
+                documento_tipo='TRANSFERENCIA',
+                documento_numero=options['documento'],
+                motivo=options['motivo'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Transferencia {transferencia_id}: {len(filas)} línea(s) de {origen.codigo} a {destino.codigo}'
+        ))
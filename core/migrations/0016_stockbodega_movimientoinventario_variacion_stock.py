@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def poblar_variacion_stock(apps, schema_editor):
+    """Variación de los movimientos históricos (ajustes y transferencias no tenían efecto registrado)"""
+    MovimientoInventario = apps.get_model('core', 'MovimientoInventario')
+    MovimientoInventario.objects.filter(
+        tipo_movimiento__in=['ingreso', 'devolucion']
+    ).update(variacion_stock=F('cantidad'))
+    MovimientoInventario.objects.filter(
+        tipo_movimiento='salida'
+    ).update(variacion_stock=-F('cantidad'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_usuario_ultima_modificacion_password_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='variacion_stock',
+            field=models.IntegerField(default=0, help_text='Efecto aplicado al saldo de la bodega al contabilizar', verbose_name='Variación de stock'),
+        ),
+        migrations.CreateModel(
+            name='StockBodega',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True, verbose_name='Última modificación')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='saldos', to='core.bodega', verbose_name='Bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_bodega', to='core.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Stock por Bodega',
+                'verbose_name_plural': 'Stock por Bodega',
+                'unique_together': {('producto', 'bodega')},
+            },
+        ),
+        migrations.RunPython(poblar_variacion_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:09
+
+import core.models.campos
+from django.db import migrations
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+TABLA = 'core_movimientoinventario'
+INDICE_FULLTEXT = 'movimiento_texto_busqueda_ft'
+
+
+def poblar_texto_busqueda(apps, schema_editor):
+    MovimientoInventario = apps.get_model('core', 'MovimientoInventario')
+    Producto = apps.get_model('core', 'Producto')
+    Proveedor = apps.get_model('core', 'Proveedor')
+    producto = Producto.objects.filter(pk=OuterRef('producto_id'))
+    proveedor = Proveedor.objects.filter(pk=OuterRef('proveedor_id'))
+    vacio, espacio = Value(''), Value(' ')
+    MovimientoInventario.objects.update(texto_busqueda=Lower(Concat(
+        Coalesce(Subquery(producto.values('sku')[:1]), vacio), espacio,
+        Coalesce(Subquery(producto.values('nombre')[:1]), vacio), espacio,
+        Coalesce(Subquery(proveedor.values('rut')[:1]), vacio), espacio,
+        Coalesce(Subquery(proveedor.values('razon_social')[:1]), vacio),
+        output_field=CharField(),
+    )))
+
+
+def crear_fulltext(apps, schema_editor):
+    """Índice FULLTEXT con parser ngram (solo MySQL); otros motores usan LIKE"""
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            f'ALTER TABLE {TABLA} ADD FULLTEXT INDEX {INDICE_FULLTEXT} (texto_busqueda) WITH PARSER ngram'
+        )
+
+
+def eliminar_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE {TABLA} DROP INDEX {INDICE_FULLTEXT}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_movimiento_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='texto_busqueda',
+            field=core.models.campos.TextoBusquedaField(blank=True, default='', editable=False, help_text='SKU, nombre del producto, RUT y razón social del proveedor, en minúsculas', verbose_name='Texto de búsqueda'),
+        ),
+        migrations.RunPython(poblar_texto_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_fulltext, eliminar_fulltext),
+    ]
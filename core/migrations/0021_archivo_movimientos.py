@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:11
+
+import core.models.campos
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def crear_fulltext(apps, schema_editor):
+    """Mismo índice FULLTEXT ngram que la tabla activa (solo MySQL)"""
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE core_movimientoarchivado ADD FULLTEXT INDEX mov_archivado_texto_ft '
+            '(texto_busqueda) WITH PARSER ngram'
+        )
+
+
+def eliminar_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE core_movimientoarchivado DROP INDEX mov_archivado_texto_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_movimiento_texto_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorteArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_corte', models.DateTimeField(verbose_name='Fecha de corte')),
+                ('movimientos', models.PositiveIntegerField(default=0, verbose_name='Movimientos archivados')),
+                ('fecha_ejecucion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de ejecución')),
+            ],
+            options={
+                'verbose_name': 'Corte de Archivo',
+                'verbose_name_plural': 'Cortes de Archivo',
+                'ordering': ['-fecha_corte'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID original')),
+                ('tipo_movimiento', models.CharField(choices=[('ingreso', 'Ingreso'), ('salida', 'Salida'), ('ajuste', 'Ajuste'), ('devolucion', 'Devolución'), ('transferencia', 'Transferencia')], max_length=20, verbose_name='Tipo de movimiento')),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad')),
+                ('variacion_stock', models.IntegerField(default=0, verbose_name='Variación de stock')),
+                ('lote', models.CharField(blank=True, max_length=50, null=True, verbose_name='Lote')),
+                ('numero_serie', models.CharField(blank=True, max_length=50, null=True, verbose_name='Número de serie')),
+                ('fecha_vencimiento', models.DateField(blank=True, null=True, verbose_name='Fecha de vencimiento')),
+                ('documento_tipo', models.CharField(blank=True, max_length=50, null=True, verbose_name='Tipo de documento')),
+                ('documento_numero', models.CharField(blank=True, max_length=50, null=True, verbose_name='Número de documento')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha')),
+                ('motivo', models.TextField(blank=True, null=True, verbose_name='Motivo')),
+                ('observaciones', models.TextField(blank=True, null=True, verbose_name='Observaciones')),
+                ('texto_busqueda', core.models.campos.TextoBusquedaField(blank=True, default='', editable=False, verbose_name='Texto de búsqueda')),
+                ('fecha_creacion', models.DateTimeField(verbose_name='Fecha de creación')),
+                ('fecha_modificacion', models.DateTimeField(verbose_name='Última modificación')),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de archivado')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.bodega', verbose_name='Bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.producto', verbose_name='Producto')),
+                ('proveedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.proveedor', verbose_name='Proveedor')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.usuario', verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Movimiento Archivado',
+                'verbose_name_plural': 'Movimientos Archivados',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['fecha', 'id'], name='mov_archivado_fecha_id_idx'), models.Index(fields=['producto', 'fecha'], name='mov_archivado_prod_fecha_idx'), models.Index(fields=['bodega', 'fecha'], name='mov_archivado_bod_fecha_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoApertura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('movimientos', models.PositiveIntegerField(default=0, verbose_name='Movimientos archivados')),
+                ('fecha_corte', models.DateTimeField(verbose_name='Fecha de corte')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='saldos_apertura', to='core.bodega', verbose_name='Bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_apertura', to='core.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Apertura',
+                'verbose_name_plural': 'Saldos de Apertura',
+                'unique_together': {('producto', 'bodega')},
+            },
+        ),
+        migrations.RunPython(crear_fulltext, eliminar_fulltext),
+    ]
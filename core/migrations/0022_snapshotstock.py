@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_archivo_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('fecha_generacion', models.DateTimeField(auto_now_add=True, verbose_name='Generado')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='snapshots', to='core.bodega', verbose_name='Bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Stock',
+                'verbose_name_plural': 'Snapshots de Stock',
+                'indexes': [models.Index(fields=['fecha'], name='snapshot_fecha_idx')],
+                'unique_together': {('producto', 'bodega', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:15
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_snapshotstock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoarchivado',
+            name='costo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Costo unitario'),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='costo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Costo de compra de la unidad (ingresos); alimenta el costo promedio ponderado', max_digits=12, null=True, verbose_name='Costo unitario'),
+        ),
+        migrations.AddField(
+            model_name='saldoapertura',
+            name='costo_promedio',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Costo promedio ponderado del producto tras el último movimiento archivado', max_digits=12, verbose_name='Costo promedio al corte'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_kardex_costos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsignacionLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Cantidad')),
+            ],
+            options={
+                'verbose_name': 'Asignación de Lote',
+                'verbose_name_plural': 'Asignaciones de Lote',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['producto', 'fecha_vencimiento'], name='lote_producto_venc_idx'),
+        ),
+        migrations.AddField(
+            model_name='asignacionlote',
+            name='lote',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='asignaciones', to='core.lote', verbose_name='Lote'),
+        ),
+        migrations.AddField(
+            model_name='asignacionlote',
+            name='movimiento',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='asignaciones_lote', to='core.movimientoinventario', verbose_name='Movimiento'),
+        ),
+    ]
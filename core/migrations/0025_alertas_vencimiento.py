@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_asignacion_lote'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['fecha_vencimiento', 'producto'], name='lote_venc_producto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['fecha_vencimiento', 'producto'], name='movimiento_venc_producto_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_alertas_vencimiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoarchivado',
+            name='transferencia_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True, verbose_name='Transferencia'),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='transferencia_id',
+            field=models.UUIDField(blank=True, db_index=True, help_text='Enlaza la salida y la entrada de una misma transferencia entre bodegas', null=True, verbose_name='Transferencia'),
+        ),
+    ]
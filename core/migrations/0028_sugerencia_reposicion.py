@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SugerenciaReposicion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('demanda_diaria', models.DecimalField(decimal_places=3, help_text='Unidades de salida por día en la ventana de cálculo', max_digits=12, verbose_name='Demanda diaria')),
+                ('stock_actual', models.IntegerField(verbose_name='Stock actual')),
+                ('punto_reorden', models.DecimalField(decimal_places=2, help_text='Mayor entre el punto configurado y stock mínimo + demanda durante el lead time', max_digits=12, verbose_name='Punto de reorden')),
+                ('lead_time', models.PositiveIntegerField(verbose_name='Lead time (días)')),
+                ('cantidad_sugerida', models.PositiveIntegerField(verbose_name='Cantidad sugerida')),
+                ('costo_estimado', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Costo estimado')),
+                ('fecha_calculo', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de cálculo')),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sugerencia_reposicion', to='core.producto', verbose_name='Producto')),
+                ('proveedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sugerencias_reposicion', to='core.proveedor', verbose_name='Proveedor')),
+            ],
+            options={
+                'verbose_name': 'Sugerencia de Reposición',
+                'verbose_name_plural': 'Sugerencias de Reposición',
+                'indexes': [models.Index(fields=['proveedor', 'producto'], name='sugerencia_proveedor_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_sugerencia_reposicion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoDemanda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_base', models.DateField(verbose_name='Historia hasta')),
+                ('promedio_movil', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Promedio móvil diario')),
+                ('suavizado', models.DecimalField(decimal_places=3, help_text='Nivel desestacionalizado', max_digits=12, verbose_name='Suavizado exponencial diario')),
+                ('factores_semana', models.JSONField(blank=True, help_text='Solo categorías estacionales; lunes primero, promedio 1', null=True, verbose_name='Factores por día de semana')),
+                ('demanda_semana', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Demanda próximos 7 días')),
+                ('fecha_calculo', models.DateTimeField(auto_now=True, verbose_name='Fecha de cálculo')),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pronostico', to='core.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Pronóstico de Demanda',
+                'verbose_name_plural': 'Pronósticos de Demanda',
+                'indexes': [models.Index(fields=['fecha_base'], name='pronostico_fecha_base_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:38
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_pronostico_demanda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='clase_abc',
+            field=models.CharField(blank=True, choices=[('A', 'A'), ('B', 'B'), ('C', 'C')], db_index=True, help_text='Clase por valor de consumo anual (comando clasificar_abc)', max_length=1, null=True, verbose_name='Clase ABC'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='valor_consumo_anual',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Salidas de los últimos 12 meses × costo promedio', max_digits=16, verbose_name='Valor de Consumo Anual'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_producto_clase_abc'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioMovimientos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('tipo_movimiento', models.CharField(choices=[('ingreso', 'Ingreso'), ('salida', 'Salida'), ('ajuste', 'Ajuste'), ('devolucion', 'Devolución'), ('transferencia', 'Transferencia')], max_length=20, verbose_name='Tipo de movimiento')),
+                ('movimientos', models.IntegerField(default=0, verbose_name='Movimientos')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('variacion_stock', models.IntegerField(default=0, verbose_name='Variación de stock')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.bodega', verbose_name='Bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.producto', verbose_name='Producto')),
+                ('proveedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.proveedor', verbose_name='Proveedor')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Movimientos',
+                'verbose_name_plural': 'Resúmenes Diarios de Movimientos',
+                'indexes': [models.Index(fields=['fecha', 'tipo_movimiento', 'producto', 'bodega', 'proveedor'], name='resumen_mov_clave_idx'), models.Index(fields=['producto', 'fecha'], name='resumen_mov_producto_idx'), models.Index(fields=['proveedor', 'fecha'], name='resumen_mov_proveedor_idx')],
+            },
+        ),
+    ]
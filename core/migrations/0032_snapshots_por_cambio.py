@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:58
+
+from django.db import migrations, models
+
+
+def borrar_snapshots_diarios(apps, schema_editor):
+    # Los snapshots anteriores tenían una fila por par y día y omitían los saldos
+    # en 0: no sirven para "último snapshot del par". Se regeneran con generar_snapshots.
+    apps.get_model('core', 'SnapshotStock').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_resumen_diario_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoSnapshots',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generado_hasta', models.DateField(blank=True, null=True, verbose_name='Generado hasta')),
+                ('pendiente_desde', models.DateField(blank=True, null=True, verbose_name='Regenerar desde')),
+                ('marcas', models.PositiveBigIntegerField(default=0, verbose_name='Marcas')),
+                ('fecha_generacion', models.DateTimeField(blank=True, null=True, verbose_name='Última generación')),
+            ],
+            options={
+                'verbose_name': 'Estado de Snapshots',
+                'verbose_name_plural': 'Estado de Snapshots',
+            },
+        ),
+        migrations.RunPython(borrar_snapshots_diarios, migrations.RunPython.noop),
+    ]
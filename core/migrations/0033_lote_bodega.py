@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def asignar_bodega_de_ingreso(apps, schema_editor):
+    # Un lote existente queda en la bodega de sus ingresos si todos fueron en la
+    # misma; si no se puede saber, queda sin bodega (la asignación FEFO lo sigue
+    # ofreciendo en cualquier bodega).
+    Lote = apps.get_model('core', 'Lote')
+    AsignacionLote = apps.get_model('core', 'AsignacionLote')
+    bodegas = {}
+    for modelo in ('MovimientoInventario', 'MovimientoArchivado'):
+        movimientos = apps.get_model('core', modelo).objects.filter(
+            id__in=AsignacionLote.objects.filter(cantidad__gt=0).values('movimiento_id')
+        ).values_list('id', 'bodega_id')
+        bodegas.update(movimientos)
+    por_lote = {}
+    for lote_id, movimiento_id in AsignacionLote.objects.filter(cantidad__gt=0).values_list('lote_id', 'movimiento_id'):
+        if movimiento_id in bodegas:
+            por_lote.setdefault(lote_id, set()).add(bodegas[movimiento_id])
+    for lote_id, ids in por_lote.items():
+        if len(ids) == 1:
+            Lote.objects.filter(pk=lote_id).update(bodega_id=ids.pop())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_snapshots_por_cambio'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lote',
+            name='lote_producto_venc_idx',
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='bodega',
+            field=models.ForeignKey(blank=True, help_text='Bodega donde ingresó el lote (vacío en lotes anteriores a su registro)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lotes', to='core.bodega', verbose_name='Bodega'),
+        ),
+        migrations.RunPython(asignar_bodega_de_ingreso, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['producto', 'bodega', 'fecha_vencimiento'], name='lote_prod_bod_venc_idx'),
+        ),
+    ]
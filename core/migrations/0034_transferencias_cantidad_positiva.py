@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:05
+
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def cantidad_positiva(apps, schema_editor):
+    # El tramo de origen de las transferencias se guardaba con cantidad negativa.
+    # Se pasa a positiva en el libro (activo y archivo) y el resumen diario suma
+    # a su fila la diferencia: dos veces lo que restaba cada tramo de origen.
+    ResumenDiarioMovimientos = apps.get_model('core', 'ResumenDiarioMovimientos')
+    deltas = defaultdict(int)
+    for modelo in ('MovimientoInventario', 'MovimientoArchivado'):
+        negativas = apps.get_model('core', modelo).objects.filter(tipo_movimiento='transferencia', cantidad__lt=0)
+        filas = (
+            negativas.annotate(dia=TruncDate('fecha', tzinfo=timezone.get_current_timezone()))
+            .order_by()
+            .values('dia', 'producto_id', 'bodega_id', 'proveedor_id')
+            .annotate(suma=Sum('cantidad'))
+        )
+        for fila in filas:
+            deltas[(fila['dia'], fila['producto_id'], fila['bodega_id'], fila['proveedor_id'])] -= 2 * fila['suma']
+        negativas.update(cantidad=F('cantidad') * -1)
+
+    for (dia, producto_id, bodega_id, proveedor_id), delta in deltas.items():
+        fila = ResumenDiarioMovimientos.objects.filter(
+            fecha=dia, tipo_movimiento='transferencia', producto_id=producto_id,
+            bodega_id=bodega_id, proveedor_id=proveedor_id,
+        ).order_by('pk').first()
+        # Sin fila, el resumen de ese día aún no se había generado: la reconstrucción lo hará bien
+        if fila is not None:
+            ResumenDiarioMovimientos.objects.filter(pk=fila.pk).update(cantidad=F('cantidad') + delta)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_lote_bodega'),
+    ]
+
+    operations = [
+        migrations.RunPython(cantidad_positiva, migrations.RunPython.noop),
+    ]
@@ -16,7 +16,11 @@ from .productos import Categoria, UnidadMedida, Producto
 from .proveedores import Proveedor, ProveedorProducto
 
 # Inventario
-from .inventario import Bodega, MovimientoInventario, Lote
+from .inventario import (
+    Bodega, MovimientoInventario, Lote, AsignacionLote, StockBodega,
+    MovimientoArchivado, SaldoApertura, CorteArchivo, SnapshotStock,
+    EstadoSnapshots, ResumenDiarioMovimientos,
+)
 
 # Ventas
 from .ventas import Cliente, Venta, DetalleVenta
@@ -24,6 +28,15 @@ from .ventas import Cliente, Venta, DetalleVenta
 # Auditoria
 from .auditoria import EventoAuditoria
 
+# Exportaciones
+from .exportaciones import TrabajoExportacion
+
+# Idempotencia
+from .idempotencia import ClaveIdempotencia
+
+# Reposición
+from .reposicion import PronosticoDemanda, SugerenciaReposicion
+
 __all__ = [
     # Base
     'TimeStampedModel',
@@ -44,15 +57,30 @@ __all__ = [
     'Bodega',
     'MovimientoInventario',
     'Lote',
+    'AsignacionLote',
+    'StockBodega',
+    'MovimientoArchivado',
+    'SaldoApertura',
+    'CorteArchivo',
+    'SnapshotStock',
+    'EstadoSnapshots',
+    'ResumenDiarioMovimientos',
     
     # Ventas
     'Cliente',
     'Venta',
     'DetalleVenta',
-<<<<<<< HEAD
     
     # Auditoria
     'EventoAuditoria',
-=======
->>>>>>> cb95a2fee0a357e2525c382891a20c417d34d6a4
+
+    # Exportaciones
+    'TrabajoExportacion',
+
+    # Idempotencia
+    'ClaveIdempotencia',
+
+    # Reposición
+    'SugerenciaReposicion',
+    'PronosticoDemanda',
 ]
\ No newline at end of file
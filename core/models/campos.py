@@ -0,0 +1,65 @@
+"""
+Campos personalizados
+"""
+import re
+
+from django.db import models
+from django.db.models import Lookup
+
+# Largo mínimo de término que indexa el parser ngram de MySQL (ngram_token_size)
+NGRAM_MIN = 2
+
+_OPERADORES_BOOLEANOS = re.compile(r'[+\-<>()~*"@]')
+
+
+def terminos_busqueda(texto):
+    """Palabras de la búsqueda en minúsculas, sin operadores del modo booleano"""
+    return [p for p in _OPERADORES_BOOLEANOS.sub(' ', (texto or '').lower()).split() if p]
+
+
+class TextoBusquedaField(models.TextField):
+    """
+    Texto desnormalizado para búsqueda. En MySQL lleva un índice FULLTEXT con
+    parser ngram y el lookup `coincide` usa MATCH ... AGAINST; en otros motores
+    cae a LIKE sobre esta única columna (sin joins).
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('default', '')
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+
+@TextoBusquedaField.register_lookup
+class Coincide(Lookup):
+    """Todas las palabras aparecen (como subcadena) en el texto de búsqueda"""
+
+    lookup_name = 'coincide'
+    prepare_rhs = False
+
+    def _como_like(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        palabras = terminos_busqueda(self.rhs)
+        if not palabras:
+            return '1 = 1', []
+        # Texto y palabras ya vienen en minúsculas: basta el LIKE del motor (con ESCAPE)
+        condicion = f"{lhs} {connection.operators['contains'] % '%s'}"
+        sql = ' AND '.join([condicion] * len(palabras))
+        params = []
+        for palabra in palabras:
+            params.extend(lhs_params)
+            params.append(f'%{connection.ops.prep_for_like_query(palabra)}%')
+        return f'({sql})', params
+
+    def as_sql(self, compiler, connection):
+        return self._como_like(compiler, connection)
+
+    def as_mysql(self, compiler, connection):
+        palabras = terminos_busqueda(self.rhs)
+        # Los términos más cortos que el n-grama no están en el índice
+        if not palabras or any(len(p) < NGRAM_MIN for p in palabras):
+            return self._como_like(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        consulta = ' '.join(f'+"{p}"' for p in palabras)
+        return f'MATCH ({lhs}) AGAINST (%s IN BOOLEAN MODE)', [*lhs_params, consulta]
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import models
+
+
+class TrabajoExportacion(models.Model):
+    """Exportación encolada; la procesa el comando procesar_exportaciones fuera del request"""
+
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En proceso'),
+        ('COMPLETADO', 'Completado'),
+        ('ERROR', 'Error'),
+    ]
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='exportaciones',
+        verbose_name='Usuario'
+    )
+    entidad = models.CharField(max_length=30, verbose_name='Entidad')
+    formato = models.CharField(max_length=10, default='xlsx', verbose_name='Formato')
+    parametros = models.TextField(
+        blank=True,
+        verbose_name='Parámetros',
+        help_text='Filtros de la lista en formato querystring'
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='PENDIENTE',
+        verbose_name='Estado'
+    )
+    total_filas = models.PositiveIntegerField(null=True, blank=True, verbose_name='Total de filas')
+    filas_procesadas = models.PositiveIntegerField(default=0, verbose_name='Filas procesadas')
+    archivo = models.FileField(upload_to='exportaciones/', blank=True, verbose_name='Archivo')
+    error = models.TextField(blank=True, verbose_name='Error')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name='Inicio')
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name='Fin')
+    fecha_modificacion = models.DateTimeField(auto_now=True, verbose_name='Última actualización')
+
+    class Meta:
+        verbose_name = 'Trabajo de Exportación'
+        verbose_name_plural = 'Trabajos de Exportación'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='trabajoexp_estado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entidad}.{self.formato} - {self.get_estado_display()}"
+
+    @property
+    def progreso(self):
+        """Porcentaje de avance (0-100)"""
+        if self.estado == 'COMPLETADO':
+            return 100
+        if not self.total_filas:
+            return 0
+        return min(99, int(self.filas_procesadas * 100 / self.total_filas))
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import models
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Clave enviada por el cliente con un POST que crea movimientos. Un reintento
+    con la misma clave devuelve el resultado guardado en vez de contabilizar de
+    nuevo. Se borran pasado el TTL (comando limpiar_claves_idempotencia).
+    """
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='claves_idempotencia',
+        verbose_name='Usuario'
+    )
+    clave = models.CharField(max_length=64, verbose_name='Clave')
+    operacion = models.CharField(max_length=30, verbose_name='Operación')
+    referencia = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Referencia',
+        help_text='Resultado de la operación (id del movimiento o de la transferencia)'
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
+
+    class Meta:
+        verbose_name = 'Clave de Idempotencia'
+        verbose_name_plural = 'Claves de Idempotencia'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'clave'], name='idempotencia_usuario_clave_uniq'),
+        ]
+        indexes = [
+            # Limpieza por TTL
+            models.Index(fields=['fecha_creacion'], name='idempotencia_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.operacion} {self.clave} → {self.referencia or '—'}"
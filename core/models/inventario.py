@@ -5,6 +5,7 @@ from .base import TimeStampedModel
 from .productos import Producto
 from .usuarios import Usuario
 from .proveedores import Proveedor
+from .campos import TextoBusquedaField
 
 
 class Bodega(TimeStampedModel):
@@ -76,6 +77,26 @@ class MovimientoInventario(TimeStampedModel):
     cantidad = models.IntegerField(
         verbose_name='Cantidad'
     )
+    variacion_stock = models.IntegerField(
+        default=0,
+        verbose_name='Variación de stock',
+        help_text='Efecto aplicado al saldo de la bodega al contabilizar'
+    )
+    costo_unitario = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name='Costo unitario',
+        help_text='Costo de compra de la unidad (ingresos); alimenta el costo promedio ponderado'
+    )
+    transferencia_id = models.UUIDField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Transferencia',
+        help_text='Enlaza la salida y la entrada de una misma transferencia entre bodegas'
+    )
     
     # Trazabilidad
     lote = models.CharField(
@@ -139,15 +160,43 @@ class MovimientoInventario(TimeStampedModel):
         on_delete=models.SET_NULL,
         verbose_name='Proveedor'
     )
+
+    # Búsqueda (FULLTEXT ngram en MySQL)
+    texto_busqueda = TextoBusquedaField(
+        verbose_name='Texto de búsqueda',
+        help_text='SKU, nombre del producto, RUT y razón social del proveedor, en minúsculas'
+    )
     
     class Meta:
         verbose_name = 'Movimiento de Inventario'
         verbose_name_plural = 'Movimientos de Inventario'
         ordering = ['-fecha']
+        indexes = [
+            # Clave de la paginación por cursor
+            models.Index(fields=['fecha', 'id'], name='movimiento_fecha_id_idx'),
+            # Rangos de fecha combinados con tipo, producto o bodega
+            models.Index(fields=['fecha', 'tipo_movimiento'], name='movimiento_fecha_tipo_idx'),
+            models.Index(fields=['producto', 'fecha'], name='movimiento_producto_fecha_idx'),
+            models.Index(fields=['bodega', 'fecha'], name='movimiento_bodega_fecha_idx'),
+            # Alertas de vencimiento: ingresos que vencen en una ventana de días
+            models.Index(fields=['fecha_vencimiento', 'producto'], name='movimiento_venc_producto_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_tipo_movimiento_display()} - {self.producto.sku} ({self.cantidad})"
 
+    archivado = False
+
+    def componer_texto_busqueda(self):
+        """Mismo formato que services.busqueda.expresion_texto_busqueda"""
+        proveedor = self.proveedor
+        return ' '.join([
+            self.producto.sku or '',
+            self.producto.nombre or '',
+            (proveedor.rut or '') if proveedor else '',
+            (proveedor.razon_social or '') if proveedor else '',
+        ]).lower()
+
 
 class Lote(TimeStampedModel):
     """Control de lotes"""
@@ -163,6 +212,15 @@ class Lote(TimeStampedModel):
         related_name='lotes',
         verbose_name='Producto'
     )
+    bodega = models.ForeignKey(
+        Bodega,
+        on_delete=models.PROTECT,
+        related_name='lotes',
+        null=True,
+        blank=True,
+        verbose_name='Bodega',
+        help_text='Bodega donde ingresó el lote (vacío en lotes anteriores a su registro)'
+    )
     fecha_fabricacion = models.DateField(
         verbose_name='Fecha de fabricación'
     )
@@ -184,6 +242,298 @@ class Lote(TimeStampedModel):
         verbose_name = 'Lote'
         verbose_name_plural = 'Lotes'
         ordering = ['fecha_vencimiento']
+        indexes = [
+            # Asignación FEFO: lotes de un producto en una bodega por vencimiento
+            models.Index(fields=['producto', 'bodega', 'fecha_vencimiento'], name='lote_prod_bod_venc_idx'),
+            # Alertas de vencimiento: lotes de todos los productos por fecha
+            models.Index(fields=['fecha_vencimiento', 'producto'], name='lote_venc_producto_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Lote {self.numero_lote} - {self.producto.nombre}"
+
+
+class AsignacionLote(models.Model):
+    """
+    Desglose por lote de un movimiento: cuánto sumó (ingreso) o descontó
+    (salida, asignación FEFO) a cada lote. La cantidad lleva el signo del
+    efecto sobre el lote. Sin restricción de FK hacia el movimiento: al
+    archivarlo conserva su id y el desglose sigue siendo válido.
+    """
+
+    movimiento = models.ForeignKey(
+        MovimientoInventario,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='asignaciones_lote',
+        verbose_name='Movimiento'
+    )
+    lote = models.ForeignKey(
+        Lote,
+        on_delete=models.PROTECT,
+        related_name='asignaciones',
+        verbose_name='Lote'
+    )
+    cantidad = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Cantidad'
+    )
+
+    class Meta:
+        verbose_name = 'Asignación de Lote'
+        verbose_name_plural = 'Asignaciones de Lote'
+
+    def __str__(self):
+        return f"{self.lote.numero_lote}: {self.cantidad}"
+
+
+class StockBodega(models.Model):
+    """Saldo de stock por producto y bodega"""
     
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='saldos_bodega',
+        verbose_name='Producto'
+    )
+    bodega = models.ForeignKey(
+        Bodega,
+        on_delete=models.PROTECT,
+        related_name='saldos',
+        verbose_name='Bodega'
+    )
+    cantidad = models.IntegerField(
+        default=0,
+        verbose_name='Cantidad'
+    )
+    fecha_modificacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última modificación'
+    )
+    
+    class Meta:
+        verbose_name = 'Stock por Bodega'
+        verbose_name_plural = 'Stock por Bodega'
+        unique_together = ('producto', 'bodega')
+    
+    def __str__(self):
+        return f"{self.producto.sku} @ {self.bodega.codigo}: {self.cantidad}"
+
+
+# ============================================
+# ARCHIVO (movimientos antiguos)
+# ============================================
+
+class MovimientoArchivado(models.Model):
+    """
+    Movimiento trasladado fuera de la tabla activa por archivar_movimientos.
+    Conserva el id original, así el orden (fecha, id) es el mismo en ambas tablas.
+    """
+
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID original')
+    tipo_movimiento = models.CharField(
+        max_length=20,
+        choices=MovimientoInventario.TIPO_CHOICES,
+        verbose_name='Tipo de movimiento'
+    )
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='+', verbose_name='Producto')
+    bodega = models.ForeignKey(Bodega, on_delete=models.PROTECT, related_name='+', verbose_name='Bodega')
+    cantidad = models.IntegerField(verbose_name='Cantidad')
+    variacion_stock = models.IntegerField(default=0, verbose_name='Variación de stock')
+    costo_unitario = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True, verbose_name='Costo unitario'
+    )
+    transferencia_id = models.UUIDField(null=True, blank=True, db_index=True, verbose_name='Transferencia')
+    lote = models.CharField(max_length=50, null=True, blank=True, verbose_name='Lote')
+    numero_serie = models.CharField(max_length=50, null=True, blank=True, verbose_name='Número de serie')
+    fecha_vencimiento = models.DateField(null=True, blank=True, verbose_name='Fecha de vencimiento')
+    documento_tipo = models.CharField(max_length=50, null=True, blank=True, verbose_name='Tipo de documento')
+    documento_numero = models.CharField(max_length=50, null=True, blank=True, verbose_name='Número de documento')
+    usuario = models.ForeignKey(Usuario, on_delete=models.PROTECT, related_name='+', verbose_name='Usuario')
+    fecha = models.DateTimeField(verbose_name='Fecha')
+    motivo = models.TextField(null=True, blank=True, verbose_name='Motivo')
+    observaciones = models.TextField(null=True, blank=True, verbose_name='Observaciones')
+    proveedor = models.ForeignKey(
+        Proveedor, null=True, blank=True, on_delete=models.SET_NULL, related_name='+', verbose_name='Proveedor'
+    )
+    texto_busqueda = TextoBusquedaField(verbose_name='Texto de búsqueda')
+    fecha_creacion = models.DateTimeField(verbose_name='Fecha de creación')
+    fecha_modificacion = models.DateTimeField(verbose_name='Última modificación')
+    fecha_archivado = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de archivado')
+
+    archivado = True
+
+    class Meta:
+        verbose_name = 'Movimiento Archivado'
+        verbose_name_plural = 'Movimientos Archivados'
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='mov_archivado_fecha_id_idx'),
+            models.Index(fields=['producto', 'fecha'], name='mov_archivado_prod_fecha_idx'),
+            models.Index(fields=['bodega', 'fecha'], name='mov_archivado_bod_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_movimiento_display()} - {self.producto.sku} ({self.cantidad}) [archivado]"
+
+
+class SaldoApertura(models.Model):
+    """Saldo acumulado de los movimientos archivados de un producto en una bodega"""
+
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='saldos_apertura',
+        verbose_name='Producto'
+    )
+    bodega = models.ForeignKey(
+        Bodega,
+        on_delete=models.PROTECT,
+        related_name='saldos_apertura',
+        verbose_name='Bodega'
+    )
+    cantidad = models.IntegerField(default=0, verbose_name='Cantidad')
+    movimientos = models.PositiveIntegerField(default=0, verbose_name='Movimientos archivados')
+    costo_promedio = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Costo promedio al corte',
+        help_text='Costo promedio ponderado del producto tras el último movimiento archivado'
+    )
+    fecha_corte = models.DateTimeField(verbose_name='Fecha de corte')
+
+    class Meta:
+        verbose_name = 'Saldo de Apertura'
+        verbose_name_plural = 'Saldos de Apertura'
+        unique_together = ('producto', 'bodega')
+
+    def __str__(self):
+        return f"{self.producto.sku} @ {self.bodega.codigo}: {self.cantidad} al {self.fecha_corte:%Y-%m-%d}"
+
+
+class CorteArchivo(models.Model):
+    """Registro de cada ejecución del archivado; el último corte define el horizonte"""
+
+    fecha_corte = models.DateTimeField(verbose_name='Fecha de corte')
+    movimientos = models.PositiveIntegerField(default=0, verbose_name='Movimientos archivados')
+    fecha_ejecucion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de ejecución')
+
+    class Meta:
+        verbose_name = 'Corte de Archivo'
+        verbose_name_plural = 'Cortes de Archivo'
+        ordering = ['-fecha_corte']
+
+    def __str__(self):
+        return f"Corte {self.fecha_corte:%Y-%m-%d} ({self.movimientos} movimientos)"
+
+
+class SnapshotStock(models.Model):
+    """
+    Saldo de un producto en una bodega al cierre de un día (hora local).
+    Lo genera generar_snapshots solo los días en que el saldo del par cambió
+    (también cuando queda en 0): el saldo a una fecha es el del último snapshot
+    del par en o antes de ese día.
+    """
+
+    fecha = models.DateField(verbose_name='Fecha')
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        verbose_name='Producto'
+    )
+    bodega = models.ForeignKey(
+        Bodega,
+        on_delete=models.PROTECT,
+        related_name='snapshots',
+        verbose_name='Bodega'
+    )
+    cantidad = models.IntegerField(default=0, verbose_name='Cantidad')
+    fecha_generacion = models.DateTimeField(auto_now_add=True, verbose_name='Generado')
+
+    class Meta:
+        verbose_name = 'Snapshot de Stock'
+        verbose_name_plural = 'Snapshots de Stock'
+        unique_together = ('producto', 'bodega', 'fecha')
+        indexes = [
+            models.Index(fields=['fecha'], name='snapshot_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.producto.sku} @ {self.bodega.codigo}: {self.cantidad}"
+
+
+class EstadoSnapshots(models.Model):
+    """
+    Fila única con el avance de generar_snapshots. La contabilización anota en
+    `pendiente_desde` el primer día ya cerrado que tocó (fecha nueva o anterior
+    de un movimiento registrado, modificado o anulado); `marcas` cuenta esas
+    anotaciones para no perder las que llegan durante una generación.
+    """
+
+    generado_hasta = models.DateField(null=True, blank=True, verbose_name='Generado hasta')
+    pendiente_desde = models.DateField(null=True, blank=True, verbose_name='Regenerar desde')
+    marcas = models.PositiveBigIntegerField(default=0, verbose_name='Marcas')
+    fecha_generacion = models.DateTimeField(null=True, blank=True, verbose_name='Última generación')
+
+    class Meta:
+        verbose_name = 'Estado de Snapshots'
+        verbose_name_plural = 'Estado de Snapshots'
+
+    def __str__(self):
+        return f"Snapshots hasta {self.generado_hasta or '—'} (pendiente desde {self.pendiente_desde or '—'})"
+
+
+class ResumenDiarioMovimientos(models.Model):
+    """
+    Totales de movimientos por día local, tipo, producto, bodega y proveedor.
+    La contabilización lo mantiene al registrar, modificar o anular; el comando
+    reconstruir_resumen_movimientos lo rehace desde el libro (incluido el archivo).
+    """
+
+    fecha = models.DateField(verbose_name='Fecha')
+    tipo_movimiento = models.CharField(
+        max_length=20,
+        choices=MovimientoInventario.TIPO_CHOICES,
+        verbose_name='Tipo de movimiento'
+    )
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Producto'
+    )
+    bodega = models.ForeignKey(
+        Bodega,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Bodega'
+    )
+    proveedor = models.ForeignKey(
+        Proveedor,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        verbose_name='Proveedor'
+    )
+    movimientos = models.IntegerField(default=0, verbose_name='Movimientos')
+    cantidad = models.IntegerField(default=0, verbose_name='Cantidad')
+    variacion_stock = models.IntegerField(default=0, verbose_name='Variación de stock')
+
+    class Meta:
+        verbose_name = 'Resumen Diario de Movimientos'
+        verbose_name_plural = 'Resúmenes Diarios de Movimientos'
+        indexes = [
+            models.Index(
+                fields=['fecha', 'tipo_movimiento', 'producto', 'bodega', 'proveedor'],
+                name='resumen_mov_clave_idx'
+            ),
+            models.Index(fields=['producto', 'fecha'], name='resumen_mov_producto_idx'),
+            models.Index(fields=['proveedor', 'fecha'], name='resumen_mov_proveedor_idx'),
+        ]
+
     def __str__(self):
-        return f"Lote {self.numero_lote} - {self.producto.nombre}"
\ No newline at end of file
+        return f"{self.fecha} {self.tipo_movimiento} {self.producto_id}@{self.bodega_id}: {self.movimientos}"
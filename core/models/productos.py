@@ -39,6 +39,12 @@ class UnidadMedida(models.Model):
 class Producto(models.Model):
     """Modelo principal de productos"""
     
+    CLASE_ABC_CHOICES = [
+        ('A', 'A'),
+        ('B', 'B'),
+        ('C', 'C'),
+    ]
+    
     # ============================================
     # IDENTIFICACIÓN
     # ============================================
@@ -260,6 +266,24 @@ class Producto(models.Model):
         help_text='Indica si hay productos próximos a vencer'
     )
     
+    clase_abc = models.CharField(
+        'Clase ABC',
+        max_length=1,
+        choices=CLASE_ABC_CHOICES,
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text='Clase por valor de consumo anual (comando clasificar_abc)'
+    )
+    
+    valor_consumo_anual = models.DecimalField(
+        'Valor de Consumo Anual',
+        max_digits=16,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Salidas de los últimos 12 meses × costo promedio'
+    )
+    
     # ============================================
     # ESTADO Y AUDITORÍA
     # ============================================
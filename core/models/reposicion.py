@@ -0,0 +1,113 @@
+from decimal import Decimal
+
+from django.db import models
+
+from .productos import Producto
+from .proveedores import Proveedor
+
+
+class SugerenciaReposicion(models.Model):
+    """
+    Cantidad sugerida a pedir de un producto a su proveedor preferente.
+    La tabla completa se recalcula con generar_sugerencias_reposicion; guarda
+    los datos usados en el cálculo para poder explicar cada sugerencia.
+    """
+
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='sugerencia_reposicion',
+        verbose_name='Producto'
+    )
+    proveedor = models.ForeignKey(
+        Proveedor,
+        on_delete=models.CASCADE,
+        related_name='sugerencias_reposicion',
+        verbose_name='Proveedor'
+    )
+    demanda_diaria = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        verbose_name='Demanda diaria',
+        help_text='Unidades de salida por día en la ventana de cálculo'
+    )
+    stock_actual = models.IntegerField(verbose_name='Stock actual')
+    punto_reorden = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name='Punto de reorden',
+        help_text='Mayor entre el punto configurado y stock mínimo + demanda durante el lead time'
+    )
+    lead_time = models.PositiveIntegerField(verbose_name='Lead time (días)')
+    cantidad_sugerida = models.PositiveIntegerField(verbose_name='Cantidad sugerida')
+    costo_estimado = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Costo estimado'
+    )
+    fecha_calculo = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de cálculo')
+
+    class Meta:
+        verbose_name = 'Sugerencia de Reposición'
+        verbose_name_plural = 'Sugerencias de Reposición'
+        indexes = [
+            models.Index(fields=['proveedor', 'producto'], name='sugerencia_proveedor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto.sku}: pedir {self.cantidad_sugerida} a {self.proveedor.rut}"
+
+
+class PronosticoDemanda(models.Model):
+    """
+    Pronóstico de salidas diarias de un producto, calculado con la historia
+    hasta `fecha_base` (comando generar_pronosticos, cada noche). `suavizado`
+    es el nivel del suavizado exponencial y se retoma en la corrida siguiente.
+    """
+
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='pronostico',
+        verbose_name='Producto'
+    )
+    fecha_base = models.DateField(verbose_name='Historia hasta')
+    promedio_movil = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        verbose_name='Promedio móvil diario'
+    )
+    suavizado = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        verbose_name='Suavizado exponencial diario',
+        help_text='Nivel desestacionalizado'
+    )
+    factores_semana = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Factores por día de semana',
+        help_text='Solo categorías estacionales; lunes primero, promedio 1'
+    )
+    demanda_semana = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        verbose_name='Demanda próximos 7 días'
+    )
+    fecha_calculo = models.DateTimeField(auto_now=True, verbose_name='Fecha de cálculo')
+
+    class Meta:
+        verbose_name = 'Pronóstico de Demanda'
+        verbose_name_plural = 'Pronósticos de Demanda'
+        indexes = [
+            models.Index(fields=['fecha_base'], name='pronostico_fecha_base_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto.sku}: {self.suavizado}/día al {self.fecha_base}"
+
+    def pronostico_dia(self, dia):
+        """Unidades esperadas para `dia`, con el factor de su día de semana si es estacional"""
+        factor = self.factores_semana[dia.weekday()] if self.factores_semana else 1
+        return self.suavizado * Decimal(str(factor))
@@ -0,0 +1,155 @@
+"""
+Servicios de dominio
+Lógica de negocio compartida entre vistas y comandos de gestión
+"""
+
+# Inventario
+from .inventario import (
+    anular_movimiento,
+    calcular_variacion,
+    modificar_movimiento,
+    registrar_movimiento,
+    stock_en_bodega,
+    stock_por_bodega,
+    stock_total,
+)
+
+# Consultas y exportación
+from .consultas import (
+    filtrar_movimientos,
+    filtrar_productos,
+    filtrar_proveedores,
+    filtrar_usuarios,
+)
+from .exportacion import (
+    exportar_entidad,
+    generar_exportacion,
+    respuesta_exportacion,
+)
+from .archivo import (
+    archivar_movimientos,
+    corte_vigente,
+    saldo_apertura,
+)
+from .costos import (
+    costo_de_ingreso,
+    recalcular_costos_promedio,
+)
+from .lotes import (
+    asignar_fefo,
+    descontar_lote_indicado,
+    ingresar_lote,
+    validar_lotes,
+)
+from .reconciliacion import (
+    reconciliar_tramo,
+    tramos_de_productos,
+)
+from .kardex import (
+    Kardex,
+    kardex_desde_params,
+)
+from .snapshots import (
+    generar_snapshots,
+    saldos_al_cierre,
+    stock_a_fecha,
+)
+from .trabajos import (
+    ejecutar_trabajo,
+    encolar_exportacion,
+    tomar_siguiente_trabajo,
+)
+from .idempotencia import (
+    ejecutar_una_vez,
+    limpiar_claves,
+    resultado_previo,
+)
+from .transferencias import (
+    anular_transferencia,
+    registrar_transferencia,
+)
+from .alertas import (
+    recalcular_alerta_bajo_stock,
+    recalcular_alertas_por_lotes,
+)
+from .vencimientos import (
+    actualizar_alertas_vencimiento,
+    reporte_por_vencer,
+)
+from .resumen import (
+    acumular_en_resumen,
+    reconstruir_resumen,
+)
+from .clasificacion import (
+    clasificar_abc,
+    resumen_abc,
+)
+from .pronosticos import (
+    demanda_pronosticada,
+    generar_pronosticos,
+)
+from .reposicion import (
+    generar_sugerencias_reposicion,
+    velocidad_demanda,
+)
+from .sugerencias import (
+    sugerir_productos,
+    sugerir_proveedores,
+)
+
+__all__ = [
+    # Inventario
+    'anular_movimiento',
+    'calcular_variacion',
+    'modificar_movimiento',
+    'registrar_movimiento',
+    'stock_en_bodega',
+    'stock_por_bodega',
+    'stock_total',
+    # Consultas y exportación
+    'filtrar_movimientos',
+    'filtrar_productos',
+    'filtrar_proveedores',
+    'filtrar_usuarios',
+    'exportar_entidad',
+    'generar_exportacion',
+    'respuesta_exportacion',
+    'archivar_movimientos',
+    'corte_vigente',
+    'saldo_apertura',
+    'costo_de_ingreso',
+    'recalcular_costos_promedio',
+    'asignar_fefo',
+    'descontar_lote_indicado',
+    'ingresar_lote',
+    'validar_lotes',
+    'reconciliar_tramo',
+    'tramos_de_productos',
+    'Kardex',
+    'kardex_desde_params',
+    'generar_snapshots',
+    'saldos_al_cierre',
+    'stock_a_fecha',
+    'encolar_exportacion',
+    'tomar_siguiente_trabajo',
+    'ejecutar_trabajo',
+    'ejecutar_una_vez',
+    'limpiar_claves',
+    'resultado_previo',
+    'anular_transferencia',
+    'registrar_transferencia',
+    'recalcular_alerta_bajo_stock',
+    'recalcular_alertas_por_lotes',
+    'actualizar_alertas_vencimiento',
+    'reporte_por_vencer',
+    'acumular_en_resumen',
+    'reconstruir_resumen',
+    'clasificar_abc',
+    'resumen_abc',
+    'demanda_pronosticada',
+    'generar_pronosticos',
+    'generar_sugerencias_reposicion',
+    'velocidad_demanda',
+    'sugerir_productos',
+    'sugerir_proveedores',
+]
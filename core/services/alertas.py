@@ -0,0 +1,49 @@
+"""
+Alerta de bajo stock
+Producto.save() y la contabilización mantienen alerta_bajo_stock fila a fila,
+pero bulk_create y queryset.update() no pasan por ahí. Tras cualquier cambio
+masivo de stock o de stock mínimo se recalcula con un UPDATE por conjunto que
+solo toca las filas cuya marca quedó desalineada.
+"""
+from django.db.models import Case, F, Q, Value, When
+
+from ..models import Producto
+
+ALERTAS_LOTE = 5000
+
+
+def expresion_alerta_bajo_stock():
+    """Expresión SQL equivalente a la regla de Producto.save(): stock_actual <= stock_minimo"""
+    return Case(
+        When(stock_actual__lte=F('stock_minimo'), then=Value(True)),
+        default=Value(False),
+    )
+
+
+def alerta_desalineada():
+    """Filtro de los productos cuya alerta no coincide con su stock"""
+    return (
+        Q(stock_actual__lte=F('stock_minimo'), alerta_bajo_stock=False)
+        | Q(stock_actual__gt=F('stock_minimo'), alerta_bajo_stock=True)
+    )
+
+
+def recalcular_alerta_bajo_stock(queryset=None):
+    """Recalcula la alerta de los productos del queryset (todos por defecto); devuelve filas corregidas"""
+    if queryset is None:
+        queryset = Producto.objects.all()
+    return queryset.filter(alerta_desalineada()).update(alerta_bajo_stock=expresion_alerta_bajo_stock())
+
+
+def recalcular_alertas_por_lotes(lote=ALERTAS_LOTE, desde_id=0, progreso=None):
+    """Recalcula la alerta de todos los productos en tramos de id, para no bloquear la tabla"""
+    total = 0
+    maximo = Producto.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    inicio = desde_id
+    while inicio <= maximo:
+        fin = inicio + lote
+        total += recalcular_alerta_bajo_stock(Producto.objects.filter(id__gte=inicio, id__lt=fin))
+        if progreso:
+            progreso(min(fin - 1, maximo), total)
+        inicio = fin
+    return total
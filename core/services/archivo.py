@@ -0,0 +1,159 @@
+"""
+Archivo de movimientos (niveles caliente / frío)
+Los movimientos anteriores al horizonte se trasladan por lotes a
+MovimientoArchivado. Por cada producto y bodega queda un SaldoApertura con la
+suma de lo archivado, de modo que los saldos y el kardex no necesitan leer la
+tabla fría. Las consultas solo incluyen el archivo cuando el rango lo pide.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..models import CorteArchivo, MovimientoArchivado, MovimientoInventario, Producto, SaldoApertura
+from .costos import avanzar_costo, costo_referencia
+
+ARCHIVO_LOTE = 2000
+ARCHIVO_DIAS_DEFECTO = 365
+
+
+def horizonte_archivo():
+    """Días de movimientos que se mantienen en la tabla activa (settings.ARCHIVO_MOVIMIENTOS_DIAS)"""
+    return getattr(settings, 'ARCHIVO_MOVIMIENTOS_DIAS', ARCHIVO_DIAS_DEFECTO)
+
+
+def corte_vigente():
+    """Fecha antes de la cual los movimientos están archivados (None si nunca se archivó)"""
+    return CorteArchivo.objects.order_by('-fecha_corte').values_list('fecha_corte', flat=True).first()
+
+
+def requiere_archivo(desde=None, historico=False):
+    """¿Un rango que empieza en `desde` (datetime aware, o None = sin límite) necesita la tabla fría?"""
+    corte = corte_vigente()
+    if corte is None:
+        return False
+    if desde is None:
+        return historico
+    return desde < corte
+
+
+def _campos_copiados():
+    return [
+        f.attname for f in MovimientoArchivado._meta.concrete_fields
+        if f.attname != 'fecha_archivado'
+    ]
+
+
+def _costos_al_corte(filas, aperturas):
+    """
+    Costo promedio de cada producto tras las filas archivadas (en orden fecha, id),
+    en una sola pasada y partiendo del saldo y costo de apertura que ya tenía.
+    `aperturas`: SaldoApertura existentes de esos productos.
+    """
+    saldos = defaultdict(int)
+    costos = {}
+    for apertura in aperturas:
+        saldos[apertura.producto_id] += apertura.cantidad
+        costos.setdefault(apertura.producto_id, apertura.costo_promedio)
+    productos = Producto.objects.in_bulk({fila['producto_id'] for fila in filas})
+    referencias = {}
+    for mov in filas:
+        producto_id = mov['producto_id']
+        costo = costos.get(producto_id) or 0
+        costo_unitario = mov['costo_unitario']
+        if costo_unitario is None and mov['tipo_movimiento'] == 'ingreso' and not costo:
+            if producto_id not in referencias:
+                referencias[producto_id] = costo_referencia(productos[producto_id])
+            costo_unitario = referencias[producto_id]
+        costos[producto_id] = avanzar_costo(
+            costo, saldos[producto_id], mov['variacion_stock'], costo_unitario, mov['tipo_movimiento']
+        )
+        saldos[producto_id] += mov['variacion_stock']
+    return {producto_id: costos[producto_id] for producto_id in productos}
+
+
+def _archivar_lote(corte, lote):
+    """Traslada hasta `lote` movimientos anteriores al corte; devuelve cuántos"""
+    campos = _campos_copiados()
+    with transaction.atomic():
+        ids = list(
+            MovimientoInventario.objects.select_for_update()
+            .filter(fecha__lt=corte)
+            .order_by('fecha', 'id')
+            .values_list('id', flat=True)[:lote]
+        )
+        if not ids:
+            return 0
+        origen = MovimientoInventario.objects.filter(id__in=ids)
+        ahora = timezone.now()
+        filas = list(origen.order_by('fecha', 'id').values(*campos))
+        MovimientoArchivado.objects.bulk_create([
+            MovimientoArchivado(fecha_archivado=ahora, **fila) for fila in filas
+        ], batch_size=ARCHIVO_LOTE)
+
+        # Todas las aperturas de los productos del lote, bloqueadas en orden (producto, bodega)
+        aperturas = list(
+            SaldoApertura.objects.select_for_update()
+            .filter(producto_id__in={fila['producto_id'] for fila in filas})
+            .order_by('producto_id', 'bodega_id')
+        )
+        costos = _costos_al_corte(filas, aperturas)
+
+        por_par = {(a.producto_id, a.bodega_id): a for a in aperturas}
+        nuevas = []
+        for fila in filas:
+            clave = (fila['producto_id'], fila['bodega_id'])
+            apertura = por_par.get(clave)
+            if apertura is None:
+                apertura = por_par[clave] = SaldoApertura(
+                    producto_id=clave[0], bodega_id=clave[1], cantidad=0, movimientos=0
+                )
+                nuevas.append(apertura)
+            apertura.cantidad += fila['variacion_stock']
+            apertura.movimientos += 1
+            apertura.fecha_corte = corte
+        for apertura in por_par.values():
+            apertura.costo_promedio = costos[apertura.producto_id]
+
+        SaldoApertura.objects.bulk_create(nuevas, batch_size=ARCHIVO_LOTE)
+        SaldoApertura.objects.bulk_update(
+            aperturas, ['cantidad', 'movimientos', 'fecha_corte', 'costo_promedio'], batch_size=ARCHIVO_LOTE
+        )
+        origen.delete()
+    return len(ids)
+
+
+def archivar_movimientos(antes_de=None, lote=ARCHIVO_LOTE, progreso=None):
+    """
+    Archiva los movimientos con fecha < antes_de (por defecto, hoy menos el
+    horizonte) en transacciones de `lote` filas. Devuelve el total archivado.
+    """
+    if antes_de is None:
+        antes_de = timezone.now() - timedelta(days=horizonte_archivo())
+    anterior = corte_vigente()
+    if anterior and antes_de < anterior:
+        raise ValueError(
+            f'El corte solicitado ({antes_de:%Y-%m-%d}) es anterior al vigente ({anterior:%Y-%m-%d})'
+        )
+
+    total = 0
+    while True:
+        movidos = _archivar_lote(antes_de, lote)
+        if not movidos:
+            break
+        total += movidos
+        if progreso:
+            progreso(total)
+    CorteArchivo.objects.create(fecha_corte=antes_de, movimientos=total)
+    return total
+
+
+def saldo_apertura(producto, bodega=None):
+    """Saldo archivado de un producto (en una bodega o en todas)"""
+    qs = SaldoApertura.objects.filter(producto=producto)
+    if bodega is not None:
+        qs = qs.filter(bodega=bodega)
+    return qs.aggregate(total=Sum('cantidad'))['total'] or 0
@@ -0,0 +1,67 @@
+"""
+Texto de búsqueda de movimientos
+MovimientoInventario.texto_busqueda reúne en una columna (minúsculas) el SKU y
+nombre del producto y el RUT y razón social del proveedor. Se calcula al guardar
+el movimiento (señal pre_save) y se recalcula en bloque, con un UPDATE por
+tabla (activa y archivo), cuando cambia el SKU o nombre del producto o el RUT o
+razón social del proveedor.
+"""
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+from ..models import MovimientoArchivado, MovimientoInventario, Producto, Proveedor
+
+REINDEXAR_LOTE = 5000
+
+
+def expresion_texto_busqueda():
+    """Expresión SQL equivalente a MovimientoInventario.componer_texto_busqueda()"""
+    producto = Producto.objects.filter(pk=OuterRef('producto_id'))
+    proveedor = Proveedor.objects.filter(pk=OuterRef('proveedor_id'))
+    vacio = Value('')
+    espacio = Value(' ')
+    return Lower(Concat(
+        Coalesce(Subquery(producto.values('sku')[:1]), vacio), espacio,
+        Coalesce(Subquery(producto.values('nombre')[:1]), vacio), espacio,
+        Coalesce(Subquery(proveedor.values('rut')[:1]), vacio), espacio,
+        Coalesce(Subquery(proveedor.values('razon_social')[:1]), vacio),
+        output_field=CharField(),
+    ))
+
+
+def reindexar_texto_busqueda(queryset):
+    """Recalcula texto_busqueda de los movimientos del queryset; devuelve filas actualizadas"""
+    return queryset.update(texto_busqueda=expresion_texto_busqueda())
+
+
+def reindexar_relacionados(**filtros):
+    """Recalcula el texto de los movimientos activos y archivados que cumplen `filtros`"""
+    return sum(
+        reindexar_texto_busqueda(manager.filter(**filtros))
+        for manager in (MovimientoInventario.objects, MovimientoArchivado.objects)
+    )
+
+
+TABLAS_BUSQUEDA = {
+    'activa': MovimientoInventario,
+    'archivo': MovimientoArchivado,
+}
+
+
+def reindexar_por_lotes(lote=REINDEXAR_LOTE, desde_id=0, progreso=None, tablas=('activa', 'archivo')):
+    """
+    Recalcula todo el texto de búsqueda en tramos de id, para no bloquear la
+    tabla; recorre la tabla activa y el archivo. `desde_id` se aplica en cada tabla.
+    """
+    total = 0
+    for tabla in tablas:
+        modelo = TABLAS_BUSQUEDA[tabla]
+        maximo = modelo.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        inicio = desde_id
+        while inicio <= maximo:
+            fin = inicio + lote
+            total += reindexar_texto_busqueda(modelo.objects.filter(id__gte=inicio, id__lt=fin))
+            if progreso:
+                progreso(tabla, min(fin - 1, maximo), total)
+            inicio = fin
+    return total
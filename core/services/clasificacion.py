@@ -0,0 +1,119 @@
+"""
+Clasificación ABC y valorización
+El valor de consumo anual de cada producto (salidas de los últimos 12 meses ×
+costo promedio) sale de una consulta agrupada; el orden y la suma acumulada
+para cortar las clases A/B/C se hacen con NumPy sobre todos los productos a la
+vez. La clase queda en Producto.clase_abc (columna indexada) para que reportes
+y conteos cíclicos filtren por ella sin recalcularla.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+from ..models import MovimientoArchivado, MovimientoInventario, Producto
+from .archivo import requiere_archivo
+from .fechas import inicio_dia_local
+
+DIAS_CONSUMO = 365
+UMBRAL_A = 0.80
+UMBRAL_B = 0.95
+CLASIFICACION_LOTE = 1000
+
+
+def _valor_salidas():
+    return Sum(
+        ExpressionWrapper(
+            F('cantidad') * F('producto__costo_promedio'),
+            output_field=DecimalField(max_digits=20, decimal_places=2),
+        )
+    )
+
+
+def consumo_anual(hoy=None, dias=DIAS_CONSUMO):
+    """{producto_id: valor de las salidas de los últimos `dias` días al costo promedio}"""
+    hoy = hoy or timezone.localdate()
+    inicio = inicio_dia_local(hoy - timedelta(days=dias))
+    consultas = [MovimientoInventario.objects]
+    if requiere_archivo(inicio):
+        consultas.append(MovimientoArchivado.objects)
+
+    valores = {}
+    for manager in consultas:
+        filas = (
+            manager.filter(tipo_movimiento='salida', fecha__gte=inicio, fecha__lt=inicio_dia_local(hoy))
+            .order_by().values('producto_id').annotate(valor=_valor_salidas())
+        )
+        for fila in filas:
+            valores[fila['producto_id']] = valores.get(fila['producto_id'], Decimal('0')) + (fila['valor'] or 0)
+    return valores
+
+
+def asignar_clases(valores, umbral_a=UMBRAL_A, umbral_b=UMBRAL_B):
+    """
+    Clase de cada valor (mismo orden que `valores`): A hasta el `umbral_a` del
+    valor acumulado, B hasta `umbral_b`, C el resto. Sin consumo siempre es C.
+    """
+    valores = np.asarray(valores, dtype=float)
+    clases = np.full(valores.shape, 'C')
+    total = valores.sum()
+    if total <= 0:
+        return clases
+    orden = np.argsort(-valores, kind='stable')
+    # Participación acumulada antes de cada producto: el que cruza el umbral entra en la clase
+    previa = (np.cumsum(valores[orden]) - valores[orden]) / total
+    ordenadas = np.where(previa < umbral_a, 'A', np.where(previa < umbral_b, 'B', 'C'))
+    ordenadas[valores[orden] <= 0] = 'C'
+    clases[orden] = ordenadas
+    return clases
+
+
+def clasificar_abc(hoy=None, dias=DIAS_CONSUMO, umbral_a=UMBRAL_A, umbral_b=UMBRAL_B):
+    """
+    Recalcula valor_consumo_anual y clase_abc de los productos activos (los
+    inactivos quedan sin clase). Devuelve el resumen por clase.
+    """
+    valores = consumo_anual(hoy, dias)
+    activos = set(Producto.objects.filter(activo=True).values_list('pk', flat=True))
+    productos = [pk for pk in valores if pk in activos]
+    clases = asignar_clases([valores[pk] for pk in productos], umbral_a, umbral_b)
+
+    with transaction.atomic():
+        Producto.objects.filter(activo=False).exclude(clase_abc=None).update(
+            clase_abc=None, valor_consumo_anual=Decimal('0')
+        )
+        # Base: todo activo es C sin consumo; luego solo se escriben los que tuvieron salidas
+        Producto.objects.filter(activo=True).update(clase_abc='C', valor_consumo_anual=Decimal('0'))
+        Producto.objects.bulk_update(
+            [
+                Producto(pk=pk, clase_abc=str(clase), valor_consumo_anual=valores[pk].quantize(Decimal('0.01')))
+                for pk, clase in zip(productos, clases)
+            ],
+            ['clase_abc', 'valor_consumo_anual'],
+            batch_size=CLASIFICACION_LOTE,
+        )
+    return resumen_abc()
+
+
+def resumen_abc():
+    """{clase: {'productos', 'consumo', 'inventario'}} de los productos activos clasificados"""
+    valor_stock = ExpressionWrapper(
+        F('stock_actual') * F('costo_promedio'),
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+    filas = (
+        Producto.objects.filter(activo=True).exclude(clase_abc=None)
+        .order_by().values('clase_abc')
+        .annotate(productos=Count('pk'), consumo=Sum('valor_consumo_anual'), inventario=Sum(valor_stock))
+    )
+    return {
+        fila['clase_abc']: {
+            'productos': fila['productos'],
+            'consumo': fila['consumo'] or Decimal('0'),
+            'inventario': fila['inventario'] or Decimal('0'),
+        }
+        for fila in filas
+    }
@@ -0,0 +1,297 @@
+"""
+Consultas filtradas compartidas
+Las listas, la búsqueda AJAX y las exportaciones aplican exactamente los
+mismos filtros y el mismo orden a partir de los parámetros GET.
+"""
+import hashlib
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from ..models import (
+    MovimientoArchivado, MovimientoInventario, Producto, Proveedor, ResumenDiarioMovimientos, Usuario,
+)
+from .archivo import requiere_archivo
+from .fechas import mes_actual_local, meses_recientes_local, rango_dia_local
+
+
+def parsear_fecha(valor):
+    """Soporta 'YYYY-MM-DD' y también 'DD-MM-AAAA'; formato inválido -> None"""
+    if not valor:
+        return None
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(valor, fmt).date()
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+# ============================================
+# MOVIMIENTOS
+# ============================================
+
+def filtrar_movimientos(params, campo_busqueda='search', modelo=MovimientoInventario):
+    """
+    Movimientos filtrados por búsqueda, tipo y rango de fechas (últimos primero).
+    `modelo` permite aplicar los mismos filtros a MovimientoArchivado.
+    """
+    search = (params.get(campo_busqueda) or '').strip()
+    tipo = (params.get('tipo') or '').strip()
+    desde = parsear_fecha((params.get('desde') or '').strip())
+    hasta = parsear_fecha((params.get('hasta') or '').strip())
+
+    qs = modelo.objects.select_related(
+        'producto', 'bodega', 'proveedor', 'usuario__user'
+    )
+    if search:
+        # Columna desnormalizada (SKU, producto, RUT, razón social) con índice FULLTEXT
+        qs = qs.filter(texto_busqueda__coincide=search)
+    # Ignora filtro si tipo es vacío o "None"
+    if tipo and tipo.lower() != 'none':
+        qs = qs.filter(tipo_movimiento=tipo)
+    # Rango semiabierto en hora local: usa el índice sobre fecha
+    inicio, fin = rango_dia_local(desde, hasta)
+    if inicio:
+        qs = qs.filter(fecha__gte=inicio)
+    if fin:
+        qs = qs.filter(fecha__lt=fin)
+    return qs.order_by('-fecha', '-id')
+
+
+def incluye_archivo(params):
+    """El rango pedido (o ?historico=1 sin fecha desde) alcanza movimientos archivados"""
+    desde = parsear_fecha((params.get('desde') or '').strip())
+    historico = (params.get('historico') or '') in ('1', 'true', 'si')
+    return requiere_archivo(rango_dia_local(desde)[0], historico)
+
+
+def consultas_movimientos(params, campo_busqueda='search'):
+    """
+    Consultas a recorrer para una lista de movimientos: la tabla activa y, solo
+    si el rango lo necesita, el archivo. Ambas con los mismos filtros y orden.
+    """
+    consultas = [filtrar_movimientos(params, campo_busqueda)]
+    if incluye_archivo(params):
+        consultas.append(filtrar_movimientos(params, campo_busqueda, modelo=MovimientoArchivado))
+    return consultas
+
+
+CONTADORES_TTL = 30  # segundos
+FILTROS_MOVIMIENTOS = ('search', 'q', 'tipo', 'desde', 'hasta', 'historico')
+
+
+def contadores_movimientos(params, campo_busqueda='search'):
+    """
+    Totales de la cabecera de la lista (total, ingresos, salidas, este mes) en
+    una sola consulta con Count condicional. Se cachean unos segundos por firma
+    de filtros, así paginar o recargar no vuelve a recorrer el libro completo.
+    """
+    inicio_mes, fin_mes = mes_actual_local()
+    firma = '&'.join(f'{k}={(params.get(k) or "").strip()}' for k in FILTROS_MOVIMIENTOS)
+    clave = 'movimientos:contadores:' + hashlib.md5(
+        f'{campo_busqueda}|{firma}|{inicio_mes:%Y-%m}'.encode('utf-8')
+    ).hexdigest()
+
+    contadores = cache.get(clave)
+    if contadores is None:
+        contadores = dict.fromkeys(('total', 'ingresos', 'salidas', 'este_mes'), 0)
+        for qs in consultas_movimientos(params, campo_busqueda):
+            parcial = qs.order_by().aggregate(
+                total=Count('id'),
+                ingresos=Count('id', filter=Q(tipo_movimiento='ingreso')),
+                salidas=Count('id', filter=Q(tipo_movimiento='salida')),
+                este_mes=Count('id', filter=Q(fecha__gte=inicio_mes, fecha__lt=fin_mes)),
+            )
+            for clave_contador, valor in parcial.items():
+                contadores[clave_contador] += valor
+        cache.set(clave, contadores, CONTADORES_TTL)
+    return contadores
+
+
+MESES_NOMBRES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+
+def movimientos_por_mes(cantidad=6, tipos=('ingreso', 'salida', 'ajuste')):
+    """
+    Cantidad de movimientos por tipo en los últimos `cantidad` meses (hora local).
+    Una sola consulta sobre el resumen diario (no sobre el libro), con una Sum
+    condicional por mes y tipo. Devuelve (etiquetas, {tipo: [conteo por mes]}).
+    """
+    meses = [
+        (mes, timezone.localtime(inicio).date(), timezone.localtime(fin).date())
+        for mes, inicio, fin in meses_recientes_local(cantidad)
+    ]
+    conteos = {
+        f'{tipo}_{i}': Sum('movimientos', filter=Q(tipo_movimiento=tipo, fecha__gte=inicio, fecha__lt=fin))
+        for i, (_, inicio, fin) in enumerate(meses)
+        for tipo in tipos
+    }
+    resultado = ResumenDiarioMovimientos.objects.filter(
+        fecha__gte=meses[0][1], fecha__lt=meses[-1][2]
+    ).aggregate(**conteos)
+    etiquetas = [MESES_NOMBRES[mes - 1] for mes, _, _ in meses]
+    series = {tipo: [resultado[f'{tipo}_{i}'] or 0 for i in range(len(meses))] for tipo in tipos}
+    return etiquetas, series
+
+
+# ============================================
+# PRODUCTOS
+# ============================================
+
+PRODUCTOS_ORDEN_MAP = {
+    'sku': 'sku',
+    'nombre': 'nombre',
+    'categoria': 'categoria__nombre',
+    'stock': 'stock_actual',
+    'precio': 'precio_venta',
+    'estado': 'alerta_bajo_stock',
+}
+
+
+def filtrar_productos(params):
+    """Productos activos con los filtros y el orden de la lista de productos"""
+    buscar = (params.get('buscar') or '').strip()
+    categoria_filtro = (params.get('categoria') or '').strip()
+    estado_filtro = (params.get('estado') or '').strip()
+    clase_filtro = (params.get('clase') or '').strip().upper()
+    orden = (params.get('orden') or 'nombre').lower()
+    direccion = (params.get('dir') or 'asc').lower()
+    dir_prefix = '-' if direccion == 'desc' else ''
+    orden_field = PRODUCTOS_ORDEN_MAP.get(orden, 'nombre')
+
+    productos = Producto.objects.select_related(
+        'categoria', 'uom_compra', 'uom_venta'
+    ).filter(activo=True)
+
+    if buscar:
+        precio_q = Q()
+        try:
+            valor = Decimal(buscar.replace('$', '').replace(',', '.'))
+            precio_q = Q(precio_venta=valor)
+        except (InvalidOperation, AttributeError):
+            pass
+
+        productos = productos.filter(
+            Q(sku__icontains=buscar) |
+            Q(nombre__icontains=buscar) |
+            Q(descripcion__icontains=buscar) |
+            Q(categoria__nombre__icontains=buscar) |
+            Q(marca__icontains=buscar) |
+            Q(modelo__icontains=buscar) |
+            precio_q
+        )
+
+    if categoria_filtro:
+        productos = productos.filter(categoria_id=categoria_filtro)
+
+    if estado_filtro == 'ACTIVO':
+        productos = productos.filter(alerta_bajo_stock=False)
+    elif estado_filtro == 'INACTIVO':
+        productos = productos.filter(alerta_bajo_stock=True)
+
+    if clase_filtro in ('A', 'B', 'C'):
+        productos = productos.filter(clase_abc=clase_filtro)
+
+    return productos.order_by(f'{dir_prefix}{orden_field}', 'nombre')
+
+
+# ============================================
+# PROVEEDORES
+# ============================================
+
+PROVEEDORES_ORDEN_MAP = {
+    'nombre': 'nombre_fantasia',
+    'razon': 'razon_social',
+    'rut': 'rut',
+    'email': 'email',
+    'telefono': 'telefono',
+    'estado': 'estado',
+    'creado': 'fecha_creacion',
+}
+
+
+def filtrar_proveedores(params):
+    """Proveedores con conteo de productos, filtros y orden de la lista"""
+    buscar = (params.get('buscar') or params.get('q') or '').strip()
+    estado_filtro = (params.get('estado') or '').strip().upper()
+    orden = (params.get('orden') or 'nombre').lower()
+    direccion = (params.get('dir') or 'asc').lower()
+    dir_prefix = '' if direccion == 'asc' else '-'
+    orden_field = PROVEEDORES_ORDEN_MAP.get(orden, 'nombre_fantasia')
+
+    proveedores = Proveedor.objects.all().annotate(total_productos=Count('productos', distinct=True))
+
+    if buscar:
+        proveedores = proveedores.filter(
+            Q(nombre_fantasia__icontains=buscar) |
+            Q(razon_social__icontains=buscar) |
+            Q(rut__icontains=buscar) |
+            Q(email__icontains=buscar) |
+            Q(telefono__icontains=buscar) |
+            Q(direccion__icontains=buscar)
+        )
+
+    if estado_filtro in dict(Proveedor.ESTADO_CHOICES):
+        proveedores = proveedores.filter(estado=estado_filtro)
+
+    if orden_field == 'nombre_fantasia':
+        return proveedores.order_by(f'{dir_prefix}nombre_fantasia', f'{dir_prefix}razon_social')
+    return proveedores.order_by(f'{dir_prefix}{orden_field}', 'razon_social')
+
+
+# ============================================
+# USUARIOS
+# ============================================
+
+USUARIOS_ORDEN_MAP = {
+    'username': 'user__username',
+    'nombre': 'user__first_name',
+    'email': 'user__email',
+    'rol': 'rol',
+    'estado': 'user__is_active',
+    'creado': 'user__date_joined',
+}
+
+
+def filtrar_usuarios(params):
+    """Usuarios con los filtros y el orden de la lista de usuarios"""
+    buscar = (params.get('buscar') or '').strip()
+    rol_filtro = (params.get('rol') or '').strip()
+    estado_filtro = (params.get('estado') or '').strip()
+    orden = (params.get('orden') or 'creado').lower()
+    direccion = (params.get('dir') or 'desc').lower()
+    dir_prefix = '-' if direccion == 'desc' else ''
+    orden_field = USUARIOS_ORDEN_MAP.get(orden, 'user__date_joined')
+
+    usuarios = Usuario.objects.select_related('user').all()
+
+    if buscar:
+        usuarios = usuarios.filter(
+            Q(user__username__icontains=buscar) |
+            Q(user__email__icontains=buscar) |
+            Q(user__first_name__icontains=buscar) |
+            Q(user__last_name__icontains=buscar) |
+            Q(telefono__icontains=buscar)
+        )
+
+    if rol_filtro:
+        usuarios = usuarios.filter(rol=rol_filtro)
+
+    if estado_filtro == 'ACTIVO':
+        usuarios = usuarios.filter(user__is_active=True, bloqueado=False)
+    elif estado_filtro == 'INACTIVO':
+        usuarios = usuarios.filter(user__is_active=False, bloqueado=False)
+    elif estado_filtro == 'BLOQUEADO':
+        usuarios = usuarios.filter(bloqueado=True)
+
+    if orden == 'nombre':
+        return usuarios.order_by(
+            f'{dir_prefix}user__first_name',
+            f'{dir_prefix}user__last_name',
+            '-user__date_joined'
+        )
+    return usuarios.order_by(f'{dir_prefix}{orden_field}', '-user__date_joined')
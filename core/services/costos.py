@@ -0,0 +1,147 @@
+"""
+Costo promedio ponderado
+Reglas compartidas por la contabilización, el kardex y el archivado: solo un
+ingreso con costo conocido cambia el promedio; el resto de movimientos sale o
+entra al costo vigente. El redondeo es el de la columna Producto.costo_promedio.
+El recálculo masivo recorre el libro por tramos de productos: una lectura en
+orden (producto, fecha, id) y un UPDATE con CASE por tramo.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Value, When
+
+from ..models import MovimientoArchivado, MovimientoInventario, Producto, ProveedorProducto, SaldoApertura
+
+CENTAVO = Decimal('0.01')
+RECALCULO_LOTE = 500
+RECALCULO_CHUNK_SIZE = 5000
+
+
+def redondear_costo(valor):
+    """Mismo redondeo que la columna Producto.costo_promedio (2 decimales)"""
+    return Decimal(valor).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def costo_referencia(producto):
+    """Costo para ingresos antiguos sin costo registrado cuando aún no hay promedio"""
+    return producto.costo_estandar
+
+
+def avanzar_costo(costo, saldo, variacion, costo_unitario, tipo):
+    """
+    Costo promedio tras un movimiento, dado el saldo total anterior:
+    (saldo * costo + entrada * costo_unitario) / (saldo + entrada).
+    Con saldo nulo o negativo el ingreso fija el costo.
+    """
+    if tipo != 'ingreso' or variacion <= 0 or costo_unitario is None:
+        return costo
+    if saldo <= 0:
+        return redondear_costo(costo_unitario)
+    return redondear_costo((saldo * costo + variacion * costo_unitario) / (saldo + variacion))
+
+
+def costo_de_ingreso(producto, costo_unitario=None, proveedor=None, costo_vigente=None):
+    """
+    Costo unitario de un ingreso: el informado; si no, el pactado con el
+    proveedor; si no, el promedio vigente; y como último recurso el estándar.
+    """
+    if costo_unitario not in (None, ''):
+        return redondear_costo(costo_unitario)
+    if proveedor is not None:
+        pactado = ProveedorProducto.objects.filter(
+            proveedor=proveedor, producto_id=producto.pk, costo__gt=0
+        ).values_list('costo', flat=True).first()
+        if pactado is not None:
+            return pactado
+    if costo_vigente:
+        return costo_vigente
+    return producto.costo_estandar
+
+
+# ============================================
+# RECÁLCULO MASIVO
+# ============================================
+
+def _recorrer_libro(modelo, ids, estado, referencias, chunk_size):
+    """Aplica al `estado` ({producto_id: [saldo, costo]}) los movimientos de `modelo` de esos productos"""
+    filas = (
+        modelo.objects.filter(producto_id__in=ids)
+        .order_by('producto_id', 'fecha', 'id')
+        .values_list('producto_id', 'tipo_movimiento', 'variacion_stock', 'costo_unitario')
+        .iterator(chunk_size=chunk_size)
+    )
+    for producto_id, tipo, variacion, costo_unitario in filas:
+        saldo_costo = estado.setdefault(producto_id, [0, Decimal('0.00')])
+        saldo, costo = saldo_costo
+        if costo_unitario is None and tipo == 'ingreso' and not costo:
+            costo_unitario = referencias[producto_id]
+        saldo_costo[1] = avanzar_costo(costo, saldo, variacion, costo_unitario, tipo)
+        saldo_costo[0] = saldo + variacion
+
+
+def _costo_por_producto(campo_id, costos):
+    return Case(
+        *[When(**{campo_id: producto_id}, then=Value(costo)) for producto_id, costo in costos.items()],
+        default=None,
+    )
+
+
+def _recalcular_tramo(ids, historico, chunk_size):
+    """Costo promedio de un tramo de productos; devuelve cuántos cambiaron"""
+    # Bloqueo en orden de id: la contabilización no cambia el costo a mitad del tramo
+    productos = {
+        p['id']: p for p in Producto.objects.select_for_update().filter(pk__in=ids).order_by('pk')
+        .values('id', 'costo_promedio', 'costo_estandar')
+    }
+    referencias = {pk: p['costo_estandar'] for pk, p in productos.items()}
+    estado = {}
+    if historico:
+        _recorrer_libro(MovimientoArchivado, ids, estado, referencias, chunk_size)
+        aperturas = {pk: costo for pk, (_, costo) in estado.items()}
+        if aperturas:
+            SaldoApertura.objects.filter(producto_id__in=aperturas).update(
+                costo_promedio=_costo_por_producto('producto_id', aperturas)
+            )
+    else:
+        for apertura in SaldoApertura.objects.filter(producto_id__in=ids).values('producto_id', 'cantidad', 'costo_promedio'):
+            saldo_costo = estado.setdefault(apertura['producto_id'], [0, apertura['costo_promedio']])
+            saldo_costo[0] += apertura['cantidad']
+    _recorrer_libro(MovimientoInventario, ids, estado, referencias, chunk_size)
+
+    cambios = {
+        pk: costo for pk, (_, costo) in estado.items()
+        if costo != productos[pk]['costo_promedio']
+    }
+    if cambios:
+        Producto.objects.filter(pk__in=cambios).update(costo_promedio=_costo_por_producto('pk', cambios))
+    return len(cambios)
+
+
+def recalcular_costo_productos(ids):
+    """Rehace el costo promedio de algunos productos (p. ej. tras anular o editar un ingreso)"""
+    return _recalcular_tramo(sorted(ids), False, RECALCULO_CHUNK_SIZE)
+
+
+def recalcular_costos_promedio(lote=RECALCULO_LOTE, historico=False, chunk_size=RECALCULO_CHUNK_SIZE, progreso=None):
+    """
+    Reconstruye Producto.costo_promedio desde el libro, en tramos de `lote`
+    productos por id. Parte del SaldoApertura de cada producto o, con
+    `historico`, del archivo completo (y de paso corrige el costo de apertura).
+    Devuelve (productos revisados, productos con costo corregido).
+    """
+    revisados = corregidos = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Producto.objects.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            corregidos += _recalcular_tramo(ids, historico, chunk_size)
+        revisados += len(ids)
+        ultimo_id = ids[-1]
+        if progreso:
+            progreso(revisados, corregidos)
+    return revisados, corregidos
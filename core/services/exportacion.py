@@ -0,0 +1,365 @@
+"""
+Motor de exportación
+Recibe una consulta, una especificación de columnas y un formato (XLSX, CSV o
+JSON Lines) y produce el archivo por bloques: las filas se leen con
+.iterator(chunk_size=...) y se codifican a medida que llegan, sin cargar la
+consulta completa en memoria.
+"""
+import csv
+import heapq
+import json
+import tempfile
+from datetime import datetime
+from operator import attrgetter
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from .consultas import consultas_movimientos, filtrar_productos, filtrar_proveedores, filtrar_usuarios
+from .kardex import kardex_desde_params
+
+
+EXPORT_CHUNK_SIZE = 2000
+BLOQUE_BYTES = 64 * 1024
+
+FORMATOS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Columna:
+    """Columna exportable: título, cómo obtener el valor y formato en Excel"""
+
+    def __init__(self, titulo, valor, ancho=15, izquierda=False):
+        self.titulo = titulo
+        self.valor = valor if callable(valor) else attrgetter(valor)
+        self.ancho = ancho
+        self.izquierda = izquierda
+
+
+def formato_solicitado(params):
+    formato = (params.get('formato') or 'xlsx').lower()
+    return formato if formato in FORMATOS else 'xlsx'
+
+
+def _objetos(consulta, chunk_size):
+    """
+    Objetos de un queryset leídos por bloques. Con una lista de querysets
+    (tabla activa y archivo de movimientos) se mezclan en orden (-fecha, -id)
+    sin materializarlos.
+    """
+    if not isinstance(consulta, (list, tuple)):
+        return consulta.iterator(chunk_size=chunk_size)
+    if len(consulta) == 1:
+        return consulta[0].iterator(chunk_size=chunk_size)
+    return heapq.merge(
+        *(qs.iterator(chunk_size=chunk_size) for qs in consulta),
+        key=lambda obj: (obj.fecha, obj.pk),
+        reverse=True,
+    )
+
+
+def contar_filas(consulta):
+    if isinstance(consulta, (list, tuple)):
+        return sum(qs.count() for qs in consulta)
+    return consulta.count()
+
+
+def iterar_filas(consulta, columnas, chunk_size=EXPORT_CHUNK_SIZE, progreso=None):
+    """
+    Filas (listas de valores) leídas por bloques desde la base de datos.
+    Si se entrega `progreso`, se llama con las filas emitidas al cerrar cada bloque.
+    """
+    emitidas = 0
+    for obj in _objetos(consulta, chunk_size):
+        yield [c.valor(obj) for c in columnas]
+        emitidas += 1
+        if progreso and emitidas % chunk_size == 0:
+            progreso(emitidas)
+    if progreso:
+        progreso(emitidas)
+
+
+# ============================================
+# CODIFICADORES
+# ============================================
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de escribirla"""
+
+    def write(self, value):
+        return value
+
+
+def _generar_csv(filas, columnas, filas_por_bloque=500):
+    writer = csv.writer(_Eco())
+    bloque = ['\ufeff' + writer.writerow([c.titulo for c in columnas])]
+    for fila in filas:
+        bloque.append(writer.writerow(fila))
+        if len(bloque) >= filas_por_bloque:
+            yield ''.join(bloque).encode('utf-8')
+            bloque = []
+    if bloque:
+        yield ''.join(bloque).encode('utf-8')
+
+
+def _generar_jsonl(filas, columnas, filas_por_bloque=500):
+    titulos = [c.titulo for c in columnas]
+    bloque = []
+    for fila in filas:
+        bloque.append(json.dumps(dict(zip(titulos, fila)), ensure_ascii=False, default=str))
+        if len(bloque) >= filas_por_bloque:
+            yield ('\n'.join(bloque) + '\n').encode('utf-8')
+            bloque = []
+    if bloque:
+        yield ('\n'.join(bloque) + '\n').encode('utf-8')
+
+
+_borde_fino = Border(
+    top=Side(border_style="thin", color="CCCCCC"),
+    left=Side(border_style="thin", color="CCCCCC"),
+    right=Side(border_style="thin", color="CCCCCC"),
+    bottom=Side(border_style="thin", color="CCCCCC"),
+)
+_zebra = PatternFill("solid", fgColor="FFF5F5")
+_centro = Alignment(horizontal="center", vertical="center")
+_izquierda = Alignment(horizontal="left", vertical="center")
+
+
+def _estilos_reporte():
+    """Estilos nuevos por libro (NamedStyle queda ligado al workbook al registrarlo)"""
+    return [
+        NamedStyle(name="rep_titulo", font=Font(color="FFFFFF", bold=True, size=16),
+                   fill=PatternFill("solid", fgColor="B91C1C"), alignment=_centro),
+        NamedStyle(name="rep_subtitulo", font=Font(italic=True, size=11), alignment=_centro),
+        NamedStyle(name="rep_encabezado", font=Font(color="FFFFFF", bold=True, size=11),
+                   fill=PatternFill("solid", fgColor="DC2626"), alignment=_centro),
+        NamedStyle(name="rep_centro", border=_borde_fino, alignment=_centro),
+        NamedStyle(name="rep_izquierda", border=_borde_fino, alignment=_izquierda),
+        NamedStyle(name="rep_centro_zebra", border=_borde_fino, alignment=_centro, fill=_zebra),
+        NamedStyle(name="rep_izquierda_zebra", border=_borde_fino, alignment=_izquierda, fill=_zebra),
+        NamedStyle(name="rep_total", font=Font(bold=True), border=_borde_fino),
+    ]
+
+
+def _celda(ws, valor, estilo):
+    cell = WriteOnlyCell(ws, value=valor)
+    cell.style = estilo
+    return cell
+
+
+def escribir_xlsx(filas, columnas, destino, titulo, etiqueta_total, hoja='Datos'):
+    """
+    Escribe el libro en modo write-only de openpyxl: cada fila se vuelca a disco
+    al agregarla y las celdas solo referencian estilos con nombre.
+    """
+    total_cols = len(columnas)
+    ultima_col = get_column_letter(total_cols)
+
+    wb = Workbook(write_only=True)
+    for estilo in _estilos_reporte():
+        wb.add_named_style(estilo)
+    ws = wb.create_sheet(hoja)
+    for i, columna in enumerate(columnas, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = columna.ancho
+    ws.freeze_panes = "A5"
+
+    ws.append([_celda(ws, titulo, "rep_titulo")])
+    ws.merged_cells.add(f"A1:{ultima_col}1")
+    ws.append([_celda(ws, f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", "rep_subtitulo")])
+    ws.merged_cells.add(f"A2:{ultima_col}2")
+    ws.append([])
+    ws.append([_celda(ws, c.titulo, "rep_encabezado") for c in columnas])
+
+    estilos = [("rep_izquierda" if c.izquierda else "rep_centro") for c in columnas]
+    total = 0
+    for fila in filas:
+        total += 1
+        sufijo = "_zebra" if total % 2 == 0 else ""
+        ws.append([_celda(ws, valor, estilo + sufijo) for valor, estilo in zip(fila, estilos)])
+
+    fila_total = total + 5
+    ws.append(
+        [_celda(ws, f"TOTAL DE {etiqueta_total}:", "rep_total")]
+        + [_celda(ws, None, "rep_total") for _ in range(total_cols - 2)]
+        + [_celda(ws, total, "rep_total")]
+    )
+    if total_cols > 2:
+        ws.merged_cells.add(f"A{fila_total}:{get_column_letter(total_cols - 1)}{fila_total}")
+    ws.auto_filter.ref = f"A4:{ultima_col}{fila_total}"
+
+    wb.save(destino)
+    return total
+
+
+def _generar_xlsx(filas, columnas, titulo, etiqueta_total):
+    archivo = tempfile.TemporaryFile()
+    try:
+        escribir_xlsx(filas, columnas, archivo, titulo, etiqueta_total)
+        archivo.seek(0)
+        while True:
+            datos = archivo.read(BLOQUE_BYTES)
+            if not datos:
+                break
+            yield datos
+    finally:
+        archivo.close()
+
+
+def generar_exportacion(queryset, columnas, formato, titulo='', etiqueta_total='REGISTROS',
+                        chunk_size=EXPORT_CHUNK_SIZE, progreso=None):
+    """Generador de bytes del archivo exportado"""
+    filas = iterar_filas(queryset, columnas, chunk_size, progreso)
+    if formato == 'csv':
+        return _generar_csv(filas, columnas)
+    if formato == 'jsonl':
+        return _generar_jsonl(filas, columnas)
+    return _generar_xlsx(filas, columnas, titulo, etiqueta_total)
+
+
+def escribir_exportacion(queryset, columnas, formato, destino, titulo='', etiqueta_total='REGISTROS',
+                         chunk_size=EXPORT_CHUNK_SIZE, progreso=None):
+    """Escribe el archivo exportado en `destino` (archivo binario abierto)"""
+    if formato == 'xlsx':
+        filas = iterar_filas(queryset, columnas, chunk_size, progreso)
+        escribir_xlsx(filas, columnas, destino, titulo, etiqueta_total)
+        return
+    for bloque in generar_exportacion(queryset, columnas, formato, titulo, etiqueta_total,
+                                      chunk_size, progreso):
+        destino.write(bloque)
+
+
+def respuesta_exportacion(queryset, columnas, formato, nombre, titulo='', etiqueta_total='REGISTROS'):
+    """StreamingHttpResponse con el archivo exportado como adjunto"""
+    resp = StreamingHttpResponse(
+        generar_exportacion(queryset, columnas, formato, titulo, etiqueta_total),
+        content_type=FORMATOS[formato],
+    )
+    filename = f"{nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+    resp['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return resp
+
+
+# ============================================
+# EXPORTACIONES DISPONIBLES
+# ============================================
+
+def _fecha_local(valor, formato='%Y-%m-%d %H:%M'):
+    return timezone.localtime(valor).strftime(formato) if valor else ''
+
+
+def _nombre_usuario(user):
+    return user.get_full_name() or user.username
+
+
+COLUMNAS_MOVIMIENTOS = [
+    Columna("Fecha", lambda m: _fecha_local(m.fecha), 20),
+    Columna("Tipo", lambda m: m.get_tipo_movimiento_display(), 12),
+    Columna("SKU", 'producto.sku', 14, izquierda=True),
+    Columna("Producto", 'producto.nombre', 36, izquierda=True),
+    Columna("Proveedor", lambda m: f"{m.proveedor.rut} - {m.proveedor.razon_social}" if m.proveedor else "", 28, izquierda=True),
+    Columna("Bodega", 'bodega.codigo', 14),
+    Columna("Cantidad", 'cantidad', 12),
+    Columna("Lote", lambda m: m.lote or "", 14),
+    Columna("Serie", lambda m: m.numero_serie or "", 14),
+    Columna("Vence", lambda m: m.fecha_vencimiento.strftime('%Y-%m-%d') if m.fecha_vencimiento else "", 14),
+    Columna("Doc Ref", lambda m: m.documento_numero or "", 16, izquierda=True),
+    Columna("Usuario", lambda m: _nombre_usuario(m.usuario.user) if m.usuario_id else "", 24, izquierda=True),
+]
+
+COLUMNAS_KARDEX = [
+    Columna("Fecha", lambda l: _fecha_local(l.fecha), 20),
+    Columna("Tipo", lambda l: l.movimiento.get_tipo_movimiento_display(), 14),
+    Columna("Bodega", 'movimiento.bodega.codigo', 12),
+    Columna("Documento", lambda l: " ".join(filter(None, [l.movimiento.documento_tipo, l.movimiento.documento_numero])), 22, izquierda=True),
+    Columna("Proveedor", lambda l: l.movimiento.proveedor.razon_social if l.movimiento.proveedor else "", 28, izquierda=True),
+    Columna("Entrada", 'entrada', 12),
+    Columna("Salida", 'salida', 12),
+    Columna("Saldo", 'saldo', 12),
+    Columna("Costo Unitario", lambda l: float(l.costo_unitario), 15),
+    Columna("Costo Promedio", lambda l: float(l.costo_promedio), 15),
+    Columna("Valor Saldo", lambda l: float(l.valor_saldo), 16),
+]
+
+COLUMNAS_PRODUCTOS = [
+    Columna("SKU", 'sku', 15, izquierda=True),
+    Columna("Nombre", 'nombre', 35, izquierda=True),
+    Columna("Categoría", lambda p: p.categoria.nombre if p.categoria else 'Sin categoría', 20, izquierda=True),
+    Columna("Stock Actual", lambda p: float(p.stock_actual), 15),
+    Columna("Stock Mínimo", lambda p: float(p.stock_minimo), 15),
+    Columna("Precio Venta", lambda p: float(p.precio_venta), 15),
+    Columna("Estado Stock", lambda p: '⚠️ Stock Bajo' if p.alerta_bajo_stock else '✅ Stock OK', 18),
+    Columna("Marca", lambda p: p.marca or 'N/A', 15, izquierda=True),
+]
+
+COLUMNAS_PROVEEDORES = [
+    Columna("ID", 'id', 8),
+    Columna("Nombre (fantasía / razón social)", 'nombre_display', 46, izquierda=True),
+    Columna("RUT", 'rut', 16),
+    Columna("Email", lambda p: p.email or "", 30, izquierda=True),
+    Columna("Teléfono", lambda p: p.telefono or "", 16, izquierda=True),
+    Columna("Dirección", lambda p: p.direccion or "", 34, izquierda=True),
+    Columna("Estado", lambda p: p.get_estado_display(), 12),
+    Columna("Productos", lambda p: getattr(p, 'total_productos', 0), 12),
+    Columna("Creado", lambda p: _fecha_local(p.fecha_creacion), 18),
+]
+
+COLUMNAS_USUARIOS = [
+    Columna("Usuario", 'user.username', 18, izquierda=True),
+    Columna("Nombre", lambda u: u.user.get_full_name() or "—", 34, izquierda=True),
+    Columna("Email", 'user.email', 36, izquierda=True),
+    Columna("Rol", lambda u: u.get_rol_display(), 18),
+    Columna("Estado", lambda u: "ACTIVO" if u.user.is_active else "INACTIVO", 16),
+]
+
+EXPORTACIONES = {
+    'movimientos': {
+        'consulta': consultas_movimientos,
+        'columnas': COLUMNAS_MOVIMIENTOS,
+        'titulo': 'REPORTE DE MOVIMIENTOS - DULCERÍA LILIS',
+        'etiqueta_total': 'MOVIMIENTOS',
+    },
+    'kardex': {
+        'consulta': kardex_desde_params,
+        'columnas': COLUMNAS_KARDEX,
+        'titulo': 'KARDEX DE PRODUCTO - DULCERÍA LILIS',
+        'etiqueta_total': 'MOVIMIENTOS',
+    },
+    'productos': {
+        'consulta': filtrar_productos,
+        'columnas': COLUMNAS_PRODUCTOS,
+        'titulo': 'REPORTE DE PRODUCTOS - DULCERÍA LILIS',
+        'etiqueta_total': 'PRODUCTOS',
+    },
+    'proveedores': {
+        'consulta': filtrar_proveedores,
+        'columnas': COLUMNAS_PROVEEDORES,
+        'titulo': 'REPORTE DE PROVEEDORES - DULCERÍA LILIS',
+        'etiqueta_total': 'PROVEEDORES',
+    },
+    'usuarios': {
+        'consulta': filtrar_usuarios,
+        'columnas': COLUMNAS_USUARIOS,
+        'titulo': 'REPORTE DE USUARIOS - DULCERÍA LILIS',
+        'etiqueta_total': 'USUARIOS',
+    },
+}
+
+
+def exportar_entidad(entidad, params):
+    """Respuesta de exportación de una entidad con los filtros de su lista"""
+    spec = EXPORTACIONES[entidad]
+    return respuesta_exportacion(
+        spec['consulta'](params),
+        spec['columnas'],
+        formato_solicitado(params),
+        nombre=entidad,
+        titulo=spec['titulo'],
+        etiqueta_total=spec['etiqueta_total'],
+    )
@@ -0,0 +1,46 @@
+"""
+Rangos de fechas en la zona horaria local
+Los filtros por día o mes se expresan como rangos semiabiertos [inicio, fin)
+sobre la columna DateTime, en vez de fecha__date / fecha__month / fecha__year,
+que con USE_TZ se traducen a funciones sobre la columna y no usan índices.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def inicio_dia_local(dia):
+    """Medianoche local (aware) del día dado"""
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def rango_dia_local(desde=None, hasta=None):
+    """[inicio de `desde`, inicio del día siguiente a `hasta`) en hora local; extremos opcionales"""
+    inicio = inicio_dia_local(desde) if desde else None
+    fin = inicio_dia_local(hasta + timedelta(days=1)) if hasta else None
+    return inicio, fin
+
+
+def rango_mes_local(anio, mes):
+    """[primer instante del mes, primer instante del mes siguiente) en hora local"""
+    siguiente = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return (
+        timezone.make_aware(datetime(anio, mes, 1)),
+        timezone.make_aware(datetime(siguiente[0], siguiente[1], 1)),
+    )
+
+
+def mes_actual_local(ahora=None):
+    ahora = timezone.localtime(ahora)
+    return rango_mes_local(ahora.year, ahora.month)
+
+
+def meses_recientes_local(cantidad, ahora=None):
+    """Rangos de los últimos `cantidad` meses (incluido el actual), del más antiguo al más reciente"""
+    ahora = timezone.localtime(ahora)
+    anio, mes = ahora.year, ahora.month
+    rangos = []
+    for _ in range(cantidad):
+        rangos.append((mes,) + rango_mes_local(anio, mes))
+        anio, mes = (anio - 1, 12) if mes == 1 else (anio, mes - 1)
+    return rangos[::-1]
@@ -0,0 +1,76 @@
+"""
+Idempotencia de las operaciones que crean movimientos
+El cliente (formulario o escáner) envía una clave única por operación. La clave
+se inserta en ClaveIdempotencia en la misma transacción que contabiliza: si un
+reintento llega mientras la primera sigue en curso, el índice único lo hace
+esperar y luego recibe el resultado guardado; si la contabilización falla, la
+clave se descarta con ella y el reintento vuelve a intentarlo.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ..models import ClaveIdempotencia
+
+IDEMPOTENCIA_HORAS_DEFECTO = 24
+IDEMPOTENCIA_LOTE = 5000
+LARGO_CLAVE = 64
+
+
+def vigencia_claves():
+    """Horas que se conserva una clave (settings.IDEMPOTENCIA_HORAS)"""
+    return getattr(settings, 'IDEMPOTENCIA_HORAS', IDEMPOTENCIA_HORAS_DEFECTO)
+
+
+def ejecutar_una_vez(usuario, clave, operacion, funcion):
+    """
+    Ejecuta `funcion()` (que devuelve la referencia del resultado, p. ej. el id
+    del movimiento) una sola vez por usuario y clave.
+    Devuelve (referencia, repetida). Sin clave, simplemente ejecuta.
+    ValueError si la clave ya se usó para otra operación.
+    """
+    if not clave:
+        return str(funcion()), False
+    clave = clave[:LARGO_CLAVE]
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                registro = ClaveIdempotencia.objects.create(usuario=usuario, clave=clave, operacion=operacion)
+        except IntegrityError:
+            # Lectura con bloqueo: ve la fila ya confirmada por la otra transacción
+            existente = ClaveIdempotencia.objects.select_for_update().get(usuario=usuario, clave=clave)
+            if existente.operacion != operacion:
+                raise ValueError('La clave de la solicitud ya se usó para otra operación')
+            return existente.referencia, True
+        referencia = str(funcion())
+        ClaveIdempotencia.objects.filter(pk=registro.pk).update(referencia=referencia)
+    return referencia, False
+
+
+def resultado_previo(usuario, clave):
+    """Referencia guardada para la clave del usuario, o None si no se ha usado"""
+    if not clave:
+        return None
+    return ClaveIdempotencia.objects.filter(usuario=usuario, clave=clave[:LARGO_CLAVE]).values_list(
+        'referencia', flat=True
+    ).first()
+
+
+def limpiar_claves(horas=None, lote=IDEMPOTENCIA_LOTE, progreso=None):
+    """Borra las claves más antiguas que `horas` en tandas de `lote`; devuelve cuántas"""
+    limite = timezone.now() - timedelta(hours=vigencia_claves() if horas is None else horas)
+    total = 0
+    while True:
+        ids = list(
+            ClaveIdempotencia.objects.filter(fecha_creacion__lt=limite)
+            .order_by('fecha_creacion').values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            break
+        borradas, _ = ClaveIdempotencia.objects.filter(pk__in=ids).delete()
+        total += borradas
+        if progreso:
+            progreso(total)
+    return total
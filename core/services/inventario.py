@@ -0,0 +1,230 @@
+"""
+Motor de contabilización de inventario
+Toda variación de stock pasa por aquí: se registra el movimiento, se actualiza
+el saldo de la bodega (StockBodega) y el stock total del producto en una sola
+transacción corta, con el producto bloqueado (SELECT ... FOR UPDATE) y los
+saldos modificados con incrementos en la base de datos. El costo promedio
+ponderado se calcula con el stock y el costo leídos al bloquear y se escribe en
+el mismo UPDATE del producto.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from ..models import MovimientoInventario, Producto, StockBodega
+from .costos import avanzar_costo, costo_de_ingreso, recalcular_costo_productos
+from .lotes import aplicar_lotes, revertir_asignaciones, validar_lotes
+from .resumen import acumular_en_resumen
+from .snapshots import marcar_dias_afectados
+
+
+TIPOS_ENTRADA = ('ingreso', 'devolucion')
+TIPOS_SALIDA = ('salida',)
+
+
+def calcular_variacion(tipo, cantidad, saldo_actual):
+    """
+    Variación que un movimiento produce sobre el saldo de su bodega.
+    - ingreso / devolución: suma la cantidad
+    - salida: resta la cantidad
+    - ajuste: deja el saldo de la bodega en la cantidad contada
+    Las transferencias no pasan por aquí: registrar_transferencia crea los dos
+    tramos con su variación.
+    """
+    if tipo in TIPOS_ENTRADA:
+        return cantidad
+    if tipo in TIPOS_SALIDA:
+        return -cantidad
+    if tipo == 'ajuste':
+        return cantidad - saldo_actual
+    raise ValueError(f'Tipo de movimiento inválido: {tipo}')
+
+
+def _rechazar_tipo_transferencia(tipo):
+    """
+    Un movimiento 'transferencia' suelto (sin transferencia_id ni su tramo
+    opuesto) descuadraría las bodegas: los pares solo los crea
+    services.transferencias.registrar_transferencia.
+    """
+    if tipo == 'transferencia':
+        raise ValueError('Las transferencias se registran con bodega de origen y destino (registrar_transferencia)')
+
+
+def _bloquear_saldo(producto, bodega):
+    """
+    Bloquea el producto y su saldo en la bodega hasta el fin de la transacción.
+    Orden fijo de bloqueo (producto -> saldo) para que dos contabilizaciones
+    sobre el mismo SKU se serialicen sin interbloqueos.
+    Devuelve (saldo de la bodega, stock total, costo promedio) ya bloqueados.
+    """
+    stock, costo = (
+        Producto.objects.select_for_update().filter(pk=producto.pk)
+        .values_list('stock_actual', 'costo_promedio').get()
+    )
+    saldo, _ = StockBodega.objects.select_for_update().get_or_create(
+        producto_id=producto.pk, bodega_id=bodega.pk
+    )
+    return saldo, stock, costo
+
+
+def _aplicar_variacion(saldo, variacion, costo_promedio=None):
+    """
+    Actualiza el saldo de la bodega y, en un solo UPDATE, el stock total, la
+    alerta y (si cambió) el costo promedio del producto.
+    """
+    if not variacion:
+        return
+    StockBodega.objects.filter(pk=saldo.pk).update(
+        cantidad=F('cantidad') + variacion,
+        fecha_modificacion=timezone.now(),
+    )
+    saldo.cantidad += variacion
+
+    cambios = {
+        # La alerta va antes que el stock: se evalúa con el valor previo
+        'alerta_bajo_stock': Case(
+            When(stock_actual__lte=F('stock_minimo') - variacion, then=Value(True)),
+            default=Value(False),
+        ),
+        'stock_actual': F('stock_actual') + variacion,
+    }
+    if costo_promedio is not None:
+        cambios['costo_promedio'] = costo_promedio
+    Producto.objects.filter(pk=saldo.producto_id).update(**cambios)
+
+
+def registrar_movimiento(*, tipo_movimiento, producto, bodega, cantidad, usuario, fecha=None, **campos):
+    """
+    Registra un movimiento y aplica su efecto sobre el stock y el costo promedio.
+    Un ingreso sin `costo_unitario` toma el costo del proveedor, el promedio
+    vigente o el costo estándar; el costo usado queda en el movimiento.
+    Devuelve el MovimientoInventario creado.
+    """
+    tipo_movimiento = tipo_movimiento.lower()
+    _rechazar_tipo_transferencia(tipo_movimiento)
+    with transaction.atomic():
+        saldo, stock, costo = _bloquear_saldo(producto, bodega)
+        variacion = calcular_variacion(tipo_movimiento, cantidad, saldo.cantidad)
+        if tipo_movimiento == 'ingreso':
+            campos['costo_unitario'] = costo_de_ingreso(
+                producto, campos.get('costo_unitario'), campos.get('proveedor'), costo
+            )
+        nuevo_costo = avanzar_costo(costo, stock, variacion, campos.get('costo_unitario'), tipo_movimiento)
+
+        movimiento = MovimientoInventario.objects.create(
+            tipo_movimiento=tipo_movimiento,
+            producto=producto,
+            bodega=bodega,
+            cantidad=cantidad,
+            usuario=usuario,
+            fecha=fecha or timezone.now(),
+            variacion_stock=variacion,
+            **campos
+        )
+        _aplicar_variacion(saldo, variacion, nuevo_costo if nuevo_costo != costo else None)
+        aplicar_lotes(movimiento)
+        acumular_en_resumen([movimiento])
+        marcar_dias_afectados(movimiento.fecha)
+    return movimiento
+
+
+def _rechazar_transferencia(movimiento):
+    """Un tramo de transferencia no se edita ni anula por separado (descuadraría el par)"""
+    if movimiento.transferencia_id:
+        raise ValueError('El movimiento es parte de una transferencia; anula la transferencia completa')
+
+
+def anular_movimiento(movimiento):
+    """
+    Elimina un movimiento revirtiendo el efecto que tuvo sobre el stock.
+    El costo promedio del producto se rehace desde el libro (el saldo con que
+    se ponderaron los ingresos posteriores cambió). Los movimientos de una
+    transferencia se anulan juntos con services.transferencias.anular_transferencia.
+    """
+    _rechazar_transferencia(movimiento)
+    with transaction.atomic():
+        saldo, _, _ = _bloquear_saldo(movimiento.producto, movimiento.bodega)
+        original = MovimientoInventario.objects.select_for_update().get(pk=movimiento.pk)
+        _aplicar_variacion(saldo, -original.variacion_stock)
+        validar_lotes(revertir_asignaciones(original))
+        acumular_en_resumen([original], signo=-1)
+        marcar_dias_afectados(original.fecha)
+        original.delete()
+        recalcular_costo_productos([original.producto_id])
+
+
+def modificar_movimiento(movimiento):
+    """
+    Guarda los cambios de un movimiento ya contabilizado: revierte el efecto
+    original y aplica el nuevo (puede cambiar de producto o bodega).
+    Los productos y luego los saldos se bloquean en orden de id.
+    """
+    _rechazar_transferencia(movimiento)
+    _rechazar_tipo_transferencia(movimiento.tipo_movimiento.lower())
+    with transaction.atomic():
+        producto_id, bodega_id = MovimientoInventario.objects.filter(pk=movimiento.pk).values_list(
+            'producto_id', 'bodega_id'
+        ).get()
+        productos = sorted({producto_id, movimiento.producto_id})
+        list(Producto.objects.select_for_update().filter(pk__in=productos).order_by('pk').values_list('pk', flat=True))
+        original = MovimientoInventario.objects.select_for_update().get(pk=movimiento.pk)
+
+        saldos = {}
+        for clave in sorted({(original.producto_id, original.bodega_id), (movimiento.producto_id, movimiento.bodega_id)}):
+            saldos[clave], _ = StockBodega.objects.select_for_update().get_or_create(
+                producto_id=clave[0], bodega_id=clave[1]
+            )
+        _aplicar_variacion(saldos[(original.producto_id, original.bodega_id)], -original.variacion_stock)
+        lotes = revertir_asignaciones(original)
+        acumular_en_resumen([original], signo=-1)
+
+        tipo = movimiento.tipo_movimiento = movimiento.tipo_movimiento.lower()
+        if tipo == 'salida' and len(lotes) > 1 and movimiento.lote == original.lote:
+            # El lote mostrado es el primero que eligió FEFO entre varios: se vuelve a asignar por FEFO
+            movimiento.lote = movimiento.fecha_vencimiento = None
+        saldo = saldos[(movimiento.producto_id, movimiento.bodega_id)]
+        variacion = calcular_variacion(tipo, movimiento.cantidad, saldo.cantidad)
+        if tipo == 'ingreso':
+            movimiento.costo_unitario = costo_de_ingreso(
+                movimiento.producto, movimiento.costo_unitario, movimiento.proveedor,
+                Producto.objects.filter(pk=movimiento.producto_id).values_list('costo_promedio', flat=True).get(),
+            )
+        movimiento.variacion_stock = variacion
+        movimiento.save()
+        _aplicar_variacion(saldo, variacion)
+        aplicar_lotes(movimiento)
+        # Con el nuevo efecto ya aplicado: editar sin cambiar el lote de un ingreso consumido es válido
+        validar_lotes(lotes)
+        acumular_en_resumen([movimiento])
+        marcar_dias_afectados(original.fecha, movimiento.fecha)
+        recalcular_costo_productos(productos)
+    return movimiento
+
+
+# ============================================
+# CONSULTAS DE STOCK (sin recorrer el kardex)
+# ============================================
+
+def stock_en_bodega(producto, bodega):
+    """Saldo actual de un producto en una bodega"""
+    cantidad = StockBodega.objects.filter(
+        producto=producto, bodega=bodega
+    ).values_list('cantidad', flat=True).first()
+    return cantidad or 0
+
+
+def stock_por_bodega(producto):
+    """Saldos del producto en cada bodega con stock registrado"""
+    return list(
+        StockBodega.objects.filter(producto=producto)
+        .select_related('bodega')
+        .order_by('bodega__nombre')
+    )
+
+
+def stock_total(producto):
+    """Stock total del producto (suma de todas las bodegas)"""
+    cantidad = Producto.objects.filter(pk=getattr(producto, 'pk', producto)).values_list(
+        'stock_actual', flat=True
+    ).first()
+    return cantidad or 0
@@ -0,0 +1,252 @@
+"""
+Kardex (tarjeta de existencias) por producto
+Cada movimiento con su saldo acumulado y el costo promedio ponderado vigente.
+El costo promedio depende del orden de todos los ingresos anteriores, así que no
+sale de una función de ventana: se calcula en una sola pasada sobre
+.iterator() en orden (fecha, id), sin cargar el historial en memoria.
+Si el rango no alcanza el archivo, se parte del SaldoApertura (cantidad y costo
+al corte) en vez de leer la tabla fría.
+"""
+import heapq
+from decimal import Decimal
+from itertools import islice
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from ..models import Bodega, MovimientoArchivado, MovimientoInventario, Producto, SaldoApertura
+from .archivo import requiere_archivo
+from .consultas import parsear_fecha
+from .costos import avanzar_costo, costo_referencia
+from .fechas import rango_dia_local
+from .paginacion import PaginaCursor
+
+KARDEX_CHUNK_SIZE = 2000
+KARDEX_CURSOR_SALT = 'core.kardex.cursor'
+
+
+class LineaKardex:
+    """Un movimiento del kardex con el saldo y el costo después de aplicarlo"""
+
+    __slots__ = ('movimiento', 'saldo_anterior', 'saldo', 'saldo_total', 'costo_unitario', 'costo_promedio')
+
+    def __init__(self, movimiento, saldo_anterior, saldo, saldo_total, costo_unitario, costo_promedio):
+        self.movimiento = movimiento
+        self.saldo_anterior = saldo_anterior
+        self.saldo = saldo
+        self.saldo_total = saldo_total
+        self.costo_unitario = costo_unitario
+        self.costo_promedio = costo_promedio
+
+    @property
+    def fecha(self):
+        return self.movimiento.fecha
+
+    @property
+    def pk(self):
+        return self.movimiento.pk
+
+    @property
+    def entrada(self):
+        return max(self.movimiento.variacion_stock, 0)
+
+    @property
+    def salida(self):
+        return max(-self.movimiento.variacion_stock, 0)
+
+    @property
+    def valor_saldo(self):
+        return self.saldo * self.costo_promedio
+
+
+class Kardex:
+    """
+    Kardex de un producto (opcionalmente de una bodega) en [desde, hasta).
+    Se recorre como un generador de LineaKardex; `iterator()` y `count()`
+    permiten pasarlo al motor de exportación como si fuera un queryset.
+    El costo promedio siempre es del producto completo; el saldo es el de la
+    bodega si se filtra por una.
+    """
+
+    def __init__(self, producto, bodega=None, desde=None, hasta=None, historico=False, posicion=None):
+        self.producto = producto
+        self.bodega = bodega
+        self.desde = desde
+        self.hasta = hasta
+        self.posicion = posicion
+        if posicion is not None:
+            self.con_archivo = posicion['a']
+        else:
+            self.con_archivo = requiere_archivo(desde, historico)
+
+    # --------------------------------------------
+    # Consultas
+    # --------------------------------------------
+
+    def _querysets(self):
+        filtro = Q(producto_id=self.producto.pk)
+        if self.hasta is not None:
+            filtro &= Q(fecha__lt=self.hasta)
+        if self.posicion is not None:
+            fecha, pk = self.posicion['f'], self.posicion['i']
+            filtro &= Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=pk)
+        consultas = [MovimientoInventario.objects.filter(filtro)]
+        if self.con_archivo:
+            consultas.append(MovimientoArchivado.objects.filter(filtro))
+        return consultas
+
+    def _mezclar(self, iteradores, clave):
+        if len(iteradores) == 1:
+            return iteradores[0]
+        return heapq.merge(*iteradores, key=clave)
+
+    def _previos(self, chunk_size):
+        """Movimientos anteriores a `desde`: solo los campos que mueven saldo y costo"""
+        if self.desde is None or self.posicion is not None:
+            return iter(())
+        campos = ('fecha', 'id', 'tipo_movimiento', 'bodega_id', 'variacion_stock', 'costo_unitario')
+        return self._mezclar(
+            [
+                qs.filter(fecha__lt=self.desde).order_by('fecha', 'id').values_list(*campos)
+                .iterator(chunk_size=chunk_size)
+                for qs in self._querysets()
+            ],
+            clave=lambda fila: (fila[0], fila[1]),
+        )
+
+    def _en_rango(self, chunk_size):
+        iteradores = []
+        for qs in self._querysets():
+            if self.desde is not None and self.posicion is None:
+                qs = qs.filter(fecha__gte=self.desde)
+            qs = qs.select_related('bodega', 'proveedor', 'usuario__user').order_by('fecha', 'id')
+            iteradores.append(qs.iterator(chunk_size=chunk_size))
+        return self._mezclar(iteradores, clave=lambda m: (m.fecha, m.pk))
+
+    def _apertura(self):
+        """(saldo total, saldo del ámbito, costo) al iniciar el recorrido"""
+        if self.posicion is not None:
+            return self.posicion['s'], self.posicion['sb'], Decimal(self.posicion['c'])
+        if self.con_archivo:
+            return 0, 0, Decimal('0.00')
+        saldo = saldo_ambito = 0
+        costo = Decimal('0.00')
+        for apertura in SaldoApertura.objects.filter(producto_id=self.producto.pk):
+            saldo += apertura.cantidad
+            if self.bodega is None or apertura.bodega_id == self.bodega.pk:
+                saldo_ambito += apertura.cantidad
+            costo = apertura.costo_promedio
+        return saldo, saldo_ambito, costo
+
+    # --------------------------------------------
+    # Recorrido
+    # --------------------------------------------
+
+    def iterator(self, chunk_size=KARDEX_CHUNK_SIZE):
+        saldo, saldo_ambito, costo = self._apertura()
+        referencia = costo_referencia(self.producto)
+        bodega_id = self.bodega.pk if self.bodega is not None else None
+
+        def aplicar(tipo, bodega, variacion, costo_unitario):
+            nonlocal saldo, saldo_ambito, costo
+            if costo_unitario is None and tipo == 'ingreso' and not costo:
+                costo_unitario = referencia
+            costo = avanzar_costo(costo, saldo, variacion, costo_unitario, tipo)
+            saldo += variacion
+            propio = bodega_id is None or bodega == bodega_id
+            if propio:
+                saldo_ambito += variacion
+            return propio
+
+        for _, _, tipo, bodega, variacion, costo_unitario in self._previos(chunk_size):
+            aplicar(tipo, bodega, variacion, costo_unitario)
+
+        for mov in self._en_rango(chunk_size):
+            anterior = saldo_ambito
+            if not aplicar(mov.tipo_movimiento, mov.bodega_id, mov.variacion_stock, mov.costo_unitario):
+                continue
+            unitario = mov.costo_unitario if mov.tipo_movimiento == 'ingreso' and mov.costo_unitario is not None else costo
+            yield LineaKardex(mov, anterior, saldo_ambito, saldo, unitario, costo)
+
+    __iter__ = iterator
+
+    def count(self):
+        total = 0
+        for qs in self._querysets():
+            if self.desde is not None and self.posicion is None:
+                qs = qs.filter(fecha__gte=self.desde)
+            if self.bodega is not None:
+                qs = qs.filter(bodega_id=self.bodega.pk)
+            total += qs.count()
+        return total
+
+    # --------------------------------------------
+    # Paginación
+    # --------------------------------------------
+
+    def _cursor(self, linea):
+        return signing.dumps({
+            'p': self.producto.pk,
+            'b': self.bodega.pk if self.bodega is not None else None,
+            'f': linea.fecha.isoformat(),
+            'i': linea.pk,
+            's': linea.saldo_total,
+            'sb': linea.saldo,
+            'c': str(linea.costo_promedio),
+            'a': self.con_archivo,
+        }, salt=KARDEX_CURSOR_SALT, compress=True)
+
+    def pagina(self, tamano=100, chunk_size=None):
+        """
+        Página de `tamano` líneas. El cursor de la siguiente lleva la posición y
+        el saldo/costo acumulados, así continuar no obliga a recorrer lo anterior.
+        """
+        lineas = list(islice(self.iterator(chunk_size or tamano + 1), tamano + 1))
+        siguiente = self._cursor(lineas[tamano - 1]) if len(lineas) > tamano else None
+        return PaginaCursor(lineas[:tamano], siguiente=siguiente)
+
+
+def decodificar_posicion(token, producto, bodega=None):
+    """Posición guardada en un cursor del mismo producto y bodega, o None"""
+    if not token:
+        return None
+    try:
+        datos = signing.loads(token, salt=KARDEX_CURSOR_SALT)
+        if datos['p'] != producto.pk or datos['b'] != (bodega.pk if bodega is not None else None):
+            return None
+        datos['f'] = parse_datetime(datos['f'])
+        if datos['f'] is None:
+            return None
+        Decimal(datos['c'])
+        return datos
+    except (signing.BadSignature, KeyError, TypeError, ValueError, ArithmeticError):
+        return None
+
+
+def kardex_desde_params(params):
+    """
+    Kardex según los filtros de la vista: ?producto=SKU [&bodega=CODIGO]
+    [&desde=&hasta=] [&historico=1] [&cursor=]. ValueError si el producto o la
+    bodega no existen.
+    """
+    producto = Producto.objects.filter(sku=(params.get('producto') or '').strip()).first()
+    if producto is None:
+        raise ValueError('Producto no encontrado')
+    bodega = None
+    if params.get('bodega'):
+        bodega = Bodega.objects.filter(codigo=params['bodega']).first()
+        if bodega is None:
+            raise ValueError('Bodega no encontrada')
+    desde, hasta = rango_dia_local(
+        parsear_fecha((params.get('desde') or '').strip()),
+        parsear_fecha((params.get('hasta') or '').strip()),
+    )
+    return Kardex(
+        producto,
+        bodega=bodega,
+        desde=desde,
+        hasta=hasta,
+        historico=(params.get('historico') or '') in ('1', 'true', 'si'),
+        posicion=decodificar_posicion(params.get('cursor'), producto, bodega),
+    )
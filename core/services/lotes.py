@@ -0,0 +1,179 @@
+"""
+Lotes y asignación FEFO (first expired, first out)
+Los ingresos con número de lote y vencimiento suman al Lote de su bodega; las
+salidas descuentan del lote indicado en el movimiento o, si no se indica, de
+los lotes vigentes del producto en esa bodega que vencen antes. Cada efecto
+queda en AsignacionLote, así anular o editar el movimiento lo revierte; un
+ingreso cuyo lote ya se consumió no se revierte mientras esas salidas existan.
+Se llama dentro de la transacción de contabilización, con el producto ya
+bloqueado; los lotes se leen y bloquean con una sola consulta sobre el índice
+(producto, bodega, fecha_vencimiento). Las transferencias no mueven lotes.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from ..models import AsignacionLote, Lote, MovimientoInventario
+
+
+def ingresar_lote(movimiento):
+    """
+    Suma el ingreso a su lote (lo crea en la bodega del movimiento si no existe).
+    Sin número de lote o sin vencimiento no hay lote que mantener. ValueError si
+    el lote es de otro producto o está en otra bodega.
+    """
+    if not movimiento.lote or not movimiento.fecha_vencimiento or movimiento.variacion_stock <= 0:
+        return None
+    cantidad = Decimal(movimiento.variacion_stock)
+    lote, creado = Lote.objects.select_for_update().get_or_create(
+        numero_lote=movimiento.lote,
+        defaults={
+            'producto_id': movimiento.producto_id,
+            'bodega_id': movimiento.bodega_id,
+            'fecha_fabricacion': timezone.localtime(movimiento.fecha).date(),
+            'fecha_vencimiento': movimiento.fecha_vencimiento,
+            'cantidad_inicial': cantidad,
+            'cantidad_actual': cantidad,
+        },
+    )
+    _validar_lote(lote, movimiento)
+    if not creado:
+        Lote.objects.filter(pk=lote.pk).update(
+            cantidad_inicial=F('cantidad_inicial') + cantidad,
+            cantidad_actual=F('cantidad_actual') + cantidad,
+        )
+    return AsignacionLote.objects.create(movimiento=movimiento, lote=lote, cantidad=cantidad)
+
+
+def _validar_lote(lote, movimiento):
+    """ValueError si el lote no es del producto o de la bodega del movimiento"""
+    if lote.producto_id != movimiento.producto_id:
+        raise ValueError(f'El lote {lote.numero_lote} pertenece a otro producto')
+    if lote.bodega_id is not None and lote.bodega_id != movimiento.bodega_id:
+        raise ValueError(f'El lote {lote.numero_lote} está en otra bodega')
+
+
+def descontar_lote_indicado(movimiento):
+    """
+    Descuenta la salida completa del lote escrito en el movimiento. Un número
+    sin Lote registrado (p. ej. sin vencimiento) queda como referencia sin
+    desglose. ValueError si el lote es de otro producto, de otra bodega o no
+    tiene saldo suficiente.
+    """
+    pendiente = Decimal(-movimiento.variacion_stock)
+    if pendiente <= 0:
+        return []
+    lote = Lote.objects.select_for_update().filter(numero_lote=movimiento.lote).first()
+    if lote is None:
+        return []
+    _validar_lote(lote, movimiento)
+    if lote.cantidad_actual < pendiente:
+        raise ValueError(
+            f'El lote {lote.numero_lote} tiene {lote.cantidad_actual:g} unidades; '
+            f'la salida pide {pendiente:g}'
+        )
+    Lote.objects.filter(pk=lote.pk).update(cantidad_actual=F('cantidad_actual') - pendiente)
+    if movimiento.fecha_vencimiento != lote.fecha_vencimiento:
+        movimiento.fecha_vencimiento = lote.fecha_vencimiento
+        MovimientoInventario.objects.filter(pk=movimiento.pk).update(fecha_vencimiento=lote.fecha_vencimiento)
+    return [AsignacionLote.objects.create(movimiento=movimiento, lote=lote, cantidad=-pendiente)]
+
+
+def asignar_fefo(movimiento):
+    """
+    Descuenta la salida de los lotes con saldo del producto en la bodega del
+    movimiento (y de los lotes sin bodega registrada), del que vence primero al
+    último; se omiten los ya vencidos a la fecha del movimiento. Lo que los
+    lotes no cubren queda sin asignar. Devuelve las asignaciones.
+    """
+    pendiente = Decimal(-movimiento.variacion_stock)
+    if pendiente <= 0:
+        return []
+    lotes = (
+        Lote.objects.select_for_update()
+        .filter(
+            Q(bodega_id=movimiento.bodega_id) | Q(bodega__isnull=True),
+            producto_id=movimiento.producto_id,
+            fecha_vencimiento__gte=timezone.localtime(movimiento.fecha).date(),
+            cantidad_actual__gt=0,
+        )
+        .order_by('fecha_vencimiento', 'id')
+        .only('id', 'numero_lote', 'fecha_vencimiento', 'cantidad_actual')
+    )
+    asignaciones = []
+    for lote in lotes:
+        tomado = min(pendiente, lote.cantidad_actual)
+        asignaciones.append(AsignacionLote(movimiento=movimiento, lote=lote, cantidad=-tomado))
+        pendiente -= tomado
+        if not pendiente:
+            break
+    if not asignaciones:
+        return []
+
+    Lote.objects.filter(pk__in=[a.lote_id for a in asignaciones]).update(
+        cantidad_actual=Case(*[
+            When(pk=a.lote_id, then=F('cantidad_actual') + a.cantidad) for a in asignaciones
+        ])
+    )
+    AsignacionLote.objects.bulk_create(asignaciones)
+
+    # El movimiento muestra el lote que vence primero
+    primero = asignaciones[0].lote
+    movimiento.lote = primero.numero_lote
+    movimiento.fecha_vencimiento = primero.fecha_vencimiento
+    MovimientoInventario.objects.filter(pk=movimiento.pk).update(
+        lote=movimiento.lote, fecha_vencimiento=movimiento.fecha_vencimiento
+    )
+    return asignaciones
+
+
+def revertir_asignaciones(movimiento):
+    """
+    Deshace el efecto del movimiento sobre sus lotes y borra el desglose.
+    Devuelve los ids de los lotes tocados (para validar_lotes).
+    """
+    asignaciones = list(AsignacionLote.objects.filter(movimiento_id=movimiento.pk).order_by('lote_id'))
+    if not asignaciones:
+        return []
+    ids = [a.lote_id for a in asignaciones]
+    list(Lote.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+    Lote.objects.filter(pk__in=ids).update(
+        cantidad_actual=Case(*[
+            When(pk=a.lote_id, then=F('cantidad_actual') - a.cantidad) for a in asignaciones
+        ]),
+        # Un ingreso revertido tampoco cuenta en la cantidad inicial
+        cantidad_inicial=Case(*[
+            When(pk=a.lote_id, then=F('cantidad_inicial') - max(a.cantidad, 0)) for a in asignaciones
+        ]),
+    )
+    AsignacionLote.objects.filter(movimiento_id=movimiento.pk).delete()
+    return ids
+
+
+def validar_lotes(ids):
+    """
+    ValueError si algún lote quedó con saldo negativo: se revirtió un ingreso
+    cuyas unidades ya tomaron salidas posteriores. Llamar antes de cerrar la
+    transacción para que se deshaga completa.
+    """
+    negativos = list(
+        Lote.objects.filter(pk__in=ids, cantidad_actual__lt=0)
+        .order_by('numero_lote').values_list('numero_lote', flat=True)
+    )
+    if negativos:
+        raise ValueError(
+            f'El lote {", ".join(negativos)} ya tiene salidas asignadas; '
+            'anula o edita primero esas salidas'
+        )
+
+
+def aplicar_lotes(movimiento):
+    """Efecto de un movimiento recién contabilizado sobre los lotes"""
+    if movimiento.tipo_movimiento == 'ingreso':
+        ingresar_lote(movimiento)
+    elif movimiento.tipo_movimiento == 'salida':
+        if movimiento.lote:
+            descontar_lote_indicado(movimiento)
+        else:
+            asignar_fefo(movimiento)
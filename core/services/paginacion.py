@@ -0,0 +1,137 @@
+"""
+Paginación por cursor (keyset)
+En vez de OFFSET, cada página filtra a partir de la última fila vista sobre la
+clave (fecha, id), así la página 5.000 cuesta lo mismo que la primera. El
+cursor viaja firmado para que el cliente no pueda fabricar posiciones.
+"""
+from django.core import signing
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = 'core.paginacion.cursor'
+
+
+class PaginaCursor:
+    """Página de resultados con los cursores para avanzar y retroceder"""
+
+    def __init__(self, items, siguiente=None, anterior=None, total=None, total_estimado=False):
+        self.items = items
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.total = total
+        self.total_estimado = total_estimado
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.anterior is not None
+
+
+def codificar_cursor(obj, direccion):
+    return signing.dumps({'f': obj.fecha.isoformat(), 'i': obj.pk, 'd': direccion}, salt=CURSOR_SALT, compress=True)
+
+
+def decodificar_cursor(token):
+    """(fecha, id, dirección) del cursor, o None si falta o no es válido"""
+    if not token:
+        return None
+    try:
+        datos = signing.loads(token, salt=CURSOR_SALT)
+        fecha = parse_datetime(datos['f'])
+        if fecha is None or datos['d'] not in ('sig', 'ant'):
+            return None
+        return fecha, int(datos['i']), datos['d']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def _tramo(queryset, posicion, limite):
+    """Hasta `limite` filas a partir de la posición, en el sentido del recorrido"""
+    if posicion is None:
+        return list(queryset.order_by('-fecha', '-id')[:limite])
+    fecha, pk, direccion = posicion
+    if direccion == 'sig':
+        return list(
+            queryset.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=pk))
+            .order_by('-fecha', '-id')[:limite]
+        )
+    return list(
+        queryset.filter(Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=pk))
+        .order_by('fecha', 'id')[:limite]
+    )
+
+
+def paginar_por_cursor(consultas, cursor=None, tamano=100):
+    """
+    Página de `tamano` filas ordenadas por (-fecha, -id). `consultas` es un
+    queryset o una lista de querysets con la misma clave (tabla activa y
+    archivo): se lee un tramo de cada uno y se mezclan.
+    Se lee una fila extra para saber si hay más sin ejecutar COUNT(*).
+    """
+    if not isinstance(consultas, (list, tuple)):
+        consultas = [consultas]
+    posicion = decodificar_cursor(cursor)
+    hacia_atras = posicion is not None and posicion[2] == 'ant'
+
+    filas = [obj for qs in consultas for obj in _tramo(qs, posicion, tamano + 1)]
+    filas.sort(key=lambda obj: (obj.fecha, obj.pk), reverse=not hacia_atras)
+    hay_extra = len(filas) > tamano
+    filas = filas[:tamano]
+
+    if hacia_atras:
+        filas.reverse()
+        hay_mas, hay_antes = True, hay_extra
+    else:
+        hay_mas, hay_antes = hay_extra, posicion is not None
+
+    return PaginaCursor(
+        filas,
+        siguiente=codificar_cursor(filas[-1], 'sig') if filas and hay_mas else None,
+        anterior=codificar_cursor(filas[0], 'ant') if filas and hay_antes else None,
+    )
+
+
+def estimar_filas(modelo):
+    """
+    Cantidad aproximada de filas de la tabla según las estadísticas del motor
+    (sin recorrerla). None si el motor no las expone.
+    """
+    tabla = modelo._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [tabla]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [tabla])
+        else:
+            return None
+        fila = cursor.fetchone()
+    return int(fila[0]) if fila and fila[0] is not None and fila[0] >= 0 else None
+
+
+def total_de_pagina(consultas, modo='estimado'):
+    """
+    Total para mostrar junto a la página: exacto (COUNT), estimado (estadísticas
+    de la tabla, solo sin filtros) o ninguno. Devuelve (total, es_estimado).
+    """
+    if not isinstance(consultas, (list, tuple)):
+        consultas = [consultas]
+    if modo == 'exacto':
+        return sum(qs.count() for qs in consultas), False
+    if modo == 'estimado' and not any(qs.query.where for qs in consultas):
+        estimados = [estimar_filas(qs.model) for qs in consultas]
+        if None not in estimados:
+            return sum(estimados), True
+    return None, False
@@ -0,0 +1,161 @@
+"""
+Pronóstico de demanda
+Las salidas diarias de todos los productos se traen en una consulta agrupada y
+se cargan en una matriz NumPy (productos × días); el promedio móvil, el
+suavizado exponencial y los factores de día de semana de las categorías
+estacionales se calculan para todos los SKU a la vez, sin recorrer productos.
+Cada noche solo se suman los días nuevos: el nivel del suavizado guardado en
+PronosticoDemanda se retoma desde su fecha_base.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import MovimientoArchivado, MovimientoInventario, Producto, PronosticoDemanda
+from .archivo import requiere_archivo
+from .fechas import inicio_dia_local
+
+VENTANA_PROMEDIO = 28
+DIAS_HISTORIA = 90
+SEMANAS_ESTACIONALIDAD = 8
+ALFA_SUAVIZADO = 0.3
+CATEGORIAS_ESTACIONALES_DEFECTO = ('Temporada',)
+PRONOSTICO_LOTE = 2000
+
+
+def categorias_estacionales():
+    """Nombres de categorías con estacionalidad semanal (settings.CATEGORIAS_ESTACIONALES)"""
+    return set(getattr(settings, 'CATEGORIAS_ESTACIONALES', CATEGORIAS_ESTACIONALES_DEFECTO))
+
+
+def _decimal(valor, decimales='0.001'):
+    return Decimal(str(float(valor))).quantize(Decimal(decimales))
+
+
+def salidas_diarias(productos, desde, hasta):
+    """Matriz (len(productos) × días) con las unidades de salida de cada día local en [desde, hasta]"""
+    indice = {pk: i for i, pk in enumerate(productos)}
+    matriz = np.zeros((len(productos), (hasta - desde).days + 1))
+    inicio = inicio_dia_local(desde)
+    consultas = [MovimientoInventario.objects]
+    if requiere_archivo(inicio):
+        consultas.append(MovimientoArchivado.objects)
+
+    for manager in consultas:
+        filas = (
+            manager.filter(
+                tipo_movimiento='salida', fecha__gte=inicio, fecha__lt=inicio_dia_local(hasta + timedelta(days=1))
+            )
+            .annotate(dia=TruncDate('fecha', tzinfo=timezone.get_current_timezone()))
+            .order_by().values('producto_id', 'dia').annotate(total=Sum('cantidad'))
+        )
+        for fila in filas:
+            i = indice.get(fila['producto_id'])
+            if i is not None:
+                matriz[i, (fila['dia'] - desde).days] += fila['total'] or 0
+    return matriz
+
+
+def dias_semana(desde, columnas):
+    """Día de la semana (lunes = 0) de cada columna de una matriz que empieza en `desde`"""
+    return (np.arange(columnas) + desde.weekday()) % 7
+
+
+def factores_semanales(matriz, desde):
+    """
+    Factor por día de semana de cada fila sobre las últimas SEMANAS_ESTACIONALIDAD
+    semanas: promedio del día / promedio general (1 si no hubo salidas).
+    """
+    semana = dias_semana(desde, matriz.shape[1])
+    ventana = matriz[:, -SEMANAS_ESTACIONALIDAD * 7:]
+    semana = semana[-ventana.shape[1]:]
+    medias = np.stack([ventana[:, semana == d].mean(axis=1) for d in range(7)], axis=1)
+    general = medias.mean(axis=1, keepdims=True)
+    return np.divide(medias, general, out=np.ones_like(medias), where=general > 0)
+
+
+def suavizar(matriz, nivel, alfa=ALFA_SUAVIZADO):
+    """Suavizado exponencial simple de todas las filas a la vez, partiendo de `nivel`"""
+    nivel = nivel.copy()
+    for columna in matriz.T:
+        nivel = alfa * columna + (1 - alfa) * nivel
+    return nivel
+
+
+def ultimo_pronostico():
+    return PronosticoDemanda.objects.aggregate(dia=Max('fecha_base'))['dia']
+
+
+def generar_pronosticos(hasta=None, reconstruir=False):
+    """
+    Calcula los pronósticos de todos los productos activos con la historia hasta
+    `hasta` (por defecto, ayer). Si ya hay pronósticos recientes, el suavizado
+    continúa desde su nivel guardado y solo consume los días nuevos; con
+    `reconstruir` (o si pasó más de DIAS_HISTORIA) arranca de cero.
+    Devuelve la cantidad de productos pronosticados.
+    """
+    hasta = hasta or (timezone.localdate() - timedelta(days=1))
+    ultimo = None if reconstruir else ultimo_pronostico()
+    if ultimo is not None and ultimo >= hasta:
+        return 0
+    if ultimo is not None and (hasta - ultimo).days >= DIAS_HISTORIA:
+        ultimo = None
+
+    estacionales = categorias_estacionales()
+    filas = list(Producto.objects.filter(activo=True).order_by('pk').values_list('pk', 'categoria__nombre'))
+    if not filas:
+        return 0
+    productos = [pk for pk, _ in filas]
+    es_estacional = np.array([categoria in estacionales for _, categoria in filas])
+
+    ventana = max(VENTANA_PROMEDIO, SEMANAS_ESTACIONALIDAD * 7)
+    dias = DIAS_HISTORIA if ultimo is None else max(ventana, (hasta - ultimo).days)
+    desde = hasta - timedelta(days=dias - 1)
+    matriz = salidas_diarias(productos, desde, hasta)
+
+    promedio = matriz[:, -VENTANA_PROMEDIO:].mean(axis=1)
+    factores = np.ones((len(productos), 7))
+    if es_estacional.any():
+        factores[es_estacional] = factores_semanales(matriz[es_estacional], desde)
+    por_dia = factores[:, dias_semana(desde, matriz.shape[1])]
+    desestacionalizada = np.divide(matriz, por_dia, out=matriz.copy(), where=por_dia > 0)
+
+    if ultimo is None:
+        inicio = 0
+        nivel = desestacionalizada[:, :VENTANA_PROMEDIO].mean(axis=1)
+    else:
+        # Solo los días posteriores al último pronóstico alimentan el suavizado
+        inicio = (ultimo - desde).days + 1
+        previos = dict(PronosticoDemanda.objects.values_list('producto_id', 'suavizado'))
+        nuevo = desestacionalizada[:, :inicio].mean(axis=1)
+        nivel = np.array([
+            float(previos[pk]) if pk in previos else nuevo[i] for i, pk in enumerate(productos)
+        ])
+    nivel = suavizar(desestacionalizada[:, inicio:], nivel)
+
+    pronosticos = [
+        PronosticoDemanda(
+            producto_id=pk,
+            fecha_base=hasta,
+            promedio_movil=_decimal(promedio[i]),
+            suavizado=_decimal(nivel[i]),
+            factores_semana=[round(float(f), 4) for f in factores[i]] if es_estacional[i] else None,
+            demanda_semana=_decimal(nivel[i] * factores[i].sum(), '0.01'),
+        )
+        for i, pk in enumerate(productos)
+    ]
+    with transaction.atomic():
+        PronosticoDemanda.objects.all().delete()
+        PronosticoDemanda.objects.bulk_create(pronosticos, batch_size=PRONOSTICO_LOTE)
+    return len(pronosticos)
+
+
+def demanda_pronosticada():
+    """{producto_id: demanda diaria pronosticada} de los pronósticos guardados"""
+    return dict(PronosticoDemanda.objects.values_list('producto_id', 'suavizado'))
@@ -0,0 +1,175 @@
+"""
+Reconciliación de stock contra el libro de movimientos
+El stock esperado de cada producto en cada bodega es su saldo de apertura
+(archivo) más la suma del efecto de sus movimientos, calculada con agregados
+agrupados por tramos de id de producto. El efecto se deriva del tipo y la
+cantidad (salvo en ajustes y transferencias, donde vale el registrado: la
+cantidad de una transferencia no dice hacia qué bodega va), así también cuadran
+los movimientos cargados sin pasar por la contabilización.
+Corregir la variación de un movimiento pasa por el mismo mantenimiento que la
+contabilización: resumen diario, días de snapshots afectados y costo promedio.
+"""
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from ..models import MovimientoInventario, Producto, SaldoApertura, StockBodega
+from .alertas import recalcular_alerta_bajo_stock
+from .costos import recalcular_costo_productos
+from .inventario import TIPOS_ENTRADA, TIPOS_SALIDA
+from .resumen import acumular_en_resumen
+from .snapshots import marcar_dias_afectados
+
+RECONCILIACION_LOTE = 1000
+
+# bodega_id None = stock total del producto (Producto.stock_actual)
+Diferencia = namedtuple('Diferencia', 'producto_id bodega_id esperado registrado')
+ResultadoTramo = namedtuple('ResultadoTramo', 'productos diferencias movimientos_corregidos')
+
+
+def efecto_movimiento():
+    """Efecto de cada movimiento sobre su bodega según tipo y cantidad (ajustes y transferencias: variacion_stock)"""
+    return Case(
+        When(tipo_movimiento__in=TIPOS_ENTRADA, then=F('cantidad')),
+        When(tipo_movimiento__in=TIPOS_SALIDA, then=F('cantidad') * -1),
+        default=F('variacion_stock'),
+        output_field=IntegerField(),
+    )
+
+
+def _esperado(ids):
+    """{(producto_id, bodega_id): saldo esperado} de los productos dados"""
+    esperado = defaultdict(int)
+    filas = (
+        MovimientoInventario.objects.filter(producto_id__in=ids).order_by()
+        .values('producto_id', 'bodega_id').annotate(suma=Sum(efecto_movimiento()))
+    )
+    for fila in filas:
+        esperado[(fila['producto_id'], fila['bodega_id'])] += fila['suma'] or 0
+    for apertura in SaldoApertura.objects.filter(producto_id__in=ids).values('producto_id', 'bodega_id', 'cantidad'):
+        esperado[(apertura['producto_id'], apertura['bodega_id'])] += apertura['cantidad']
+    return esperado
+
+
+def _movimientos_desalineados(ids):
+    """Movimientos (no ajustes ni transferencias) cuyo variacion_stock no coincide con su efecto"""
+    return (
+        MovimientoInventario.objects.filter(producto_id__in=ids)
+        .exclude(tipo_movimiento__in=('ajuste', 'transferencia'))
+        .alias(efecto=efecto_movimiento())
+        .exclude(variacion_stock=F('efecto'))
+    )
+
+
+def _corregir_variaciones(desalineados):
+    """
+    Reescribe variacion_stock con el efecto del movimiento y lleva la diferencia
+    al resumen diario, a los snapshots y al costo. Con los productos ya bloqueados.
+    """
+    movimientos = list(
+        desalineados.annotate(efecto_esperado=efecto_movimiento())
+        .only('fecha', 'tipo_movimiento', 'producto_id', 'bodega_id', 'proveedor_id', 'cantidad', 'variacion_stock')
+    )
+    if not movimientos:
+        return 0
+    acumular_en_resumen(movimientos, signo=-1)
+    MovimientoInventario.objects.filter(pk__in=[m.pk for m in movimientos]).update(
+        variacion_stock=efecto_movimiento(), fecha_modificacion=timezone.now()
+    )
+    for movimiento in movimientos:
+        movimiento.variacion_stock = movimiento.efecto_esperado
+    acumular_en_resumen(movimientos)
+    marcar_dias_afectados(*(m.fecha for m in movimientos))
+    recalcular_costo_productos({m.producto_id for m in movimientos})
+    return len(movimientos)
+
+
+def _revisar_lote(ids, corregir):
+    productos = Producto.objects.filter(pk__in=ids).order_by('pk')
+    saldos = StockBodega.objects.filter(producto_id__in=ids).order_by('producto_id', 'bodega_id')
+    if corregir:
+        # Mismo orden de bloqueo que la contabilización: productos y luego saldos
+        productos = productos.select_for_update()
+        saldos = saldos.select_for_update()
+    productos = {p['id']: p for p in productos.values('id', 'stock_actual')}
+    registrados = {(s['producto_id'], s['bodega_id']): s for s in saldos.values('id', 'producto_id', 'bodega_id', 'cantidad')}
+    esperado = _esperado(ids)
+
+    diferencias = []
+    for clave in sorted(set(esperado) | set(registrados)):
+        registrado = registrados[clave]['cantidad'] if clave in registrados else 0
+        if esperado[clave] != registrado:
+            diferencias.append(Diferencia(clave[0], clave[1], esperado[clave], registrado))
+    totales = defaultdict(int)
+    for (producto_id, _), cantidad in esperado.items():
+        totales[producto_id] += cantidad
+    for producto_id, producto in productos.items():
+        if totales[producto_id] != producto['stock_actual']:
+            diferencias.append(Diferencia(producto_id, None, totales[producto_id], producto['stock_actual']))
+
+    desalineados = _movimientos_desalineados(ids)
+    if not corregir:
+        return diferencias, desalineados.count()
+
+    corregidos = _corregir_variaciones(desalineados)
+    por_saldo = {}
+    nuevos = []
+    for d in diferencias:
+        if d.bodega_id is None:
+            continue
+        saldo = registrados.get((d.producto_id, d.bodega_id))
+        if saldo is None:
+            nuevos.append(StockBodega(producto_id=d.producto_id, bodega_id=d.bodega_id, cantidad=d.esperado))
+        else:
+            por_saldo[saldo['id']] = d.esperado
+    if por_saldo:
+        StockBodega.objects.filter(pk__in=por_saldo).update(
+            cantidad=Case(*[When(pk=pk, then=Value(c)) for pk, c in por_saldo.items()]),
+            fecha_modificacion=timezone.now(),
+        )
+    if nuevos:
+        StockBodega.objects.bulk_create(nuevos)
+    stock = {d.producto_id: d.esperado for d in diferencias if d.bodega_id is None}
+    if stock:
+        Producto.objects.filter(pk__in=stock).update(
+            stock_actual=Case(*[When(pk=pk, then=Value(c)) for pk, c in stock.items()]),
+        )
+        recalcular_alerta_bajo_stock(Producto.objects.filter(pk__in=stock))
+    return diferencias, corregidos
+
+
+def reconciliar_tramo(desde_id, hasta_id, corregir=False, lote=RECONCILIACION_LOTE):
+    """
+    Compara (y con `corregir` repara) los productos con id en [desde_id, hasta_id),
+    en transacciones de `lote` productos. Devuelve un ResultadoTramo.
+    """
+    revisados = corregidos = 0
+    diferencias = []
+    ultimo_id = desde_id - 1
+    while True:
+        ids = list(
+            Producto.objects.filter(pk__gt=ultimo_id, pk__lt=hasta_id)
+            .order_by('pk').values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            encontradas, movimientos = _revisar_lote(ids, corregir)
+        diferencias.extend(encontradas)
+        corregidos += movimientos
+        revisados += len(ids)
+        ultimo_id = ids[-1]
+    return ResultadoTramo(revisados, diferencias, corregidos)
+
+
+def tramos_de_productos(cantidad):
+    """Divide el rango de ids de producto en `cantidad` tramos [desde, hasta)"""
+    limites = Producto.objects.order_by().values_list('pk', flat=True)
+    minimo = limites.order_by('pk').first()
+    maximo = limites.order_by('-pk').first()
+    if minimo is None:
+        return []
+    ancho = max((maximo - minimo + 1 + cantidad - 1) // cantidad, 1)
+    return [(inicio, min(inicio + ancho, maximo + 1)) for inicio in range(minimo, maximo + 1, ancho)]
@@ -0,0 +1,128 @@
+"""
+Sugerencias de reposición
+Motor por lotes que cruza la velocidad de demanda (el pronóstico guardado o,
+sin pronóstico, las salidas recientes) con el stock, el punto de reorden y las
+condiciones del proveedor preferente (lead time, costo, pedido mínimo). Todo
+sale de consultas agrupadas y la tabla SugerenciaReposicion se reemplaza con
+un bulk_create, sin consultas por producto.
+"""
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..models import MovimientoArchivado, MovimientoInventario, ProveedorProducto, SugerenciaReposicion
+from .archivo import requiere_archivo
+from .fechas import inicio_dia_local
+from .pronosticos import demanda_pronosticada
+
+DIAS_DEMANDA = 30
+DIAS_COBERTURA = 30
+LEAD_TIME_DEFECTO = 7
+REPOSICION_LOTE = 2000
+
+
+def velocidad_demanda(dias=DIAS_DEMANDA, hoy=None):
+    """{producto_id: unidades de salida por día} en los últimos `dias` días completos"""
+    hoy = hoy or timezone.localdate()
+    inicio = inicio_dia_local(hoy - timedelta(days=dias))
+    fin = inicio_dia_local(hoy)
+    consultas = [MovimientoInventario.objects]
+    if requiere_archivo(inicio):
+        consultas.append(MovimientoArchivado.objects)
+
+    totales = {}
+    for manager in consultas:
+        filas = (
+            manager.filter(tipo_movimiento='salida', fecha__gte=inicio, fecha__lt=fin)
+            .order_by().values('producto_id').annotate(total=Sum('cantidad'))
+        )
+        for fila in filas:
+            totales[fila['producto_id']] = totales.get(fila['producto_id'], 0) + (fila['total'] or 0)
+    return {pk: Decimal(total) / dias for pk, total in totales.items()}
+
+
+def _proveedores_preferentes():
+    """
+    Una relación activa por producto activo: la del proveedor preferente (si hay
+    varios, el de menor costo), con los datos del producto ya unidos.
+    """
+    relaciones = (
+        ProveedorProducto.objects.filter(
+            activo=True,
+            es_proveedor_preferente=True,
+            producto__activo=True,
+            proveedor__estado='ACTIVO',
+        )
+        .order_by('producto_id', 'costo', 'proveedor_id')
+        .values(
+            'producto_id', 'proveedor_id', 'costo', 'lead_time', 'pedido_minimo',
+            'proveedor__lead_time', 'proveedor__pedido_minimo',
+            'producto__stock_actual', 'producto__stock_minimo',
+            'producto__stock_maximo', 'producto__punto_reorden',
+        )
+    )
+    vistos = set()
+    for relacion in relaciones.iterator(chunk_size=REPOSICION_LOTE):
+        if relacion['producto_id'] in vistos:
+            continue
+        vistos.add(relacion['producto_id'])
+        yield relacion
+
+
+def calcular_sugerencia(relacion, demanda_diaria, cobertura=DIAS_COBERTURA):
+    """
+    SugerenciaReposicion (sin guardar) para una relación de _proveedores_preferentes,
+    o None si el stock aún está sobre el punto de reorden.
+    - punto de reorden: el mayor entre el configurado y stock mínimo + demanda
+      durante el lead time
+    - objetivo: stock máximo, o el punto de reorden más `cobertura` días de demanda
+    - pedido mínimo: es un monto, así que se lleva a unidades con el costo y la
+      cantidad se sube hasta alcanzarlo
+    """
+    lead_time = relacion['lead_time'] or relacion['proveedor__lead_time'] or LEAD_TIME_DEFECTO
+    stock = relacion['producto__stock_actual']
+    stock_minimo = relacion['producto__stock_minimo'] or Decimal('0')
+    punto = max(relacion['producto__punto_reorden'] or Decimal('0'), stock_minimo + demanda_diaria * lead_time)
+    if stock > punto:
+        return None
+
+    objetivo = relacion['producto__stock_maximo'] or (punto + demanda_diaria * cobertura)
+    cantidad = math.ceil(objetivo - stock)
+    if cantidad <= 0:
+        return None
+
+    costo = relacion['costo'] or Decimal('0')
+    pedido_minimo = relacion['pedido_minimo'] or relacion['proveedor__pedido_minimo']
+    if pedido_minimo and costo > 0:
+        cantidad = max(cantidad, math.ceil(pedido_minimo / costo))
+
+    return SugerenciaReposicion(
+        producto_id=relacion['producto_id'],
+        proveedor_id=relacion['proveedor_id'],
+        demanda_diaria=demanda_diaria.quantize(Decimal('0.001')),
+        stock_actual=stock,
+        punto_reorden=punto.quantize(Decimal('0.01')),
+        lead_time=lead_time,
+        cantidad_sugerida=cantidad,
+        costo_estimado=(costo * cantidad).quantize(Decimal('0.01')),
+    )
+
+
+def generar_sugerencias_reposicion(dias=DIAS_DEMANDA, cobertura=DIAS_COBERTURA, hoy=None):
+    """Recalcula la tabla completa de sugerencias; devuelve cuántas quedaron"""
+    demanda = velocidad_demanda(dias, hoy)
+    demanda.update(demanda_pronosticada())
+    sugerencias = []
+    for relacion in _proveedores_preferentes():
+        sugerencia = calcular_sugerencia(relacion, demanda.get(relacion['producto_id'], Decimal('0')), cobertura)
+        if sugerencia is not None:
+            sugerencias.append(sugerencia)
+
+    with transaction.atomic():
+        SugerenciaReposicion.objects.all().delete()
+        SugerenciaReposicion.objects.bulk_create(sugerencias, batch_size=REPOSICION_LOTE)
+    return len(sugerencias)
@@ -0,0 +1,266 @@
+"""
+Resumen diario de movimientos
+Los gráficos del dashboard y de reportes leen ResumenDiarioMovimientos (una
+fila por día, tipo, producto, bodega y proveedor) en vez de agrupar el libro
+completo en cada carga. La contabilización suma o resta cada movimiento en la
+misma transacción, con el producto ya bloqueado: dos movimientos del mismo
+producto nunca tocan la misma fila a la vez, por eso basta con leer las filas,
+ajustarlas e insertar las que faltan (la clave incluye un proveedor nulo y no
+cabe en un índice único portable). Quien más escribe el resumen (borrar un
+proveedor, reconstruir) bloquea los mismos productos antes de tocar filas.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import MovimientoArchivado, MovimientoInventario, Producto, ResumenDiarioMovimientos
+from .fechas import inicio_dia_local
+
+CLAVE_RESUMEN = ('fecha', 'tipo_movimiento', 'producto_id', 'bodega_id', 'proveedor_id')
+RESUMEN_LOTE = 5000
+RESUMEN_DIAS_TANDA = 31
+
+
+# ============================================
+# MANTENIMIENTO DESDE LA CONTABILIZACIÓN
+# ============================================
+
+def acumular_en_resumen(movimientos, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) los movimientos en el resumen diario con
+    una lectura de las filas afectadas, un bulk_create y un bulk_update.
+    Llamar dentro de la transacción que contabiliza, con los productos bloqueados.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for movimiento in movimientos:
+        clave = (
+            timezone.localtime(movimiento.fecha).date(), movimiento.tipo_movimiento,
+            movimiento.producto_id, movimiento.bodega_id, movimiento.proveedor_id,
+        )
+        delta = deltas[clave]
+        delta[0] += signo
+        delta[1] += signo * movimiento.cantidad
+        delta[2] += signo * movimiento.variacion_stock
+    if not deltas:
+        return
+
+    candidatas = ResumenDiarioMovimientos.objects.filter(
+        fecha__in={clave[0] for clave in deltas},
+        producto_id__in={clave[2] for clave in deltas},
+        bodega_id__in={clave[3] for clave in deltas},
+    )
+    existentes, repetidas = _fusionar_repetidas(candidatas)
+
+    nuevas = []
+    modificadas = [existentes[clave] for clave in repetidas if clave not in deltas]
+    for clave, (n, cantidad, variacion) in deltas.items():
+        fila = existentes.get(clave)
+        if fila is None:
+            nuevas.append(ResumenDiarioMovimientos(
+                **dict(zip(CLAVE_RESUMEN, clave)), movimientos=n, cantidad=cantidad, variacion_stock=variacion
+            ))
+            continue
+        fila.movimientos += n
+        fila.cantidad += cantidad
+        fila.variacion_stock += variacion
+        modificadas.append(fila)
+
+    _guardar(nuevas, modificadas, repetidas)
+
+
+def _clave(fila):
+    return tuple(getattr(fila, campo) for campo in CLAVE_RESUMEN)
+
+
+def _fusionar_repetidas(filas):
+    """
+    ({clave: fila}, {clave: [pk de filas sobrantes]}): si una clave quedó en
+    varias filas (p. ej. dos proveedores que pasaron a nulo), se suman en la de
+    menor id y las demás se marcan para borrar.
+    """
+    existentes, repetidas = {}, defaultdict(list)
+    for fila in filas.order_by('pk'):
+        clave = _clave(fila)
+        principal = existentes.setdefault(clave, fila)
+        if principal is fila:
+            continue
+        principal.movimientos += fila.movimientos
+        principal.cantidad += fila.cantidad
+        principal.variacion_stock += fila.variacion_stock
+        repetidas[clave].append(fila.pk)
+    return existentes, repetidas
+
+
+def _guardar(nuevas, modificadas, repetidas):
+    """Inserta las filas nuevas, actualiza las modificadas y borra las sobrantes o vacías"""
+    ResumenDiarioMovimientos.objects.bulk_create(nuevas, batch_size=RESUMEN_LOTE)
+    borrar = [pk for pks in repetidas.values() for pk in pks]
+    borrar += [fila.pk for fila in modificadas if fila.movimientos <= 0]
+    if borrar:
+        ResumenDiarioMovimientos.objects.filter(pk__in=borrar).delete()
+    ResumenDiarioMovimientos.objects.bulk_update(
+        [fila for fila in modificadas if fila.movimientos > 0],
+        ['movimientos', 'cantidad', 'variacion_stock'],
+        batch_size=RESUMEN_LOTE,
+    )
+
+
+def _bloquear_productos(ids=None):
+    """Bloquea productos en orden de id (todos si `ids` es None), como la contabilización"""
+    productos = Producto.objects.select_for_update().order_by('pk')
+    if ids is not None:
+        productos = productos.filter(pk__in=ids)
+    list(productos.values_list('pk', flat=True))
+
+
+def quitar_proveedor(proveedor_id):
+    """
+    Antes de borrar un proveedor: sus filas pasan a proveedor nulo sumándose a
+    las que ya existan con la misma clave, en vez de quedar repetidas por el
+    SET_NULL.
+    """
+    with transaction.atomic():
+        filas = ResumenDiarioMovimientos.objects.filter(proveedor_id=proveedor_id)
+        productos = set(filas.values_list('producto_id', flat=True))
+        if not productos:
+            return
+        _bloquear_productos(productos)
+        claves = list(filas.values_list('fecha', 'bodega_id'))
+        filas.update(proveedor=None)
+        afectadas = ResumenDiarioMovimientos.objects.filter(
+            proveedor__isnull=True,
+            fecha__in={fecha for fecha, _ in claves},
+            producto_id__in=productos,
+            bodega_id__in={bodega_id for _, bodega_id in claves},
+        )
+        existentes, repetidas = _fusionar_repetidas(afectadas)
+        _guardar([], [existentes[clave] for clave in repetidas], repetidas)
+
+
+# ============================================
+# RECONSTRUCCIÓN (BACKFILL)
+# ============================================
+
+def _agrupar_dias(inicio, fin=None):
+    """{clave del resumen: [movimientos, cantidad, variación]} del libro (activo y archivo) en [inicio, fin)"""
+    totales = defaultdict(lambda: [0, 0, 0])
+    rango = {'fecha__gte': inicio}
+    if fin is not None:
+        rango['fecha__lt'] = fin
+    for manager in (MovimientoInventario.objects, MovimientoArchivado.objects):
+        filas = (
+            manager.filter(**rango)
+            .annotate(dia=TruncDate('fecha', tzinfo=timezone.get_current_timezone()))
+            .order_by()
+            .values('dia', 'tipo_movimiento', 'producto_id', 'bodega_id', 'proveedor_id')
+            .annotate(n=Count('id'), suma=Sum('cantidad'), variacion=Sum('variacion_stock'))
+        )
+        for fila in filas:
+            total = totales[(fila['dia'], fila['tipo_movimiento'], fila['producto_id'],
+                             fila['bodega_id'], fila['proveedor_id'])]
+            total[0] += fila['n']
+            total[1] += fila['suma'] or 0
+            total[2] += fila['variacion'] or 0
+    return totales
+
+
+def _rango_libro():
+    fechas = []
+    for manager in (MovimientoInventario.objects, MovimientoArchivado.objects):
+        rango = manager.aggregate(primera=Min('fecha'), ultima=Max('fecha'))
+        fechas += [f for f in rango.values() if f is not None]
+    if not fechas:
+        return None, None
+    return timezone.localtime(min(fechas)).date(), timezone.localtime(max(fechas)).date()
+
+
+def reconstruir_resumen(desde=None, progreso=None):
+    """
+    Rehace el resumen desde el día `desde` (por defecto, todo el libro) en tandas
+    de RESUMEN_DIAS_TANDA días. Cada tanda borra y vuelve a insertar sus días
+    con todos los productos bloqueados, así una contabilización concurrente
+    espera a que la tanda termine (o la tanda la ve ya confirmada) y no se
+    pierde ni se duplica. Devuelve la cantidad de filas generadas.
+    """
+    primero, ultimo = _rango_libro()
+    if primero is None:
+        with transaction.atomic():
+            _bloquear_productos()
+            borrar = ResumenDiarioMovimientos.objects.all()
+            if desde is not None:
+                borrar = borrar.filter(fecha__gte=desde)
+            borrar.delete()
+        return 0
+
+    inicio = max(primero, desde) if desde else primero
+    # Hasta hoy aunque el libro termine antes: lo que se contabilice mientras tanto cae en la última tanda
+    final = max(ultimo, timezone.localdate())
+    dia = inicio
+    total = 0
+    while dia <= final:
+        fin = min(dia + timedelta(days=RESUMEN_DIAS_TANDA), final + timedelta(days=1))
+        with transaction.atomic():
+            _bloquear_productos()
+            borrar = ResumenDiarioMovimientos.objects.all()
+            # La primera tanda limpia también lo anterior al libro y la última lo posterior
+            if dia > inicio:
+                borrar = borrar.filter(fecha__gte=dia)
+            elif desde is not None:
+                borrar = borrar.filter(fecha__gte=desde)
+            if fin <= final:
+                borrar = borrar.filter(fecha__lt=fin)
+            borrar.delete()
+            filas = [
+                ResumenDiarioMovimientos(
+                    **dict(zip(CLAVE_RESUMEN, clave)), movimientos=n, cantidad=cantidad, variacion_stock=variacion
+                )
+                for clave, (n, cantidad, variacion) in _agrupar_dias(
+                    inicio_dia_local(dia), inicio_dia_local(fin) if fin <= final else None
+                ).items()
+            ]
+            ResumenDiarioMovimientos.objects.bulk_create(filas, batch_size=RESUMEN_LOTE)
+        total += len(filas)
+        if progreso:
+            progreso(dia, total)
+        dia = fin
+    return total
+
+
+# ============================================
+# CONSULTAS PARA GRÁFICOS
+# ============================================
+
+def conteo_movimientos(desde=None, hasta=None, **filtros):
+    """Cantidad de movimientos con día local en [desde, hasta) según el resumen"""
+    resumen = ResumenDiarioMovimientos.objects.filter(**filtros)
+    if desde is not None:
+        resumen = resumen.filter(fecha__gte=desde)
+    if hasta is not None:
+        resumen = resumen.filter(fecha__lt=hasta)
+    return resumen.aggregate(total=Sum('movimientos'))['total'] or 0
+
+
+def top_productos(limite=5):
+    """[(nombre, movimientos)] de los productos con más movimientos"""
+    filas = (
+        ResumenDiarioMovimientos.objects.order_by()
+        .values('producto_id', 'producto__nombre')
+        .annotate(total=Sum('movimientos'))
+        .order_by('-total', 'producto_id')[:limite]
+    )
+    return [(fila['producto__nombre'], fila['total']) for fila in filas]
+
+
+def top_proveedores(limite=4):
+    """[(razón social, movimientos)] de los proveedores con más movimientos"""
+    filas = (
+        ResumenDiarioMovimientos.objects.filter(proveedor__isnull=False).order_by()
+        .values('proveedor_id', 'proveedor__razon_social')
+        .annotate(total=Sum('movimientos'))
+        .order_by('-total', 'proveedor_id')[:limite]
+    )
+    return [(fila['proveedor__razon_social'], fila['total']) for fila in filas]
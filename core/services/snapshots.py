@@ -0,0 +1,228 @@
+"""
+Snapshots diarios de stock y consultas "a la fecha"
+Un SnapshotStock guarda el saldo de un producto en una bodega al cierre de un
+día local, pero solo los días en que ese saldo cambió. El stock en un instante
+pasado se obtiene con el último snapshot de cada par en o antes del día
+anterior más los movimientos entre ese cierre y el instante pedido, sin
+recorrer el libro desde el principio.
+La contabilización anota en EstadoSnapshots el primer día ya cerrado que toca
+(marcar_dias_afectados); las consultas no confían en los snapshots desde ese
+día y la siguiente generación los rehace.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.utils import timezone
+
+from ..models import EstadoSnapshots, MovimientoArchivado, MovimientoInventario, SnapshotStock
+from .archivo import requiere_archivo
+from .fechas import inicio_dia_local
+
+SNAPSHOT_LOTE = 5000
+ESTADO_PK = 1
+
+
+def _fin_dia(dia):
+    return inicio_dia_local(dia + timedelta(days=1))
+
+
+def _movimientos(inicio, fin, **filtros):
+    """Querysets (activo y, si hace falta, archivo) con fecha en [inicio, fin)"""
+    rango = {}
+    if inicio is not None:
+        rango['fecha__gte'] = inicio
+    if fin is not None:
+        rango['fecha__lt'] = fin
+    consultas = [MovimientoInventario.objects.filter(**rango, **filtros)]
+    if requiere_archivo(inicio, historico=True):
+        consultas.append(MovimientoArchivado.objects.filter(**rango, **filtros))
+    return consultas
+
+
+def _deltas(inicio, fin, **filtros):
+    """{(producto_id, bodega_id): suma de variacion_stock} en [inicio, fin)"""
+    deltas = defaultdict(int)
+    for qs in _movimientos(inicio, fin, **filtros):
+        filas = qs.order_by().values('producto_id', 'bodega_id').annotate(suma=Sum('variacion_stock'))
+        for fila in filas:
+            deltas[(fila['producto_id'], fila['bodega_id'])] += fila['suma'] or 0
+    return deltas
+
+
+def _ultimos_saldos(dia, **filtros):
+    """{(producto_id, bodega_id): cantidad} del último snapshot de cada par en o antes de `dia`"""
+    ultimo = SnapshotStock.objects.filter(
+        producto_id=OuterRef('producto_id'), bodega_id=OuterRef('bodega_id'), fecha__lte=dia
+    ).order_by('-fecha').values('fecha')[:1]
+    filas = SnapshotStock.objects.filter(fecha__lte=dia, **filtros).filter(fecha=Subquery(ultimo))
+    return {
+        (s['producto_id'], s['bodega_id']): s['cantidad']
+        for s in filas.values('producto_id', 'bodega_id', 'cantidad')
+    }
+
+
+# ============================================
+# ESTADO Y DÍAS AFECTADOS
+# ============================================
+
+def estado_snapshots():
+    """(generado_hasta, pendiente_desde); (None, None) si nunca se generaron"""
+    estado = EstadoSnapshots.objects.filter(pk=ESTADO_PK).values_list('generado_hasta', 'pendiente_desde').first()
+    return estado or (None, None)
+
+
+def ultimo_snapshot():
+    return estado_snapshots()[0]
+
+
+def ultimo_dia_confiable():
+    """Último día cuyos snapshots reflejan el libro (antes de cualquier día pendiente de regenerar)"""
+    generado, pendiente = estado_snapshots()
+    if generado is None:
+        return None
+    if pendiente is not None and pendiente <= generado:
+        return pendiente - timedelta(days=1)
+    return generado
+
+
+def marcar_dias_afectados(*fechas):
+    """
+    Anota el primer día ya cerrado que cambia por un movimiento registrado,
+    modificado o anulado (pasar la fecha nueva y la anterior). Llamar dentro
+    de la transacción que contabiliza. Los movimientos de hoy no afectan
+    snapshots (se generan hasta ayer) y no escriben nada.
+    """
+    dias = [timezone.localtime(fecha).date() for fecha in fechas if fecha is not None]
+    if not dias:
+        return
+    dia = min(dias)
+    if dia >= timezone.localdate():
+        return
+    EstadoSnapshots.objects.filter(pk=ESTADO_PK).update(
+        pendiente_desde=Case(
+            When(Q(pendiente_desde__isnull=True) | Q(pendiente_desde__gt=dia), then=Value(dia)),
+            default=F('pendiente_desde'),
+        ),
+        marcas=F('marcas') + 1,
+    )
+
+
+# ============================================
+# GENERACIÓN
+# ============================================
+
+def _guardar_dia(dia, saldos, deltas):
+    """Un snapshot por par cuyo saldo cambió en el día (incluidos los que quedan en 0)"""
+    SnapshotStock.objects.bulk_create(
+        [
+            SnapshotStock(fecha=dia, producto_id=producto_id, bodega_id=bodega_id, cantidad=saldos[(producto_id, bodega_id)])
+            for (producto_id, bodega_id), delta in deltas.items()
+            if delta
+        ],
+        batch_size=SNAPSHOT_LOTE,
+    )
+
+
+def _primer_dia_libro():
+    fechas = [qs.aggregate(m=Min('fecha'))['m'] for qs in _movimientos(None, None)]
+    fechas = [f for f in fechas if f is not None]
+    return timezone.localtime(min(fechas)).date() if fechas else None
+
+
+def generar_snapshots(hasta=None, reconstruir_desde=None, progreso=None):
+    """
+    Genera los snapshots faltantes hasta `hasta` (por defecto, ayer; no puede
+    ser hoy ni posterior). Parte del último día generado y solo suma los
+    movimientos de cada día nuevo; si la contabilización anotó un día ya
+    generado, o se pide `reconstruir_desde`, rehace desde ese día.
+    Devuelve la cantidad de días generados.
+    """
+    hoy = timezone.localdate()
+    hasta = hasta or (hoy - timedelta(days=1))
+    if hasta >= hoy:
+        raise ValueError('Los snapshots solo se generan para días cerrados (hasta ayer)')
+
+    estado, _ = EstadoSnapshots.objects.get_or_create(pk=ESTADO_PK)
+    marcas = estado.marcas
+    generado = estado.generado_hasta
+    desde = generado + timedelta(days=1) if generado else None
+    for dia in (estado.pendiente_desde, reconstruir_desde):
+        if dia is not None and (desde is None or dia < desde):
+            desde = dia
+
+    if desde is None:
+        desde = _primer_dia_libro()
+    if desde is None:
+        return 0
+    with transaction.atomic():
+        SnapshotStock.objects.filter(fecha__gte=desde).delete()
+        if generado is not None and desde <= generado:
+            EstadoSnapshots.objects.filter(pk=ESTADO_PK).update(generado_hasta=desde - timedelta(days=1))
+    saldos = defaultdict(int, _ultimos_saldos(desde - timedelta(days=1)))
+
+    dias = 0
+    dia = desde
+    while dia <= hasta:
+        deltas = _deltas(inicio_dia_local(dia), _fin_dia(dia))
+        for clave, delta in deltas.items():
+            saldos[clave] += delta
+        with transaction.atomic():
+            _guardar_dia(dia, saldos, deltas)
+            EstadoSnapshots.objects.filter(pk=ESTADO_PK).update(generado_hasta=dia, fecha_generacion=timezone.now())
+        dias += 1
+        if progreso:
+            progreso(dia)
+        dia += timedelta(days=1)
+
+    # Si nadie anotó días mientras se generaba, ya no queda nada pendiente
+    EstadoSnapshots.objects.filter(pk=ESTADO_PK, marcas=marcas).update(pendiente_desde=None)
+    return dias
+
+
+# ============================================
+# CONSULTAS "A LA FECHA"
+# ============================================
+
+def _como_instante(momento):
+    """Una fecha significa el cierre de ese día; un datetime se usa tal cual"""
+    if isinstance(momento, datetime):
+        return momento if timezone.is_aware(momento) else timezone.make_aware(momento)
+    if isinstance(momento, date):
+        return _fin_dia(momento)
+    raise TypeError('Se esperaba date o datetime')
+
+
+def _saldos_en(instante, **filtros):
+    """Saldos {(producto_id, bodega_id): cantidad} en `instante`: snapshots confiables + movimientos posteriores"""
+    # El snapshot del día D cubre hasta el inicio de D+1: sirven los anteriores al día del instante
+    base_dia = ultimo_dia_confiable()
+    limite = timezone.localtime(instante).date() - timedelta(days=1)
+    if base_dia is not None and base_dia > limite:
+        base_dia = limite
+
+    saldos = defaultdict(int)
+    if base_dia is not None:
+        saldos.update(_ultimos_saldos(base_dia, **filtros))
+    for clave, delta in _deltas(_fin_dia(base_dia) if base_dia else None, instante, **filtros).items():
+        saldos[clave] += delta
+    return saldos
+
+
+def stock_a_fecha(producto, momento, bodega=None):
+    """
+    Stock de un producto (en una bodega o por bodega) en un instante pasado:
+    último snapshot de cada par + movimientos desde su cierre.
+    Devuelve {bodega_id: cantidad}.
+    """
+    filtros = {'producto_id': producto.pk}
+    if bodega is not None:
+        filtros['bodega_id'] = bodega.pk
+    saldos = _saldos_en(_como_instante(momento), **filtros)
+    return {bodega_id: cantidad for (_, bodega_id), cantidad in saldos.items() if cantidad}
+
+
+def saldos_al_cierre(dia):
+    """Saldos de todos los productos y bodegas al cierre de `dia` ({(producto_id, bodega_id): cantidad})"""
+    return {clave: cantidad for clave, cantidad in _saldos_en(_fin_dia(dia)).items() if cantidad}
@@ -0,0 +1,40 @@
+"""
+Sugerencias (typeahead) para los formularios de movimientos
+Búsquedas por prefijo sobre columnas indexadas (SKU y nombre del producto; RUT
+y razón social del proveedor): LIKE 'texto%' usa el índice, a diferencia de
+icontains. Cada página trae solo las columnas que muestra el desplegable y se
+avanza con la última clave vista (`despues`) en vez de OFFSET.
+"""
+from django.db.models import Q
+
+from ..models import Producto, Proveedor
+
+SUGERENCIAS_LIMITE = 20
+SUGERENCIAS_MAXIMO = 50
+
+
+def _pagina(queryset, clave, campos, despues, limite):
+    limite = min(max(limite, 1), SUGERENCIAS_MAXIMO)
+    if despues:
+        queryset = queryset.filter(**{f'{clave}__gt': despues})
+    filas = list(queryset.order_by(clave).values(*campos)[:limite + 1])
+    siguiente = filas[limite - 1][clave] if len(filas) > limite else None
+    return filas[:limite], siguiente
+
+
+def sugerir_productos(texto, despues=None, limite=SUGERENCIAS_LIMITE):
+    """Productos activos cuyo SKU o nombre empieza por `texto`; devuelve (filas, siguiente)"""
+    productos = Producto.objects.filter(activo=True)
+    texto = (texto or '').strip()
+    if texto:
+        productos = productos.filter(Q(sku__istartswith=texto) | Q(nombre__istartswith=texto))
+    return _pagina(productos, 'sku', ('sku', 'nombre'), despues, limite)
+
+
+def sugerir_proveedores(texto, despues=None, limite=SUGERENCIAS_LIMITE):
+    """Proveedores activos cuyo RUT o razón social empieza por `texto`; devuelve (filas, siguiente)"""
+    proveedores = Proveedor.objects.filter(estado='ACTIVO')
+    texto = (texto or '').strip()
+    if texto:
+        proveedores = proveedores.filter(Q(rut__istartswith=texto) | Q(razon_social__istartswith=texto))
+    return _pagina(proveedores, 'rut', ('rut', 'razon_social'), despues, limite)
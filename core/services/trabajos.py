@@ -0,0 +1,92 @@
+"""
+Cola de exportaciones en segundo plano
+La cola es la propia tabla TrabajoExportacion: los workers toman el trabajo
+pendiente más antiguo con SELECT ... FOR UPDATE SKIP LOCKED, así varios
+procesos pueden atender la cola sin tomar el mismo trabajo.
+"""
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from ..models import TrabajoExportacion
+from .exportacion import EXPORTACIONES, contar_filas, escribir_exportacion
+
+DIRECTORIO_EXPORTACIONES = 'exportaciones'
+
+
+def encolar_exportacion(entidad, params, formato, usuario=None):
+    """Registra una exportación pendiente con los filtros de la lista"""
+    if entidad not in EXPORTACIONES:
+        raise ValueError(f'Entidad de exportación desconocida: {entidad}')
+    params = params.copy()
+    for clave in ('formato', 'asincrono', 'page'):
+        params.pop(clave, None)
+    return TrabajoExportacion.objects.create(
+        usuario=usuario,
+        entidad=entidad,
+        formato=formato,
+        parametros=params.urlencode(),
+    )
+
+
+def tomar_siguiente_trabajo():
+    """Marca como EN_PROCESO el pendiente más antiguo y lo devuelve (o None)"""
+    with transaction.atomic():
+        trabajo = (
+            TrabajoExportacion.objects
+            .select_for_update(skip_locked=True)
+            .filter(estado='PENDIENTE')
+            .order_by('fecha_creacion', 'id')
+            .first()
+        )
+        if trabajo is None:
+            return None
+        trabajo.estado = 'EN_PROCESO'
+        trabajo.fecha_inicio = timezone.now()
+        trabajo.save(update_fields=['estado', 'fecha_inicio', 'fecha_modificacion'])
+    return trabajo
+
+
+def reencolar_trabajos_colgados(minutos):
+    """Devuelve a PENDIENTE los trabajos EN_PROCESO sin avance en los últimos `minutos`"""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return TrabajoExportacion.objects.filter(
+        estado='EN_PROCESO', fecha_modificacion__lt=limite
+    ).update(estado='PENDIENTE', filas_procesadas=0, fecha_modificacion=timezone.now())
+
+
+def ejecutar_trabajo(trabajo):
+    """Genera el archivo del trabajo en MEDIA_ROOT/exportaciones y registra el resultado"""
+    spec = EXPORTACIONES[trabajo.entidad]
+    consulta = spec['consulta'](QueryDict(trabajo.parametros))
+    pendientes = TrabajoExportacion.objects.filter(pk=trabajo.pk)
+    pendientes.update(total_filas=contar_filas(consulta), fecha_modificacion=timezone.now())
+
+    def progreso(filas):
+        pendientes.update(filas_procesadas=filas, fecha_modificacion=timezone.now())
+
+    nombre = f"{trabajo.entidad}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{trabajo.pk}.{trabajo.formato}"
+    relativo = f'{DIRECTORIO_EXPORTACIONES}/{nombre}'
+    ruta = os.path.join(settings.MEDIA_ROOT, DIRECTORIO_EXPORTACIONES, nombre)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    try:
+        with open(ruta, 'wb') as destino:
+            escribir_exportacion(
+                consulta, spec['columnas'], trabajo.formato, destino,
+                titulo=spec['titulo'], etiqueta_total=spec['etiqueta_total'],
+                progreso=progreso,
+            )
+    except Exception as exc:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        pendientes.update(estado='ERROR', error=str(exc), fecha_fin=timezone.now(),
+                          fecha_modificacion=timezone.now())
+        raise
+    pendientes.update(estado='COMPLETADO', archivo=relativo, fecha_fin=timezone.now(),
+                      fecha_modificacion=timezone.now())
+    trabajo.refresh_from_db()
+    return trabajo
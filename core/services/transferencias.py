@@ -0,0 +1,174 @@
+"""
+Transferencias entre bodegas
+Un documento de transferencia tiene una o muchas líneas (producto, cantidad).
+Cada línea se contabiliza en partida doble: una salida de la bodega de origen
+y una entrada en la de destino, ambos movimientos de tipo 'transferencia'
+enlazados por transferencia_id. La cantidad va siempre en positivo, como en el
+resto del libro; el sentido lo da el signo de variacion_stock. Todo el documento va en una
+transacción; se bloquean los productos y luego los saldos, siempre en orden de
+id, igual que la contabilización, así dos transferencias (o una transferencia y
+un movimiento) sobre los mismos SKU se serializan sin interbloqueos.
+El stock total y el costo promedio de los productos no cambian.
+"""
+import uuid
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from ..models import MovimientoInventario, Producto, StockBodega
+from .resumen import acumular_en_resumen
+from .snapshots import marcar_dias_afectados
+
+TRANSFERENCIA_LOTE = 500
+
+
+def lineas_por_sku(filas):
+    """
+    Convierte filas (sku, cantidad) de un formulario o CSV en [(producto, cantidad)]
+    con una sola consulta. ValueError con el detalle de los SKU o cantidades inválidos.
+    """
+    pares = []
+    errores = []
+    for numero, (sku, cantidad) in enumerate(filas, start=1):
+        sku = (sku or '').strip().upper()
+        try:
+            cantidad = int(str(cantidad).strip())
+        except (TypeError, ValueError):
+            errores.append(f'Línea {numero}: cantidad inválida "{cantidad}"')
+            continue
+        pares.append((numero, sku, cantidad))
+    productos = Producto.objects.in_bulk({sku for _, sku, _ in pares}, field_name='sku')
+    lineas = []
+    for numero, sku, cantidad in pares:
+        if sku not in productos:
+            errores.append(f'Línea {numero}: el producto "{sku}" no existe')
+        else:
+            lineas.append((productos[sku], cantidad))
+    if errores:
+        raise ValueError('; '.join(errores[:10]))
+    return lineas
+
+
+def _agrupar(lineas):
+    """{producto_id: [producto, cantidad]} en orden de id, sumando SKU repetidos"""
+    agrupadas = {}
+    for producto, cantidad in lineas:
+        if cantidad <= 0:
+            raise ValueError(f'La cantidad de {producto.sku} debe ser mayor que 0')
+        agrupadas.setdefault(producto.pk, [producto, 0])[1] += cantidad
+    if not agrupadas:
+        raise ValueError('La transferencia no tiene líneas')
+    return OrderedDict(sorted(agrupadas.items()))
+
+
+def _bloquear_saldos(ids, bodegas):
+    """Crea los saldos que falten y los bloquea en orden (producto, bodega)"""
+    existentes = set(
+        StockBodega.objects.filter(producto_id__in=ids, bodega_id__in=bodegas)
+        .values_list('producto_id', 'bodega_id')
+    )
+    StockBodega.objects.bulk_create(
+        [
+            StockBodega(producto_id=producto_id, bodega_id=bodega_id)
+            for producto_id in ids for bodega_id in bodegas
+            if (producto_id, bodega_id) not in existentes
+        ],
+        batch_size=TRANSFERENCIA_LOTE,
+        ignore_conflicts=True,
+    )
+    saldos = (
+        StockBodega.objects.select_for_update()
+        .filter(producto_id__in=ids, bodega_id__in=bodegas)
+        .order_by('producto_id', 'bodega_id')
+    )
+    return {(s.producto_id, s.bodega_id): s for s in saldos}
+
+
+def _aplicar_deltas(deltas):
+    """Suma a cada saldo ({pk: delta}) su variación, con un UPDATE por tramo"""
+    ahora = timezone.now()
+    pks = sorted(deltas)
+    for inicio in range(0, len(pks), TRANSFERENCIA_LOTE):
+        tramo = pks[inicio:inicio + TRANSFERENCIA_LOTE]
+        StockBodega.objects.filter(pk__in=tramo).update(
+            cantidad=F('cantidad') + Case(*[When(pk=pk, then=Value(deltas[pk])) for pk in tramo]),
+            fecha_modificacion=ahora,
+        )
+
+
+def registrar_transferencia(*, origen, destino, lineas, usuario, fecha=None, **campos):
+    """
+    Traslada `lineas` [(producto, cantidad), ...] de la bodega `origen` a `destino`.
+    `campos` (documento_numero, motivo...) se copian en todos los movimientos.
+    ValueError si las bodegas coinciden, una cantidad no es positiva o el origen
+    no tiene saldo suficiente. Devuelve el transferencia_id.
+    """
+    if origen.pk == destino.pk:
+        raise ValueError('La bodega de origen y la de destino deben ser distintas')
+    agrupadas = _agrupar(lineas)
+    ids = list(agrupadas)
+    transferencia_id = uuid.uuid4()
+    fecha = fecha or timezone.now()
+
+    with transaction.atomic():
+        list(Producto.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+        saldos = _bloquear_saldos(ids, sorted({origen.pk, destino.pk}))
+
+        faltantes = [
+            f'{producto.sku} (disponible {saldos[(pk, origen.pk)].cantidad}, pedido {cantidad})'
+            for pk, (producto, cantidad) in agrupadas.items()
+            if saldos[(pk, origen.pk)].cantidad < cantidad
+        ]
+        if faltantes:
+            raise ValueError(f'Stock insuficiente en {origen.codigo}: ' + ', '.join(faltantes[:10]))
+
+        movimientos = []
+        deltas = {}
+        for pk, (producto, cantidad) in agrupadas.items():
+            for bodega, variacion in ((origen, -cantidad), (destino, cantidad)):
+                movimiento = MovimientoInventario(
+                    tipo_movimiento='transferencia',
+                    producto=producto,
+                    bodega=bodega,
+                    cantidad=cantidad,
+                    variacion_stock=variacion,
+                    usuario=usuario,
+                    fecha=fecha,
+                    transferencia_id=transferencia_id,
+                    **campos
+                )
+                # bulk_create no dispara la señal pre_save que lo calcula
+                movimiento.texto_busqueda = movimiento.componer_texto_busqueda()
+                movimientos.append(movimiento)
+                deltas[saldos[(pk, bodega.pk)].pk] = variacion
+        MovimientoInventario.objects.bulk_create(movimientos, batch_size=TRANSFERENCIA_LOTE)
+        _aplicar_deltas(deltas)
+        acumular_en_resumen(movimientos)
+        marcar_dias_afectados(fecha)
+    return transferencia_id
+
+
+def anular_transferencia(transferencia_id):
+    """
+    Elimina todos los movimientos de una transferencia y devuelve el stock a la
+    bodega de origen. Devuelve cuántos movimientos se eliminaron.
+    """
+    with transaction.atomic():
+        movimientos = MovimientoInventario.objects.filter(transferencia_id=transferencia_id)
+        filas = list(movimientos.values_list('producto_id', 'bodega_id', 'variacion_stock'))
+        if not filas:
+            return 0
+        ids = sorted({producto_id for producto_id, _, _ in filas})
+        list(Producto.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+        saldos = _bloquear_saldos(ids, sorted({bodega_id for _, bodega_id, _ in filas}))
+        deltas = {}
+        for producto_id, bodega_id, variacion in filas:
+            pk = saldos[(producto_id, bodega_id)].pk
+            deltas[pk] = deltas.get(pk, 0) - variacion
+        _aplicar_deltas(deltas)
+        acumular_en_resumen(movimientos, signo=-1)
+        marcar_dias_afectados(*(movimiento.fecha for movimiento in movimientos))
+        eliminados, _ = movimientos.delete()
+    return eliminados
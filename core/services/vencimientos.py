@@ -0,0 +1,92 @@
+"""
+Alertas de vencimiento
+Producto.alerta_por_vencer se mantiene con un proceso por lotes (comando
+alertas_vencimiento, una vez al día) en vez de calcularse en cada vista: dos
+UPDATE por conjunto, apoyados en los índices por fecha de vencimiento de Lote y
+MovimientoInventario. El dashboard solo cuenta la marca ya calculada.
+"""
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from ..models import Lote, MovimientoInventario, Producto
+
+DIAS_ALERTA_VENCIMIENTO = 7
+
+
+def _limite(dias, hoy):
+    hoy = hoy or timezone.localdate()
+    return hoy, hoy + timedelta(days=dias)
+
+
+def lotes_por_vencer(dias=DIAS_ALERTA_VENCIMIENTO, hoy=None):
+    """Lotes con saldo que vencen dentro de `dias` días (incluye los ya vencidos)"""
+    _, limite = _limite(dias, hoy)
+    return Lote.objects.filter(fecha_vencimiento__lte=limite, cantidad_actual__gt=0)
+
+
+def ingresos_por_vencer(dias=DIAS_ALERTA_VENCIMIENTO, hoy=None):
+    """
+    Ingresos sin número de lote cuyo vencimiento cae entre hoy y `dias` días.
+    Sin lote no se sabe cuánto queda de ellos, así que solo cuentan mientras el
+    producto tenga stock.
+    """
+    hoy, limite = _limite(dias, hoy)
+    return MovimientoInventario.objects.filter(
+        Q(lote__isnull=True) | Q(lote=''),
+        tipo_movimiento='ingreso',
+        fecha_vencimiento__gte=hoy,
+        fecha_vencimiento__lte=limite,
+        producto__stock_actual__gt=0,
+    )
+
+
+def actualizar_alertas_vencimiento(dias=DIAS_ALERTA_VENCIMIENTO, hoy=None):
+    """
+    Recalcula Producto.alerta_por_vencer para todos los productos. Solo escribe
+    las filas que cambian. Devuelve (activadas, desactivadas).
+    """
+    por_vencer = (
+        Exists(lotes_por_vencer(dias, hoy).filter(producto_id=OuterRef('pk')))
+        | Exists(ingresos_por_vencer(dias, hoy).filter(producto_id=OuterRef('pk')))
+    )
+    activadas = Producto.objects.filter(por_vencer, alerta_por_vencer=False).update(alerta_por_vencer=True)
+    desactivadas = Producto.objects.filter(~por_vencer, alerta_por_vencer=True).update(alerta_por_vencer=False)
+    return activadas, desactivadas
+
+
+def reporte_por_vencer(dias=DIAS_ALERTA_VENCIMIENTO, hoy=None):
+    """
+    Filas del reporte de próximos a vencer, ordenadas por vencimiento:
+    dicts con sku, nombre, origen ('lote' o 'ingreso'), referencia, bodega,
+    fecha_vencimiento, dias_restantes y cantidad.
+    """
+    hoy = hoy or timezone.localdate()
+    filas = []
+    lotes = lotes_por_vencer(dias, hoy).select_related('producto', 'bodega').order_by('fecha_vencimiento', 'id')
+    for lote in lotes:
+        filas.append({
+            'sku': lote.producto.sku,
+            'nombre': lote.producto.nombre,
+            'origen': 'lote',
+            'referencia': lote.numero_lote,
+            'bodega': lote.bodega.codigo if lote.bodega_id else '',
+            'fecha_vencimiento': lote.fecha_vencimiento,
+            'dias_restantes': (lote.fecha_vencimiento - hoy).days,
+            'cantidad': lote.cantidad_actual,
+        })
+    ingresos = ingresos_por_vencer(dias, hoy).select_related('producto', 'bodega').order_by('fecha_vencimiento', 'id')
+    for mov in ingresos:
+        filas.append({
+            'sku': mov.producto.sku,
+            'nombre': mov.producto.nombre,
+            'origen': 'ingreso',
+            'referencia': mov.documento_numero or f'#{mov.pk}',
+            'bodega': mov.bodega.codigo,
+            'fecha_vencimiento': mov.fecha_vencimiento,
+            'dias_restantes': (mov.fecha_vencimiento - hoy).days,
+            'cantidad': mov.cantidad,
+        })
+    filas.sort(key=lambda f: (f['fecha_vencimiento'], f['sku']))
+    return filas
@@ -10,3 +10,58 @@ def set_must_change_password_on_create(sender, instance, created, **kwargs):
             user=instance,
             defaults={'must_change_password': True}
         )
+
+
+# ============================================
+# TEXTO DE BÚSQUEDA DE MOVIMIENTOS
+# ============================================
+from django.db.models.signals import pre_save
+from .models import MovimientoInventario, Producto, Proveedor
+from .services.busqueda import reindexar_relacionados
+
+CAMPOS_BUSQUEDA = {
+    Producto: ('producto', ('sku', 'nombre')),
+    Proveedor: ('proveedor', ('rut', 'razon_social')),
+}
+
+
+@receiver(pre_save, sender=MovimientoInventario)
+def componer_texto_busqueda(sender, instance, **kwargs):
+    instance.texto_busqueda = instance.componer_texto_busqueda()
+
+
+@receiver(pre_save, sender=Producto)
+@receiver(pre_save, sender=Proveedor)
+def recordar_campos_busqueda(sender, instance, update_fields=None, **kwargs):
+    """Guarda los valores buscables previos para que post_save sepa si cambiaron"""
+    instance._campos_busqueda_previos = None
+    _, campos = CAMPOS_BUSQUEDA[sender]
+    if instance.pk is None or (update_fields is not None and not set(campos) & set(update_fields)):
+        return
+    instance._campos_busqueda_previos = sender.objects.filter(pk=instance.pk).values(*campos).first()
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Proveedor)
+def propagar_texto_busqueda(sender, instance, created, **kwargs):
+    """Si cambió un campo buscable, recalcula el texto de sus movimientos (activos y archivados)"""
+    previos = getattr(instance, '_campos_busqueda_previos', None)
+    if created or previos is None:
+        return
+    relacion, campos = CAMPOS_BUSQUEDA[sender]
+    if all(previos[campo] == getattr(instance, campo) for campo in campos):
+        return
+    reindexar_relacionados(**{relacion: instance})
+
+
+# ============================================
+# RESUMEN DIARIO DE MOVIMIENTOS
+# ============================================
+from django.db.models.signals import pre_delete
+from .services.resumen import quitar_proveedor
+
+
+@receiver(pre_delete, sender=Proveedor)
+def quitar_proveedor_del_resumen(sender, instance, **kwargs):
+    """Sus filas del resumen se suman a las de proveedor nulo antes del SET_NULL"""
+    quitar_proveedor(instance.pk)
@@ -1,3 +1,1357 @@
-from django.test import TestCase
+import csv
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from core.models import (
+    AsignacionLote, Bodega, Categoria, ClaveIdempotencia, Lote, MovimientoArchivado, MovimientoInventario,
+    Producto, PronosticoDemanda, Proveedor, ProveedorProducto, ResumenDiarioMovimientos, SaldoApertura,
+    SnapshotStock, StockBodega, SugerenciaReposicion, TrabajoExportacion, UnidadMedida, Usuario,
+)
+from core.services.alertas import recalcular_alerta_bajo_stock, recalcular_alertas_por_lotes
+from core.services.archivo import archivar_movimientos, saldo_apertura
+from core.services.busqueda import reindexar_por_lotes
+from core.services.clasificacion import asignar_clases, clasificar_abc
+from core.services.consultas import consultas_movimientos, contadores_movimientos, filtrar_movimientos
+from core.services.costos import recalcular_costos_promedio
+from core.services.exportacion import EXPORTACIONES, generar_exportacion
+from core.services.fechas import inicio_dia_local, mes_actual_local, rango_dia_local
+from core.services.idempotencia import ejecutar_una_vez, limpiar_claves
+from core.services.inventario import anular_movimiento, modificar_movimiento, registrar_movimiento
+from core.services.kardex import Kardex, decodificar_posicion
+from core.services.paginacion import paginar_por_cursor
+from core.services.reconciliacion import reconciliar_tramo
+from core.services.pronosticos import factores_semanales, generar_pronosticos, salidas_diarias
+from core.services.reposicion import generar_sugerencias_reposicion, velocidad_demanda
+from core.services.resumen import CLAVE_RESUMEN, _agrupar_dias, conteo_movimientos, reconstruir_resumen
+from core.services.snapshots import estado_snapshots, generar_snapshots, saldos_al_cierre, stock_a_fecha
+from core.services.sugerencias import sugerir_productos, sugerir_proveedores
+from core.services.trabajos import reencolar_trabajos_colgados
+from core.services.transferencias import anular_transferencia, registrar_transferencia
+from core.services.vencimientos import actualizar_alertas_vencimiento, reporte_por_vencer
+
+
+class DatosInventarioMixin:
+    """Usuario ADMIN, dos productos y dos bodegas para las pruebas de inventario"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('operador', 'operador@lilis.cl', 'clave-segura')
+        cls.perfil = Usuario.objects.get(user=cls.user)
+        cls.perfil.rol = 'ADMIN'
+        cls.perfil.save()
+        cls.categoria = Categoria.objects.create(nombre='Temporada')
+        cls.uom = UnidadMedida.objects.create(codigo='UN', nombre='Unidad')
+        cls.producto = cls.crear_producto('CHOC-001', stock_minimo=5)
+        cls.otro_producto = cls.crear_producto('CARA-002')
+        cls.central = Bodega.objects.create(codigo='B01', nombre='Central')
+        cls.sucursal = Bodega.objects.create(codigo='B02', nombre='Sucursal')
+
+    @classmethod
+    def crear_producto(cls, sku, **campos):
+        return Producto.objects.create(
+            sku=sku, nombre=f'Producto {sku}', categoria=cls.categoria,
+            uom_compra=cls.uom, uom_venta=cls.uom, **campos
+        )
+
+    def registrar(self, tipo, cantidad, producto=None, bodega=None, **campos):
+        return registrar_movimiento(
+            tipo_movimiento=tipo, producto=producto or self.producto, bodega=bodega or self.central,
+            cantidad=cantidad, usuario=self.perfil, **campos
+        )
+
+    def assertSaldos(self, producto, esperados):
+        """Saldos {codigo_bodega: cantidad} y stock total igual a su suma"""
+        saldos = dict(
+            StockBodega.objects.filter(producto=producto).exclude(cantidad=0)
+            .values_list('bodega__codigo', 'cantidad')
+        )
+        self.assertEqual(saldos, esperados)
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock_actual, sum(esperados.values()))
+
+
+# ============================================
+# CONTABILIZACIÓN
+# ============================================
+
+class ContabilizacionTests(DatosInventarioMixin, TestCase):
+
+    def test_registrar_actualiza_saldo_y_stock(self):
+        self.registrar('ingreso', 10)
+        self.registrar('ingreso', 4, bodega=self.sucursal)
+        movimiento = self.registrar('salida', 3)
+        self.assertEqual(movimiento.variacion_stock, -3)
+        self.assertSaldos(self.producto, {'B01': 7, 'B02': 4})
+
+    def test_ajuste_deja_el_saldo_contado(self):
+        self.registrar('ingreso', 10)
+        ajuste = self.registrar('ajuste', 6)
+        self.assertEqual(ajuste.variacion_stock, -4)
+        self.assertSaldos(self.producto, {'B01': 6})
+
+    def test_anular_revierte_el_efecto(self):
+        self.registrar('ingreso', 10)
+        salida = self.registrar('salida', 4)
+        anular_movimiento(salida)
+        self.assertFalse(MovimientoInventario.objects.filter(pk=salida.pk).exists())
+        self.assertSaldos(self.producto, {'B01': 10})
+
+    def test_modificar_cambia_cantidad_producto_y_bodega(self):
+        movimiento = self.registrar('ingreso', 10)
+        movimiento.cantidad = 7
+        movimiento.bodega = self.sucursal
+        movimiento.producto = self.otro_producto
+        modificar_movimiento(movimiento)
+        self.assertSaldos(self.producto, {})
+        self.assertSaldos(self.otro_producto, {'B02': 7})
+
+    def test_saldos_por_bodega_suman_el_stock(self):
+        for tipo, cantidad, bodega in [
+            ('ingreso', 20, self.central), ('ingreso', 5, self.sucursal), ('salida', 8, self.central),
+            ('devolucion', 2, self.sucursal), ('ajuste', 10, self.central),
+        ]:
+            self.registrar(tipo, cantidad, bodega=bodega)
+        self.assertSaldos(self.producto, {'B01': 10, 'B02': 7})
+
+    def test_stock_inicial_del_producto_entra_como_ingreso(self):
+        self.client.force_login(self.user)
+        sesion = self.client.session
+        sesion['producto_id'] = self.producto.pk
+        sesion.save()
+        self.client.post(reverse('core:producto_paso2'), {
+            'stock_minimo': 5, 'stock_inicial': 8, 'bodega_inicial': self.central.pk,
+        })
+        ingreso = MovimientoInventario.objects.get(producto=self.producto)
+        self.assertEqual((ingreso.tipo_movimiento, ingreso.cantidad), ('ingreso', 8))
+        self.assertSaldos(self.producto, {'B01': 8})
+
+    def test_paso2_no_edita_el_stock_directamente(self):
+        self.client.force_login(self.user)
+        self.client.post(f"{reverse('core:producto_paso2')}?id={self.producto.pk}", {
+            'stock_minimo': 5, 'stock_actual': 99, 'stock_inicial': 99, 'bodega_inicial': self.central.pk,
+        })
+        self.assertFalse(MovimientoInventario.objects.filter(producto=self.producto).exists())
+        self.assertSaldos(self.producto, {})
+
+
+# ============================================
+# LOTES (FEFO)
+# ============================================
+
+class LotesTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        hoy = timezone.localdate()
+        self.registrar('ingreso', 5, lote='L-TARDE', fecha_vencimiento=hoy + timedelta(days=90))
+        self.registrar('ingreso', 5, lote='L-PRONTO', fecha_vencimiento=hoy + timedelta(days=10))
+
+    def cantidades(self):
+        return dict(Lote.objects.values_list('numero_lote', 'cantidad_actual'))
+
+    def test_salida_consume_primero_el_que_vence_antes(self):
+        salida = self.registrar('salida', 7)
+        self.assertEqual(self.cantidades(), {'L-PRONTO': Decimal('0'), 'L-TARDE': Decimal('3')})
+        self.assertEqual(salida.lote, 'L-PRONTO')
+        self.assertEqual(
+            sorted(AsignacionLote.objects.filter(movimiento=salida).values_list('lote__numero_lote', 'cantidad')),
+            [('L-PRONTO', Decimal('-5')), ('L-TARDE', Decimal('-2'))],
+        )
+
+    def test_omite_lotes_vencidos(self):
+        Lote.objects.filter(numero_lote='L-PRONTO').update(
+            fecha_vencimiento=timezone.localdate() - timedelta(days=1)
+        )
+        self.registrar('salida', 2)
+        self.assertEqual(self.cantidades(), {'L-PRONTO': Decimal('5'), 'L-TARDE': Decimal('3')})
+
+    def test_anular_salida_devuelve_a_los_lotes(self):
+        salida = self.registrar('salida', 7)
+        anular_movimiento(salida)
+        self.assertEqual(self.cantidades(), {'L-PRONTO': Decimal('5'), 'L-TARDE': Decimal('5')})
+        self.assertFalse(AsignacionLote.objects.filter(movimiento_id=salida.pk).exists())
+
+    def test_no_anula_un_ingreso_ya_consumido(self):
+        self.registrar('salida', 7)
+        ingreso = MovimientoInventario.objects.get(lote='L-PRONTO', tipo_movimiento='ingreso')
+        with self.assertRaises(ValueError):
+            anular_movimiento(ingreso)
+        self.assertEqual(self.cantidades(), {'L-PRONTO': Decimal('0'), 'L-TARDE': Decimal('3')})
+        self.assertSaldos(self.producto, {'B01': 3})
+
+    def test_respeta_el_lote_indicado(self):
+        salida = self.registrar('salida', 4, lote='L-TARDE')
+        self.assertEqual(self.cantidades(), {'L-PRONTO': Decimal('5'), 'L-TARDE': Decimal('1')})
+        self.assertEqual(salida.fecha_vencimiento, timezone.localdate() + timedelta(days=90))
+
+    def test_rechaza_lote_indicado_sin_saldo_suficiente(self):
+        with self.assertRaises(ValueError):
+            self.registrar('salida', 6, lote='L-TARDE')
+        self.assertEqual(self.cantidades(), {'L-PRONTO': Decimal('5'), 'L-TARDE': Decimal('5')})
+        self.assertSaldos(self.producto, {'B01': 10})
+
+    def test_lotes_por_bodega(self):
+        hoy = timezone.localdate()
+        self.registrar('ingreso', 5, bodega=self.sucursal, lote='L-SUC', fecha_vencimiento=hoy + timedelta(days=5))
+        self.registrar('salida', 2)
+        self.assertEqual(self.cantidades()['L-SUC'], Decimal('5'))
+        self.registrar('salida', 1, bodega=self.sucursal)
+        self.assertEqual(self.cantidades()['L-SUC'], Decimal('4'))
+        with self.assertRaises(ValueError):
+            self.registrar('salida', 1, bodega=self.sucursal, lote='L-TARDE')
+        with self.assertRaises(ValueError):
+            self.registrar('ingreso', 1, bodega=self.sucursal, lote='L-TARDE', fecha_vencimiento=hoy)
+
+    def test_editar_salida_fefo_vuelve_a_repartir(self):
+        salida = self.registrar('salida', 7)
+        salida.cantidad = 8
+        modificar_movimiento(salida)
+        self.assertEqual(self.cantidades(), {'L-PRONTO': Decimal('0'), 'L-TARDE': Decimal('2')})
+
+
+# ============================================
+# ALERTAS DE VENCIMIENTO
+# ============================================
+
+class AlertasVencimientoTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+
+    def alertas(self):
+        return dict(Producto.objects.values_list('sku', 'alerta_por_vencer'))
+
+    def test_lote_con_saldo_por_vencer(self):
+        self.registrar('ingreso', 5, lote='L-1', fecha_vencimiento=self.hoy + timedelta(days=3))
+        self.registrar('ingreso', 5, producto=self.otro_producto, lote='L-2',
+                       fecha_vencimiento=self.hoy + timedelta(days=30))
+        self.assertEqual(actualizar_alertas_vencimiento(), (1, 0))
+        self.assertEqual(self.alertas(), {'CHOC-001': True, 'CARA-002': False})
+
+        self.registrar('salida', 5)
+        self.assertEqual(actualizar_alertas_vencimiento(), (0, 1))
+        self.assertEqual(actualizar_alertas_vencimiento(dias=40), (1, 0))
+        self.assertEqual(self.alertas(), {'CHOC-001': False, 'CARA-002': True})
+
+    def test_ingreso_sin_lote_cuenta_mientras_haya_stock(self):
+        self.registrar('ingreso', 4, bodega=self.sucursal, fecha_vencimiento=self.hoy + timedelta(days=2),
+                       documento_numero='F-77')
+        actualizar_alertas_vencimiento()
+        self.assertTrue(self.alertas()['CHOC-001'])
+        self.registrar('salida', 4, bodega=self.sucursal)
+        actualizar_alertas_vencimiento()
+        self.assertFalse(self.alertas()['CHOC-001'])
+
+    def test_reporte_ordenado_por_vencimiento(self):
+        self.registrar('ingreso', 5, lote='L-1', fecha_vencimiento=self.hoy + timedelta(days=6))
+        self.registrar('ingreso', 4, bodega=self.sucursal, fecha_vencimiento=self.hoy + timedelta(days=1),
+                       documento_numero='F-77')
+        filas = reporte_por_vencer()
+        self.assertEqual(
+            [(f['origen'], f['referencia'], f['bodega'], f['dias_restantes'], f['cantidad']) for f in filas],
+            [('ingreso', 'F-77', 'B02', 1, 4), ('lote', 'L-1', 'B01', 6, Decimal('5'))],
+        )
+
+    def test_comando_diario(self):
+        self.registrar('ingreso', 5, lote='L-1', fecha_vencimiento=self.hoy)
+        salida = StringIO()
+        call_command('alertas_vencimiento', '--reporte', stdout=salida)
+        self.assertIn('1 activada(s)', salida.getvalue())
+        self.assertIn('lote: L-1 B01', salida.getvalue())
+
+
+# ============================================
+# ASISTENTE DE MOVIMIENTOS (BORRADOR EN SESIÓN)
+# ============================================
+
+class AsistenteMovimientoTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def paso1(self, **datos):
+        fecha = timezone.localtime(timezone.now() - timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')
+        return self.client.post(reverse('core:movimiento_paso1'), {
+            'fecha': fecha, 'tipo': 'ingreso', 'cantidad': '8', 'producto': 'CHOC-001', 'bodega': 'B01',
+            'clave_idempotencia': 'asistente-1', **datos,
+        })
+
+    def paso3(self):
+        return self.client.post(reverse('core:movimiento_paso3'), {
+            'documento_tipo': 'GUIA', 'documento_numero': '123', 'clave_idempotencia': 'asistente-1',
+        })
+
+    def test_solo_el_paso_3_contabiliza(self):
+        self.assertRedirects(self.paso1(), reverse('core:movimiento_paso2'), fetch_redirect_response=False)
+        self.client.post(reverse('core:movimiento_paso2'), {'lote': 'L-1', 'numero_serie': ''})
+        self.assertFalse(MovimientoInventario.objects.exists())
+        self.assertEqual(self.client.session['movimiento_borrador']['lote'], 'L-1')
+
+        self.assertRedirects(self.paso3(), reverse('core:lista_movimientos'), fetch_redirect_response=False)
+        movimiento = MovimientoInventario.objects.get()
+        self.assertEqual((movimiento.lote, movimiento.documento_numero), ('L-1', '123'))
+        self.assertSaldos(self.producto, {'B01': 8})
+        self.assertNotIn('movimiento_borrador', self.client.session)
+
+    def test_reenviar_la_confirmacion_no_duplica(self):
+        self.paso1()
+        self.paso3()
+        self.assertRedirects(self.paso3(), reverse('core:lista_movimientos'), fetch_redirect_response=False)
+        self.assertEqual(MovimientoInventario.objects.count(), 1)
+        self.assertSaldos(self.producto, {'B01': 8})
+
+    def test_volver_al_paso_1_conserva_el_paso_2(self):
+        self.paso1()
+        self.client.post(reverse('core:movimiento_paso2'), {'lote': 'L-2', 'numero_serie': 'S-9'})
+        self.paso1(cantidad='3')
+        borrador = self.client.session['movimiento_borrador']
+        self.assertEqual((borrador['cantidad'], borrador['lote'], borrador['numero_serie']), (3, 'L-2', 'S-9'))
+
+    def test_lote_de_otro_producto(self):
+        self.registrar(
+            'ingreso', 1, producto=self.otro_producto, lote='AJENO',
+            fecha_vencimiento=timezone.localdate() + timedelta(days=30),
+        )
+        self.paso1()
+        respuesta = self.client.post(reverse('core:movimiento_paso2'), {'lote': 'AJENO', 'numero_serie': ''})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('lote', self.client.session['movimiento_borrador'])
+
+    def test_sin_borrador_vuelve_al_paso_1(self):
+        for paso in ('core:movimiento_paso2', 'core:movimiento_paso3'):
+            respuesta = self.client.get(reverse(paso))
+            self.assertRedirects(respuesta, reverse('core:movimiento_paso1'), fetch_redirect_response=False)
+
+
+# ============================================
+# IDEMPOTENCIA
+# ============================================
+
+class IdempotenciaTests(DatosInventarioMixin, TestCase):
+
+    def test_reintento_devuelve_el_resultado_guardado(self):
+        llamadas = []
+
+        def contabilizar():
+            llamadas.append(1)
+            return self.registrar('ingreso', 3).pk
+
+        referencia, repetida = ejecutar_una_vez(self.user, 'clave-1', 'movimiento', contabilizar)
+        self.assertFalse(repetida)
+        otra, repetida = ejecutar_una_vez(self.user, 'clave-1', 'movimiento', contabilizar)
+        self.assertTrue(repetida)
+        self.assertEqual(otra, referencia)
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(MovimientoInventario.objects.count(), 1)
+        self.assertSaldos(self.producto, {'B01': 3})
+
+    def test_clave_usada_en_otra_operacion(self):
+        ejecutar_una_vez(self.user, 'clave-2', 'movimiento', lambda: 1)
+        with self.assertRaises(ValueError):
+            ejecutar_una_vez(self.user, 'clave-2', 'transferencia', lambda: 2)
+
+    def test_si_falla_la_clave_se_descarta(self):
+        def fallar():
+            self.registrar('ingreso', 3)
+            raise ValueError('falla')
+
+        with self.assertRaises(ValueError):
+            ejecutar_una_vez(self.user, 'clave-3', 'movimiento', fallar)
+        self.assertFalse(ClaveIdempotencia.objects.exists())
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+    def test_sin_clave_ejecuta_siempre(self):
+        ejecutar_una_vez(self.user, '', 'movimiento', lambda: self.registrar('ingreso', 1).pk)
+        ejecutar_una_vez(self.user, '', 'movimiento', lambda: self.registrar('ingreso', 1).pk)
+        self.assertEqual(MovimientoInventario.objects.count(), 2)
+
+    def test_doble_envio_de_la_transferencia(self):
+        self.registrar('ingreso', 10)
+        self.client.force_login(self.user)
+        datos = {'origen': 'B01', 'destino': 'B02', 'lineas': 'CHOC-001 4', 'clave_idempotencia': 'doble-envio'}
+        for _ in range(2):
+            respuesta = self.client.post(reverse('core:transferencia_bodegas'), datos)
+            self.assertRedirects(respuesta, reverse('core:lista_movimientos'), fetch_redirect_response=False)
+        self.assertEqual(MovimientoInventario.objects.filter(tipo_movimiento='transferencia').count(), 2)
+        self.assertSaldos(self.producto, {'B01': 6, 'B02': 4})
+
+    def test_limpiar_claves_vencidas(self):
+        ejecutar_una_vez(self.user, 'vieja', 'movimiento', lambda: 1)
+        ejecutar_una_vez(self.user, 'nueva', 'movimiento', lambda: 2)
+        ClaveIdempotencia.objects.filter(clave='vieja').update(fecha_creacion=timezone.now() - timedelta(hours=48))
+        self.assertEqual(limpiar_claves(horas=24, lote=1), 1)
+        self.assertEqual(list(ClaveIdempotencia.objects.values_list('clave', flat=True)), ['nueva'])
+
+
+# ============================================
+# TRANSFERENCIAS ENTRE BODEGAS
+# ============================================
+
+class TransferenciasTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.registrar('ingreso', 10)
+        self.registrar('ingreso', 4, producto=self.otro_producto)
+
+    def transferir(self, *lineas):
+        return registrar_transferencia(
+            origen=self.central, destino=self.sucursal, lineas=list(lineas), usuario=self.perfil
+        )
+
+    def test_cada_linea_genera_dos_tramos_enlazados(self):
+        transferencia_id = self.transferir((self.producto, 6), (self.otro_producto, 4))
+        tramos = MovimientoInventario.objects.filter(transferencia_id=transferencia_id)
+        self.assertEqual(
+            sorted(tramos.values_list('producto__sku', 'bodega__codigo', 'cantidad', 'variacion_stock')),
+            [('CARA-002', 'B01', 4, -4), ('CARA-002', 'B02', 4, 4), ('CHOC-001', 'B01', 6, -6), ('CHOC-001', 'B02', 6, 6)],
+        )
+        self.assertSaldos(self.producto, {'B01': 4, 'B02': 6})
+        self.assertSaldos(self.otro_producto, {'B02': 4})
+
+    def test_stock_insuficiente_no_mueve_nada(self):
+        with self.assertRaises(ValueError):
+            self.transferir((self.producto, 6), (self.otro_producto, 5))
+        self.assertFalse(MovimientoInventario.objects.filter(transferencia_id__isnull=False).exists())
+        self.assertSaldos(self.producto, {'B01': 10})
+
+    def test_misma_bodega(self):
+        with self.assertRaises(ValueError):
+            registrar_transferencia(
+                origen=self.central, destino=self.central, lineas=[(self.producto, 1)], usuario=self.perfil
+            )
+
+    def test_rechaza_transferencia_de_un_solo_tramo(self):
+        with self.assertRaises(ValueError):
+            self.registrar('transferencia', 3)
+        self.assertSaldos(self.producto, {'B01': 10})
+
+    def test_anular_devuelve_el_stock(self):
+        transferencia_id = self.transferir((self.producto, 6))
+        self.assertEqual(anular_transferencia(transferencia_id), 2)
+        self.assertSaldos(self.producto, {'B01': 10})
+
+    def test_un_tramo_no_se_anula_ni_edita_solo(self):
+        transferencia_id = self.transferir((self.producto, 6))
+        tramo = MovimientoInventario.objects.filter(transferencia_id=transferencia_id).first()
+        with self.assertRaises(ValueError):
+            anular_movimiento(tramo)
+        with self.assertRaises(ValueError):
+            modificar_movimiento(tramo)
+        self.assertSaldos(self.producto, {'B01': 4, 'B02': 6})
+
+    def test_reconciliacion_cuadra_las_transferencias(self):
+        self.transferir((self.producto, 6))
+        self.registrar('salida', 2, bodega=self.sucursal)
+        resultado = reconciliar_tramo(0, 10 ** 9)
+        self.assertEqual((resultado.diferencias, resultado.movimientos_corregidos), ([], 0))
+        self.assertEqual(
+            ResumenDiarioMovimientos.objects.filter(tipo_movimiento='transferencia')
+            .aggregate(cantidad=Sum('cantidad'), variacion=Sum('variacion_stock')),
+            {'cantidad': 12, 'variacion': 0},
+        )
+
+
+# ============================================
+# PAGINACIÓN POR CURSOR
+# ============================================
+
+class PaginacionCursorTests(DatosInventarioMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        ahora = timezone.now()
+        # Fechas repetidas: el desempate por id debe mantener el orden estable
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(
+                tipo_movimiento='ingreso', producto=cls.producto, bodega=cls.central, cantidad=1,
+                variacion_stock=1, usuario=cls.perfil, fecha=ahora - timedelta(minutes=i // 3),
+            )
+            for i in range(23)
+        ])
+        cls.orden = list(MovimientoInventario.objects.order_by('-fecha', '-id').values_list('pk', flat=True))
+
+    def test_recorre_todas_las_filas_sin_repetir(self):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            pagina = paginar_por_cursor(MovimientoInventario.objects.all(), cursor, 5)
+            vistos += [m.pk for m in pagina]
+            paginas += 1
+            if not pagina.has_next:
+                break
+            cursor = pagina.siguiente
+        self.assertEqual(vistos, self.orden)
+        self.assertEqual(paginas, 5)
+
+    def test_retroceder_vuelve_a_la_pagina_anterior(self):
+        primera = paginar_por_cursor(MovimientoInventario.objects.all(), None, 5)
+        segunda = paginar_por_cursor(MovimientoInventario.objects.all(), primera.siguiente, 5)
+        self.assertFalse(primera.has_previous)
+        self.assertEqual([m.pk for m in segunda], self.orden[5:10])
+        anterior = paginar_por_cursor(MovimientoInventario.objects.all(), segunda.anterior, 5)
+        self.assertEqual([m.pk for m in anterior], self.orden[:5])
+
+    def test_cursor_adulterado_vuelve_al_inicio(self):
+        pagina = paginar_por_cursor(MovimientoInventario.objects.all(), 'no-es-un-cursor', 5)
+        self.assertEqual([m.pk for m in pagina], self.orden[:5])
+
+    def test_lista_acepta_solo_los_tamanos_ofrecidos(self):
+        self.client.force_login(self.user)
+        for valor, esperado in [('200', 200), ('100000', 100), ('abc', 100)]:
+            respuesta = self.client.get(reverse('core:lista_movimientos'), {'page_size': valor})
+            self.assertEqual(respuesta.context['page_size'], esperado)
+            self.assertEqual(len(respuesta.context['movimientos']), 23)
+
+
+# ============================================
+# CONTADORES DE LA LISTA
+# ============================================
+
+class ContadoresMovimientosTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.registrar('ingreso', 10)
+        self.registrar('ingreso', 5, bodega=self.sucursal)
+        self.registrar('salida', 3)
+        self.registrar('ajuste', 4, bodega=self.sucursal)
+        MovimientoInventario.objects.filter(tipo_movimiento='ajuste').update(
+            fecha=timezone.now() - timedelta(days=70)
+        )
+
+    def test_una_consulta_con_conteos_condicionales(self):
+        with CaptureQueriesContext(connection) as consultas:
+            contadores = contadores_movimientos(QueryDict())
+        sobre_el_libro = [q['sql'] for q in consultas.captured_queries if 'core_movimientoinventario' in q['sql']]
+        self.assertEqual(len(sobre_el_libro), 1)
+        self.assertEqual(contadores, {'total': 4, 'ingresos': 2, 'salidas': 1, 'este_mes': 3})
+
+    def test_cache_por_firma_de_filtros(self):
+        contadores_movimientos(QueryDict())
+        with self.assertNumQueries(0):
+            contadores_movimientos(QueryDict('page=3'))
+        self.assertEqual(contadores_movimientos(QueryDict('tipo=salida'))['total'], 1)
+
+
+# ============================================
+# EXPORTACIONES
+# ============================================
+
+class ExportacionMovimientosTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.registrar('ingreso', 10, documento_numero='F-1')
+        self.registrar('salida', 3)
+        self.registrar('ingreso', 2, producto=self.otro_producto, bodega=self.sucursal)
+
+    def descargar(self, **params):
+        respuesta = self.client.get(reverse('core:exportar_movimientos_excel'), params)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return b''.join(respuesta.streaming_content)
+
+    def test_excel_lista_todos_los_movimientos(self):
+        hoja = load_workbook(BytesIO(self.descargar())).active
+        filas = list(hoja.iter_rows(min_row=4, values_only=True))
+        self.assertEqual(filas[0][:3], ('Fecha', 'Tipo', 'SKU'))
+        datos = filas[1:-1]
+        self.assertEqual(len(datos), 3)
+        self.assertEqual([fila[2] for fila in datos], ['CARA-002', 'CHOC-001', 'CHOC-001'])
+        self.assertEqual(filas[-1][-1], 3)
+
+    def test_excel_respeta_los_filtros_de_la_lista(self):
+        hoja = load_workbook(BytesIO(self.descargar(tipo='salida'))).active
+        datos = list(hoja.iter_rows(min_row=5, values_only=True))[:-1]
+        self.assertEqual([(fila[1], fila[6]) for fila in datos], [('Salida', 3)])
+
+
+class MotorExportacionTests(DatosInventarioMixin, TestCase):
+
+    def exportar(self, entidad, formato, **params):
+        spec = EXPORTACIONES[entidad]
+        filtros = QueryDict(mutable=True)
+        filtros.update(params)
+        return b''.join(generar_exportacion(spec['consulta'](filtros), spec['columnas'], formato)).decode('utf-8')
+
+    def test_csv_de_productos_con_filtro(self):
+        contenido = self.exportar('productos', 'csv', buscar='CHOC').lstrip('\ufeff')
+        filas = list(csv.reader(contenido.splitlines()))
+        self.assertEqual(filas[0][:2], ['SKU', 'Nombre'])
+        self.assertEqual([fila[0] for fila in filas[1:]], ['CHOC-001'])
+
+    def test_jsonl_de_movimientos(self):
+        self.registrar('ingreso', 10)
+        self.registrar('salida', 4)
+        lineas = [json.loads(linea) for linea in self.exportar('movimientos', 'jsonl').splitlines()]
+        self.assertEqual([(l['Tipo'], l['Cantidad']) for l in lineas], [('Salida', 4), ('Ingreso', 10)])
+
+    def test_vista_de_productos_exporta_csv(self):
+        self.client.force_login(self.user)
+        respuesta = self.client.get(reverse('core:exportar_productos_excel'), {'formato': 'csv'})
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8')
+        self.assertEqual(len(contenido.lstrip('\ufeff').splitlines()), 3)
+
+
+class TrabajosExportacionTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        medios = override_settings(MEDIA_ROOT=directorio)
+        medios.enable()
+        self.addCleanup(medios.disable)
+        self.client.force_login(self.user)
+
+    def encolar(self, **params):
+        respuesta = self.client.get(reverse('core:exportar_movimientos_excel'), {'asincrono': '1', **params})
+        self.assertEqual(respuesta.status_code, 202)
+        return respuesta.json()
+
+    def test_encolar_procesar_y_descargar(self):
+        self.registrar('ingreso', 10)
+        self.registrar('salida', 4)
+        trabajo = self.encolar(formato='csv', tipo='salida')
+        self.assertEqual((trabajo['estado'], trabajo['url_descarga']), ('PENDIENTE', None))
+
+        call_command('procesar_exportaciones', '--una-vez', stdout=StringIO())
+
+        estado = self.client.get(trabajo['url_estado']).json()
+        self.assertEqual((estado['estado'], estado['progreso'], estado['total_filas']), ('COMPLETADO', 100, 1))
+        descarga = self.client.get(estado['url_descarga'])
+        filas = list(csv.reader(b''.join(descarga.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual([(fila[1], fila[6]) for fila in filas[1:]], [('Salida', '4')])
+
+    def test_otro_usuario_no_ve_el_trabajo(self):
+        trabajo = self.encolar()
+        otro = User.objects.create_user('visita', 'visita@lilis.cl', 'clave-segura')
+        self.client.force_login(otro)
+        self.assertEqual(self.client.get(trabajo['url_estado']).status_code, 404)
+        self.assertEqual(self.client.get(reverse('core:mis_exportaciones')).json(), {'trabajos': []})
+
+    def test_reencola_trabajos_sin_avance(self):
+        trabajo = TrabajoExportacion.objects.create(
+            usuario=self.user, entidad='movimientos', estado='EN_PROCESO', filas_procesadas=50
+        )
+        TrabajoExportacion.objects.filter(pk=trabajo.pk).update(
+            fecha_modificacion=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(reencolar_trabajos_colgados(30), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.filas_procesadas), ('PENDIENTE', 0))
+
+
+# ============================================
+# BÚSQUEDA DE MOVIMIENTOS
+# ============================================
+
+class BusquedaMovimientosTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.registrar('ingreso', 10, fecha=timezone.now() - timedelta(days=400))
+        self.reciente = self.registrar('salida', 2)
+        archivar_movimientos(timezone.now() - timedelta(days=30))
+        self.archivado = MovimientoArchivado.objects.get()
+
+    def textos(self):
+        self.reciente.refresh_from_db()
+        self.archivado.refresh_from_db()
+        return self.reciente.texto_busqueda, self.archivado.texto_busqueda
+
+    def test_texto_se_compone_al_guardar(self):
+        self.assertEqual(self.reciente.texto_busqueda.split(), ['choc-001', 'producto', 'choc-001'])
+
+    def test_renombrar_producto_reindexa_activos_y_archivados(self):
+        self.producto.nombre = 'Bombón Relleno'
+        self.producto.save()
+        for texto in self.textos():
+            self.assertIn('bombón relleno', texto)
+        self.assertEqual(filtrar_movimientos(QueryDict('search=bombón choc')).get(), self.reciente)
+
+    def test_reindexar_por_lotes_recorre_ambas_tablas(self):
+        MovimientoInventario.objects.update(texto_busqueda='')
+        MovimientoArchivado.objects.update(texto_busqueda='')
+        tablas = []
+        total = reindexar_por_lotes(lote=1, progreso=lambda tabla, hasta_id, total: tablas.append(tabla))
+        self.assertEqual(total, 2)
+        self.assertEqual(set(tablas), {'activa', 'archivo'})
+        for texto in self.textos():
+            self.assertIn('choc-001', texto)
+
+
+# ============================================
+# ARCHIVO Y SALDOS DE APERTURA
+# ============================================
+
+class ArchivoMovimientosTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        antiguo = timezone.now() - timedelta(days=400)
+        self.registrar('ingreso', 10, costo_unitario=Decimal('100'), fecha=antiguo)
+        self.registrar('ingreso', 5, bodega=self.sucursal, costo_unitario=Decimal('200'), fecha=antiguo)
+        self.registrar('salida', 3, fecha=antiguo + timedelta(days=1))
+        self.registrar('ingreso', 4)
+        self.corte = timezone.now() - timedelta(days=30)
+
+    def aperturas(self):
+        return {
+            a.bodega.codigo: (a.cantidad, a.movimientos, a.costo_promedio)
+            for a in SaldoApertura.objects.filter(producto=self.producto)
+        }
+
+    def test_traslada_y_deja_saldos_de_apertura(self):
+        self.assertEqual(archivar_movimientos(self.corte), 3)
+        self.assertEqual(MovimientoArchivado.objects.count(), 3)
+        self.assertEqual(MovimientoInventario.objects.count(), 1)
+        self.assertEqual(self.aperturas(), {
+            'B01': (7, 2, Decimal('133.33')),
+            'B02': (5, 1, Decimal('133.33')),
+        })
+        self.assertEqual(saldo_apertura(self.producto), 12)
+        self.assertEqual(saldo_apertura(self.producto, self.central), 7)
+        self.assertSaldos(self.producto, {'B01': 11, 'B02': 5})
+
+    def test_lotes_pequenos_dan_el_mismo_resultado(self):
+        self.assertEqual(archivar_movimientos(self.corte, lote=1), 3)
+        self.assertEqual(self.aperturas(), {
+            'B01': (7, 2, Decimal('133.33')),
+            'B02': (5, 1, Decimal('133.33')),
+        })
+
+    def test_un_segundo_corte_acumula_sobre_la_apertura(self):
+        archivar_movimientos(timezone.now() - timedelta(days=400, hours=-12))
+        self.assertEqual(self.aperturas(), {
+            'B01': (10, 1, Decimal('133.33')),
+            'B02': (5, 1, Decimal('133.33')),
+        })
+        archivar_movimientos(self.corte)
+        self.assertEqual(self.aperturas()['B01'], (7, 2, Decimal('133.33')))
+
+    def test_no_retrocede_el_corte(self):
+        archivar_movimientos(self.corte)
+        with self.assertRaises(ValueError):
+            archivar_movimientos(self.corte - timedelta(days=1))
+
+    def test_la_lista_lee_el_archivo_solo_si_el_rango_lo_pide(self):
+        archivar_movimientos(self.corte)
+        self.assertEqual(len(consultas_movimientos(QueryDict())), 1)
+        desde = (timezone.localdate() - timedelta(days=500)).isoformat()
+        activa, archivo = consultas_movimientos(QueryDict(f'desde={desde}'))
+        self.assertEqual((activa.count(), archivo.count()), (1, 3))
+        self.assertEqual(len(consultas_movimientos(QueryDict('historico=1'))), 2)
+
+
+# ============================================
+# SNAPSHOTS Y STOCK A LA FECHA
+# ============================================
+
+class SnapshotsStockTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.registrar('ingreso', 10, fecha=self.mediodia(-5))
+        self.registrar('ingreso', 6, bodega=self.sucursal, fecha=self.mediodia(-5))
+        self.registrar('salida', 3, fecha=self.mediodia(-3))
+        self.registrar('ingreso', 2, fecha=self.mediodia(-1))
+        self.registrar('salida', 1)
+
+    def dia(self, dias):
+        return self.hoy + timedelta(days=dias)
+
+    def mediodia(self, dias):
+        return inicio_dia_local(self.dia(dias)) + timedelta(hours=12)
+
+    def por_bodega(self, saldos):
+        codigos = dict(Bodega.objects.values_list('pk', 'codigo'))
+        return {codigos[bodega_id]: cantidad for bodega_id, cantidad in saldos.items()}
+
+    def test_genera_solo_los_dias_con_cambios(self):
+        self.assertEqual(generar_snapshots(), 5)
+        filas = SnapshotStock.objects.filter(bodega=self.central).order_by('fecha')
+        self.assertEqual(
+            list(filas.values_list('fecha', 'cantidad')),
+            [(self.dia(-5), 10), (self.dia(-3), 7), (self.dia(-1), 9)],
+        )
+        self.assertEqual(estado_snapshots(), (self.dia(-1), None))
+        self.assertEqual(generar_snapshots(), 0)
+
+    def test_stock_a_fecha_con_y_sin_snapshots(self):
+        consultas = [
+            (self.dia(-4), {'B01': 10, 'B02': 6}),
+            (self.mediodia(-3) - timedelta(hours=1), {'B01': 10, 'B02': 6}),
+            (self.dia(-2), {'B01': 7, 'B02': 6}),
+            (self.dia(0), {'B01': 8, 'B02': 6}),
+        ]
+        for momento, esperado in consultas:
+            self.assertEqual(self.por_bodega(stock_a_fecha(self.producto, momento)), esperado)
+        generar_snapshots()
+        for momento, esperado in consultas:
+            self.assertEqual(self.por_bodega(stock_a_fecha(self.producto, momento)), esperado)
+        self.assertEqual(self.por_bodega(stock_a_fecha(self.producto, self.dia(-2), self.sucursal)), {'B02': 6})
+
+    def test_movimiento_con_fecha_pasada_invalida_los_snapshots(self):
+        generar_snapshots()
+        self.registrar('salida', 4, fecha=self.mediodia(-4))
+        self.assertEqual(estado_snapshots(), (self.dia(-1), self.dia(-4)))
+        self.assertEqual(self.por_bodega(stock_a_fecha(self.producto, self.dia(-2))), {'B01': 3, 'B02': 6})
+
+        self.assertEqual(generar_snapshots(), 4)
+        self.assertEqual(estado_snapshots(), (self.dia(-1), None))
+        self.assertEqual(self.por_bodega(stock_a_fecha(self.producto, self.dia(-2))), {'B01': 3, 'B02': 6})
+        self.assertEqual(
+            saldos_al_cierre(self.dia(-1)),
+            {(self.producto.pk, self.central.pk): 5, (self.producto.pk, self.sucursal.pk): 6},
+        )
+
+    def test_no_genera_el_dia_en_curso(self):
+        with self.assertRaises(ValueError):
+            generar_snapshots(hasta=self.hoy)
+
+
+# ============================================
+# KARDEX
+# ============================================
+
+class KardexTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.inicio = timezone.now() - timedelta(days=10)
+        self.registrar('ingreso', 10, costo_unitario=Decimal('100'), fecha=self.dia(0))
+        self.registrar('ingreso', 10, costo_unitario=Decimal('200'), fecha=self.dia(1))
+        self.registrar('salida', 5, fecha=self.dia(2))
+        self.registrar('ingreso', 5, bodega=self.sucursal, costo_unitario=Decimal('300'), fecha=self.dia(3))
+
+    def dia(self, n):
+        return self.inicio + timedelta(days=n)
+
+    def lineas(self, kardex):
+        return [(l.saldo, l.saldo_total, l.costo_promedio) for l in kardex]
+
+    def test_saldo_y_costo_acumulados(self):
+        self.assertEqual(self.lineas(Kardex(self.producto)), [
+            (10, 10, Decimal('100')), (20, 20, Decimal('150')),
+            (15, 15, Decimal('150')), (20, 20, Decimal('187.50')),
+        ])
+
+    def test_por_bodega_con_costo_del_producto(self):
+        kardex = Kardex(self.producto, bodega=self.sucursal)
+        self.assertEqual(self.lineas(kardex), [(5, 20, Decimal('187.50'))])
+        self.assertEqual(kardex.count(), 1)
+
+    def test_desde_parte_de_lo_anterior(self):
+        primera = next(iter(Kardex(self.producto, desde=self.dia(2))))
+        self.assertEqual((primera.saldo_anterior, primera.saldo, primera.costo_promedio), (20, 15, Decimal('150')))
+
+    def test_paginas_por_cursor_continuan_el_acumulado(self):
+        completo = self.lineas(Kardex(self.producto))
+        recorrido, posicion = [], None
+        while True:
+            pagina = Kardex(self.producto, posicion=posicion).pagina(3)
+            recorrido += self.lineas(pagina)
+            if not pagina.has_next:
+                break
+            posicion = decodificar_posicion(pagina.siguiente, self.producto)
+        self.assertEqual(recorrido, completo)
+
+    def test_cursor_de_otro_ambito_se_descarta(self):
+        token = Kardex(self.producto).pagina(1).siguiente
+        self.assertIsNone(decodificar_posicion(token, self.otro_producto))
+        self.assertIsNone(decodificar_posicion(token, self.producto, self.central))
+        self.assertIsNone(decodificar_posicion('adulterado', self.producto))
+
+    def test_parte_del_saldo_de_apertura_tras_archivar(self):
+        archivar_movimientos(self.dia(1) + timedelta(hours=1))
+        self.assertEqual(self.lineas(Kardex(self.producto, desde=self.dia(2))), [
+            (15, 15, Decimal('150')), (20, 20, Decimal('187.50')),
+        ])
+        self.assertEqual(len(self.lineas(Kardex(self.producto, historico=True))), 4)
+
+
+# ============================================
+# COSTO PROMEDIO
+# ============================================
+
+class CostoPromedioTests(DatosInventarioMixin, TestCase):
+
+    def costo(self, producto=None):
+        producto = producto or self.producto
+        producto.refresh_from_db()
+        return producto.costo_promedio
+
+    def test_costo_promedio_ponderado(self):
+        self.registrar('ingreso', 10, costo_unitario=Decimal('100'))
+        self.registrar('ingreso', 10, costo_unitario=Decimal('200'))
+        self.registrar('salida', 5)
+        self.assertEqual(self.costo(), Decimal('150.00'))
+        self.registrar('ingreso', 5, costo_unitario=Decimal('300'))
+        self.assertEqual(self.costo(), Decimal('187.50'))
+
+    def test_ingreso_sin_costo_usa_el_vigente_o_el_estandar(self):
+        Producto.objects.filter(pk=self.producto.pk).update(costo_estandar=Decimal('80'))
+        self.producto.refresh_from_db()
+        primero = self.registrar('ingreso', 10)
+        self.assertEqual(primero.costo_unitario, Decimal('80'))
+        self.registrar('ingreso', 10, costo_unitario=Decimal('120'))
+        segundo = self.registrar('ingreso', 5)
+        self.assertEqual(segundo.costo_unitario, Decimal('100.00'))
+        self.assertEqual(self.costo(), Decimal('100.00'))
+
+    def test_anular_un_ingreso_rehace_el_costo(self):
+        self.registrar('ingreso', 10, costo_unitario=Decimal('100'))
+        ingreso = self.registrar('ingreso', 10, costo_unitario=Decimal('200'))
+        anular_movimiento(ingreso)
+        self.assertEqual(self.costo(), Decimal('100.00'))
+
+    def test_recalculo_masivo_corrige_por_tramos(self):
+        self.registrar('ingreso', 10, costo_unitario=Decimal('100'))
+        self.registrar('ingreso', 10, costo_unitario=Decimal('200'))
+        self.registrar('ingreso', 4, producto=self.otro_producto, costo_unitario=Decimal('30'))
+        Producto.objects.update(costo_promedio=Decimal('1'))
+        tramos = []
+        revisados, corregidos = recalcular_costos_promedio(lote=1, progreso=lambda r, c: tramos.append(r))
+        self.assertEqual((revisados, corregidos, tramos), (2, 2, [1, 2]))
+        self.assertEqual((self.costo(), self.costo(self.otro_producto)), (Decimal('150.00'), Decimal('30.00')))
+        self.assertEqual(recalcular_costos_promedio(), (2, 0))
+
+    def test_recalculo_historico_corrige_la_apertura(self):
+        antiguo = timezone.now() - timedelta(days=400)
+        self.registrar('ingreso', 10, costo_unitario=Decimal('100'), fecha=antiguo)
+        self.registrar('ingreso', 10, costo_unitario=Decimal('200'), fecha=antiguo + timedelta(days=1))
+        self.registrar('ingreso', 20, costo_unitario=Decimal('50'))
+        archivar_movimientos(timezone.now() - timedelta(days=30))
+        SaldoApertura.objects.update(costo_promedio=Decimal('1'))
+        recalcular_costos_promedio(historico=True)
+        self.assertEqual(SaldoApertura.objects.get().costo_promedio, Decimal('150.00'))
+        self.assertEqual(self.costo(), Decimal('100.00'))
+
+
+# ============================================
+# RECONCILIACIÓN
+# ============================================
+
+class ReconciliacionTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.registrar('ingreso', 10, costo_unitario=Decimal('200'), fecha=timezone.now() - timedelta(days=3))
+        # Cargado sin contabilizar y con la variación mal calculada
+        self.cargado = MovimientoInventario.objects.create(
+            tipo_movimiento='ingreso', producto=self.producto, bodega=self.central, cantidad=5,
+            variacion_stock=0, costo_unitario=Decimal('100'), usuario=self.perfil,
+            fecha=timezone.now() - timedelta(days=2),
+        )
+        reconstruir_resumen()
+        generar_snapshots()
+
+    def reconciliar(self, corregir=False):
+        return reconciliar_tramo(0, 10 ** 9, corregir=corregir)
+
+    def resumen(self):
+        return {
+            tuple(getattr(fila, campo) for campo in CLAVE_RESUMEN): [fila.movimientos, fila.cantidad, fila.variacion_stock]
+            for fila in ResumenDiarioMovimientos.objects.all()
+        }
+
+    def test_informa_sin_tocar_nada(self):
+        resultado = self.reconciliar()
+        self.assertEqual((resultado.productos, resultado.movimientos_corregidos), (2, 1))
+        self.assertEqual(
+            {(d.bodega_id, d.esperado, d.registrado) for d in resultado.diferencias},
+            {(self.central.pk, 15, 10), (None, 15, 10)},
+        )
+        self.cargado.refresh_from_db()
+        self.assertEqual(self.cargado.variacion_stock, 0)
+        self.assertSaldos(self.producto, {'B01': 10})
+
+    def test_corregir_repara_saldos_resumen_snapshots_y_costo(self):
+        self.assertEqual(self.reconciliar(corregir=True).movimientos_corregidos, 1)
+        self.cargado.refresh_from_db()
+        self.assertEqual(self.cargado.variacion_stock, 5)
+        self.assertSaldos(self.producto, {'B01': 15})
+        self.assertEqual(self.producto.costo_promedio, Decimal('166.67'))
+        self.assertEqual(self.resumen(), dict(_agrupar_dias(timezone.now() - timedelta(days=30))))
+        self.assertEqual(estado_snapshots()[1], timezone.localtime(self.cargado.fecha).date())
+        self.assertEqual(stock_a_fecha(self.producto, timezone.localdate() - timedelta(days=1)), {self.central.pk: 15})
+
+        resultado = self.reconciliar()
+        self.assertEqual((resultado.diferencias, resultado.movimientos_corregidos), ([], 0))
+
+
+# ============================================
+# ALERTA DE BAJO STOCK
+# ============================================
+
+class AlertaBajoStockTests(DatosInventarioMixin, TestCase):
+
+    def alerta(self, producto=None):
+        producto = producto or self.producto
+        producto.refresh_from_db()
+        return producto.alerta_bajo_stock
+
+    def test_contabilizacion_mantiene_la_alerta(self):
+        self.registrar('ingreso', 10)
+        self.assertFalse(self.alerta())
+        salida = self.registrar('salida', 6)
+        self.assertTrue(self.alerta())
+        anular_movimiento(salida)
+        self.assertFalse(self.alerta())
+
+    def test_recalcula_tras_update_masivo(self):
+        self.registrar('ingreso', 10)
+        Producto.objects.update(stock_minimo=20)
+        self.assertEqual(recalcular_alerta_bajo_stock(), 1)
+        self.assertTrue(self.alerta())
+        self.assertEqual(recalcular_alerta_bajo_stock(), 0)
+
+    def test_recalcula_por_lotes(self):
+        self.registrar('ingreso', 10)
+        self.registrar('ingreso', 10, producto=self.otro_producto)
+        Producto.objects.update(stock_minimo=50)
+        tramos = []
+        total = recalcular_alertas_por_lotes(1, progreso=lambda hasta_id, total: tramos.append(total))
+        self.assertEqual(total, 2)
+        self.assertEqual(tramos[-1], 2)
+        self.assertTrue(self.alerta() and self.alerta(self.otro_producto))
+
+    def test_reconciliacion_corrige_la_alerta(self):
+        self.registrar('ingreso', 10)
+        # Salida cargada sin contabilizar: stock y alerta quedan desalineados
+        MovimientoInventario.objects.create(
+            tipo_movimiento='salida', producto=self.producto, bodega=self.central, cantidad=6,
+            variacion_stock=0, usuario=self.perfil, fecha=timezone.now(),
+        )
+        reconciliar_tramo(0, 10 ** 9, corregir=True)
+        self.assertSaldos(self.producto, {'B01': 4})
+        self.assertTrue(self.alerta())
+
+
+# ============================================
+# SUGERENCIAS (TYPEAHEAD)
+# ============================================
+
+class SugerenciasTests(DatosInventarioMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(5):
+            cls.crear_producto(f'CHOC-1{i:02d}')
+        cls.crear_producto('CHOC-999', activo=False)
+        Producto.objects.filter(pk=cls.crear_producto('MENTA-01').pk).update(nombre='Chocolate con menta')
+        for rut, razon_social, estado in [
+            ('76.111.111-1', 'Cacao del Sur', 'ACTIVO'),
+            ('76.222.222-2', 'Caramelos Andinos', 'ACTIVO'),
+            ('76.333.333-3', 'Cacao Inactivo', 'INACTIVO'),
+        ]:
+            Proveedor.objects.create(rut=rut, razon_social=razon_social, giro='Dulces', estado=estado)
+
+    def test_productos_por_prefijo_de_sku_o_nombre(self):
+        filas, siguiente = sugerir_productos('choc')
+        self.assertEqual(
+            [fila['sku'] for fila in filas],
+            ['CHOC-001', 'CHOC-100', 'CHOC-101', 'CHOC-102', 'CHOC-103', 'CHOC-104', 'MENTA-01'],
+        )
+        self.assertIsNone(siguiente)
+
+    def test_productos_pagina_por_la_ultima_clave(self):
+        vistos, despues = [], None
+        while True:
+            filas, despues = sugerir_productos('CHOC-', despues, limite=2)
+            vistos += [fila['sku'] for fila in filas]
+            if despues is None:
+                break
+        self.assertEqual(vistos, ['CHOC-001', 'CHOC-100', 'CHOC-101', 'CHOC-102', 'CHOC-103', 'CHOC-104'])
+
+    def test_proveedores_activos_por_razon_social(self):
+        filas, _ = sugerir_proveedores('cacao')
+        self.assertEqual(filas, [{'rut': '76.111.111-1', 'razon_social': 'Cacao del Sur'}])
+
+    def test_endpoint_json(self):
+        self.client.force_login(self.user)
+        respuesta = self.client.get(reverse('core:sugerencias_productos'), {'q': 'CHOC-1', 'limite': 'x'})
+        datos = respuesta.json()
+        self.assertEqual(len(datos['resultados']), 5)
+        self.assertEqual(set(datos['resultados'][0]), {'sku', 'nombre'})
+        self.assertIsNone(datos['siguiente'])
+        respuesta = self.client.get(reverse('core:sugerencias_proveedores'), {'q': '76.2', 'limite': '1'})
+        self.assertEqual(respuesta.json()['resultados'][0]['razon_social'], 'Caramelos Andinos')
+
+
+# ============================================
+# SUGERENCIAS DE REPOSICIÓN
+# ============================================
+
+class ReposicionTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.proveedor = Proveedor.objects.create(rut='76.111.111-1', razon_social='Cacao del Sur', giro='Dulces')
+        ProveedorProducto.objects.create(
+            proveedor=self.proveedor, producto=self.producto, costo=Decimal('100'), lead_time=5,
+            es_proveedor_preferente=True,
+        )
+        # 30 unidades de salida en los últimos 30 días: 1 por día; quedan 10 en stock
+        self.registrar('ingreso', 40, fecha=timezone.now() - timedelta(days=20))
+        self.registrar('salida', 30, fecha=timezone.now() - timedelta(days=10))
+
+    def sugerencia(self):
+        self.assertEqual(generar_sugerencias_reposicion(), 1)
+        return SugerenciaReposicion.objects.get()
+
+    def test_velocidad_de_demanda(self):
+        self.assertEqual(velocidad_demanda(), {self.producto.pk: Decimal('1')})
+
+    def test_sugiere_hasta_cubrir_el_punto_de_reorden(self):
+        sugerencia = self.sugerencia()
+        # Punto de reorden: stock mínimo 5 + 5 días de lead time; objetivo: punto + 30 días
+        self.assertEqual((sugerencia.proveedor_id, sugerencia.punto_reorden), (self.proveedor.pk, Decimal('10.00')))
+        self.assertEqual((sugerencia.cantidad_sugerida, sugerencia.costo_estimado), (30, Decimal('3000.00')))
+
+    def test_pedido_minimo_y_stock_maximo(self):
+        ProveedorProducto.objects.update(pedido_minimo=Decimal('5000'))
+        self.assertEqual(self.sugerencia().cantidad_sugerida, 50)
+        Producto.objects.filter(pk=self.producto.pk).update(stock_maximo=Decimal('25'))
+        ProveedorProducto.objects.update(pedido_minimo=None)
+        self.assertEqual(self.sugerencia().cantidad_sugerida, 15)
+
+    def test_sobre_el_punto_de_reorden_no_sugiere(self):
+        self.registrar('ingreso', 5)
+        self.assertEqual(generar_sugerencias_reposicion(), 0)
+
+    def test_el_pronostico_reemplaza_la_demanda_reciente(self):
+        PronosticoDemanda.objects.create(
+            producto=self.producto, fecha_base=timezone.localdate(), promedio_movil=Decimal('3'),
+            suavizado=Decimal('3'), demanda_semana=Decimal('21'),
+        )
+        # Punto de reorden 5 + 3 × 5 = 20; objetivo 20 + 3 × 30
+        self.assertEqual(self.sugerencia().cantidad_sugerida, 100)
+
+
+# ============================================
+# PRONÓSTICO DE DEMANDA
+# ============================================
+
+@override_settings(CATEGORIAS_ESTACIONALES=())
+class PronosticosTests(DatosInventarioMixin, TestCase):
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.registrar('ingreso', 1000, fecha=timezone.now() - timedelta(days=100))
+        # 2 unidades diarias los últimos 28 días (hasta ayer)
+        for dias in range(1, 29):
+            self.registrar('salida', 2, fecha=inicio_dia_local(self.hoy - timedelta(days=dias)) + timedelta(hours=12))
+
+    def pronostico(self):
+        return PronosticoDemanda.objects.get(producto=self.producto)
+
+    def test_salidas_diarias(self):
+        matriz = salidas_diarias([self.otro_producto.pk, self.producto.pk], self.hoy - timedelta(days=2), self.hoy)
+        self.assertEqual(matriz.tolist(), [[0, 0, 0], [2, 2, 0]])
+
+    def test_factores_semanales(self):
+        lunes = self.hoy - timedelta(days=self.hoy.weekday())
+        matriz = np.zeros((2, 56))
+        matriz[0, ::7] = 7
+        factores = factores_semanales(matriz, lunes)
+        self.assertEqual(factores[0].tolist(), [7, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(factores[1].tolist(), [1] * 7)
+
+    def test_genera_promedio_y_suavizado(self):
+        self.assertEqual(generar_pronosticos(), 2)
+        pronostico = self.pronostico()
+        self.assertEqual(pronostico.fecha_base, self.hoy - timedelta(days=1))
+        self.assertEqual((pronostico.promedio_movil, pronostico.suavizado), (Decimal('2.000'), Decimal('2.000')))
+        self.assertEqual(pronostico.demanda_semana, Decimal('14.00'))
+        self.assertIsNone(pronostico.factores_semana)
+        self.assertEqual(generar_pronosticos(), 0)
+
+    def test_continua_el_suavizado_con_los_dias_nuevos(self):
+        generar_pronosticos()
+        self.registrar('salida', 9)
+        self.assertEqual(generar_pronosticos(hasta=self.hoy), 2)
+        # 0,3 × 9 + 0,7 × 2
+        self.assertEqual(self.pronostico().suavizado, Decimal('4.100'))
+
+    @override_settings(CATEGORIAS_ESTACIONALES=('Temporada',))
+    def test_categoria_estacional_guarda_factores(self):
+        generar_pronosticos()
+        self.assertEqual(len(self.pronostico().factores_semana), 7)
+
+
+# ============================================
+# CLASIFICACIÓN ABC
+# ============================================
+
+class ClasificacionAbcTests(DatosInventarioMixin, TestCase):
+
+    def test_asignar_clases_por_valor_acumulado(self):
+        self.assertEqual(asignar_clases([20, 700, 0, 80, 200]).tolist(), ['C', 'A', 'C', 'B', 'A'])
+        self.assertEqual(asignar_clases([0, 0]).tolist(), ['C', 'C'])
+
+    def test_clasificar_y_resumir(self):
+        ayer = timezone.now() - timedelta(days=1)
+        self.registrar('ingreso', 10, costo_unitario=Decimal('100'), fecha=ayer - timedelta(days=1))
+        self.registrar('salida', 6, fecha=ayer)
+        self.registrar('ingreso', 10, producto=self.otro_producto, costo_unitario=Decimal('10'), fecha=ayer)
+        self.registrar('salida', 1, producto=self.otro_producto, fecha=ayer)
+        # Las salidas de hoy aún no cuentan
+        self.registrar('salida', 1, producto=self.otro_producto)
+        inactivo = self.crear_producto('RETIRADO', activo=False, clase_abc='A')
+
+        resumen = clasificar_abc()
+        clases = dict(Producto.objects.values_list('sku', 'clase_abc'))
+        self.assertEqual(clases, {'CHOC-001': 'A', 'CARA-002': 'C', 'RETIRADO': None})
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).valor_consumo_anual, Decimal('600.00'))
+        self.assertEqual(resumen['A'], {'productos': 1, 'consumo': Decimal('600.00'), 'inventario': Decimal('400.00')})
+        self.assertEqual(resumen['C']['consumo'], Decimal('10.00'))
+        self.assertNotIn('B', resumen)
+        inactivo.refresh_from_db()
+        self.assertEqual(inactivo.valor_consumo_anual, Decimal('0'))
+
+
+# ============================================
+# RESUMEN DIARIO
+# ============================================
+
+class ResumenDiarioTests(DatosInventarioMixin, TestCase):
+
+    def resumen(self):
+        return {
+            tuple(getattr(fila, campo) for campo in CLAVE_RESUMEN): [
+                fila.movimientos, fila.cantidad, fila.variacion_stock,
+            ]
+            for fila in ResumenDiarioMovimientos.objects.all()
+        }
+
+    def assertResumenCuadraConLibro(self):
+        libro = _agrupar_dias(timezone.now() - timedelta(days=3650))
+        self.assertEqual(self.resumen(), dict(libro))
+
+    def test_contabilizacion_mantiene_el_resumen(self):
+        ayer = timezone.now() - timedelta(days=1)
+        self.registrar('ingreso', 10, fecha=ayer)
+        salida = self.registrar('salida', 3)
+        editado = self.registrar('ingreso', 5, bodega=self.sucursal)
+        editado.cantidad = 2
+        editado.fecha = ayer
+        modificar_movimiento(editado)
+        anular_movimiento(salida)
+        transferencia_id = registrar_transferencia(
+            origen=self.central, destino=self.sucursal, lineas=[(self.producto, 4)], usuario=self.perfil
+        )
+        self.assertResumenCuadraConLibro()
+        anular_transferencia(transferencia_id)
+        self.assertResumenCuadraConLibro()
+        self.assertEqual(conteo_movimientos(), MovimientoInventario.objects.count())
+
+    def test_reconstruir_genera_lo_mismo(self):
+        self.registrar('ingreso', 10, fecha=timezone.now() - timedelta(days=40))
+        self.registrar('salida', 2)
+        esperado = self.resumen()
+        ResumenDiarioMovimientos.objects.all().delete()
+        reconstruir_resumen()
+        self.assertEqual(self.resumen(), esperado)
+
+    def test_reconstruir_incluye_el_archivo(self):
+        self.registrar('ingreso', 10, fecha=timezone.now() - timedelta(days=40))
+        self.registrar('salida', 2)
+        esperado = self.resumen()
+        archivar_movimientos(timezone.now() - timedelta(days=30))
+        ResumenDiarioMovimientos.objects.all().delete()
+        reconstruir_resumen()
+        self.assertEqual(self.resumen(), esperado)
+        self.assertEqual(conteo_movimientos(hasta=timezone.localdate() - timedelta(days=30)), 1)
+
+
+# ============================================
+# ÍNDICES DE MOVIMIENTOS (EXPLAIN, solo MySQL)
+# ============================================
+
+@skipUnless(connection.vendor == 'mysql', 'Los planes de ejecución se verifican sobre MySQL')
+class IndicesMovimientosTests(DatosInventarioMixin, TestCase):
+    """
+    Los filtros por fecha comparan la columna con rangos [inicio, fin) en vez de
+    envolverla en funciones: el plan debe poder usar los índices compuestos.
+    Se revisa que el índice aparezca en el plan (possible_keys o key); con
+    tablas de prueba casi vacías el optimizador igual puede preferir un
+    recorrido completo.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        ahora = timezone.now()
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(
+                tipo_movimiento='ingreso' if i % 3 else 'salida',
+                producto=cls.producto if i % 2 else cls.otro_producto,
+                bodega=cls.central if i % 4 else cls.sucursal,
+                cantidad=1,
+                variacion_stock=1 if i % 3 else -1,
+                usuario=cls.perfil,
+                fecha=ahora - timedelta(hours=6 * i),
+            )
+            for i in range(400)
+        ])
+
+    def assertUsaIndice(self, queryset, *indices):
+        plan = queryset.explain()
+        self.assertTrue(
+            any(indice in plan for indice in indices),
+            f'El plan no usa {" / ".join(indices)}:\n{plan}',
+        )
+
+    def test_lista_filtrada_por_tipo_y_fechas(self):
+        hoy = timezone.localdate()
+        filtros = QueryDict(mutable=True)
+        filtros.update({
+            'tipo': 'ingreso',
+            'desde': (hoy - timedelta(days=30)).isoformat(),
+            'hasta': hoy.isoformat(),
+        })
+        self.assertUsaIndice(filtrar_movimientos(filtros), 'movimiento_fecha_tipo_idx', 'movimiento_fecha_id_idx')
+
+    def test_primera_pagina_ordenada_por_fecha_e_id(self):
+        self.assertUsaIndice(MovimientoInventario.objects.order_by('-fecha', '-id')[:100], 'movimiento_fecha_id_idx')
+
+    def test_movimientos_del_mes(self):
+        inicio, fin = mes_actual_local()
+        self.assertUsaIndice(
+            MovimientoInventario.objects.filter(fecha__gte=inicio, fecha__lt=fin),
+            'movimiento_fecha_tipo_idx', 'movimiento_fecha_id_idx',
+        )
+
+    def test_kardex_de_un_producto(self):
+        hoy = timezone.localdate()
+        inicio, fin = rango_dia_local(hoy - timedelta(days=30), hoy)
+        self.assertUsaIndice(
+            MovimientoInventario.objects.filter(
+                producto=self.producto, fecha__gte=inicio, fecha__lt=fin
+            ).order_by('fecha', 'id'),
+            'movimiento_producto_fecha_idx',
+        )
+
+    def test_movimientos_de_una_bodega(self):
+        hoy = timezone.localdate()
+        inicio, fin = rango_dia_local(hoy - timedelta(days=30), hoy)
+        self.assertUsaIndice(
+            MovimientoInventario.objects.filter(bodega=self.central, fecha__gte=inicio, fecha__lt=fin),
+            'movimiento_bodega_fecha_idx',
+        )
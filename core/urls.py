@@ -7,9 +7,10 @@ from .views import usuarios as user_views
 from .views import productos as product_views
 from .views import inventario as inventario_views
 
-from core.views.inventario import exportar_movimientos_excel, eliminar_movimiento, productos_por_proveedor, proveedor_por_producto, proveedores_por_producto
+from core.views.inventario import exportar_movimientos_excel, eliminar_movimiento, productos_por_proveedor, proveedor_por_producto, proveedores_por_producto, stock_producto, stock_producto_a_fecha
 from core.views.usuarios import exportar_usuarios_excel
 from core.views.bodegas import crear_bodega_ajax
+from core.views.exportaciones import mis_exportaciones, estado_exportacion, descargar_exportacion
  # ...existing code...
 
 from core.views.inventario import exportar_movimientos_excel, eliminar_movimiento
@@ -79,6 +80,13 @@ urlpatterns = [
     path('ajax/productos_por_proveedor/', productos_por_proveedor, name='productos_por_proveedor'),
     path('ajax/proveedor_por_producto/', proveedor_por_producto, name='proveedor_por_producto'),
     path('ajax/proveedores_por_producto/', proveedores_por_producto, name='proveedores_por_producto'),
+    path('ajax/stock_producto/', stock_producto, name='stock_producto'),
+    path('ajax/stock_producto_a_fecha/', stock_producto_a_fecha, name='stock_producto_a_fecha'),
+    path('ajax/sugerencias/productos/', inventario_views.sugerencias_productos, name='sugerencias_productos'),
+    path('ajax/sugerencias/proveedores/', inventario_views.sugerencias_proveedores, name='sugerencias_proveedores'),
+    path('movimientos/kardex/', inventario_views.kardex_producto, name='kardex_producto'),
+    path('movimientos/kardex/exportar/', inventario_views.exportar_kardex, name='exportar_kardex'),
+    path('movimientos/transferencia/', inventario_views.transferencia_bodegas, name='transferencia_bodegas'),
     path('movimientos/buscar-ajax/', inventario_views.buscar_movimientos_ajax, name='buscar_movimientos_ajax'),
 
 
@@ -90,6 +98,11 @@ urlpatterns = [
 
     path('bodegas/crear/', crear_bodega_ajax, name='crear_bodega_ajax'),
 
+    # ===== EXPORTACIONES EN SEGUNDO PLANO =====
+    path('exportaciones/', mis_exportaciones, name='mis_exportaciones'),
+    path('exportaciones/<int:pk>/', estado_exportacion, name='estado_exportacion'),
+    path('exportaciones/<int:pk>/descargar/', descargar_exportacion, name='descargar_exportacion'),
+
     # ===== USUARIOS AJAX =====
     path('usuarios/buscar-ajax/', user_views.buscar_usuarios_ajax, name='buscar_usuarios_ajax'),
 
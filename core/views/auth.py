@@ -10,8 +10,9 @@ from django.core.mail import send_mail
 from django.urls import reverse
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db.models import Sum
 
-from ..models import Usuario, Producto, Proveedor, MovimientoInventario
+from ..models import Usuario, Producto, Proveedor, MovimientoInventario, PronosticoDemanda, SugerenciaReposicion
 from ..models.reset import PasswordResetToken
 from ..utils import validate_password_policy
 
@@ -32,21 +33,17 @@ def login_view(request):
         UserModel = get_user_model()
         user_obj = UserModel.objects.filter(email__iexact=email).first()
 
-<<<<<<< HEAD
         perfil = getattr(user_obj, 'perfil', None)
         if perfil and perfil.bloqueado:
             messages.error(request, 'Tu cuenta está bloqueada por múltiples intentos fallidos. Contacta al administrador.')
             return render(request, 'auth/login.html', {'username': email})
 
-=======
->>>>>>> cb95a2fee0a357e2525c382891a20c417d34d6a4
         if user_obj:
             user = authenticate(request, username=user_obj.username, password=password)
         else:
             user = None
 
         if user is not None:
-<<<<<<< HEAD
             # Login exitoso: resetear intentos fallidos
             if perfil:
                 perfil.intentos_fallidos = 0
@@ -54,29 +51,17 @@ def login_view(request):
             login(request, user)
             request.session.set_expiry(1209600 if remember else 0)
 
-=======
-            login(request, user)
-            request.session.set_expiry(1209600 if remember else 0)
-
-            perfil = getattr(user, 'perfil', None)
->>>>>>> cb95a2fee0a357e2525c382891a20c417d34d6a4
             if perfil:
                 perfil.ultimo_acceso = timezone.now()
                 perfil.save()
                 if perfil.must_change_password:
-<<<<<<< HEAD
                     request.session['force_password_change'] = user.id
                     messages.warning(request, 'Por seguridad, cambia tu contraseña antes de continuar.')
-=======
-                    messages.warning(request, 'Por seguridad, cambia tu contraseña antes de continuar.')
-                    request.session['force_password_change'] = user.id
->>>>>>> cb95a2fee0a357e2525c382891a20c417d34d6a4
                     return redirect('core:cambiar_password_inicial')
 
             messages.success(request, f'¡Bienvenido, {user.get_full_name() or user.email}!')
             return redirect('core:dashboard')
         else:
-<<<<<<< HEAD
             # Fallo: aumentar intentos y bloquear si supera el límite
             if perfil:
                 perfil.intentos_fallidos += 1
@@ -88,9 +73,6 @@ def login_view(request):
                 perfil.save()
             else:
                 messages.error(request, 'Correo o contraseña incorrectos')
-=======
-            messages.error(request, 'Correo o contraseña incorrectos')
->>>>>>> cb95a2fee0a357e2525c382891a20c417d34d6a4
             return render(request, 'auth/login.html', {'username': email})
 
     return render(request, 'auth/login.html')
@@ -125,6 +107,9 @@ def dashboard(request):
         'total_proveedores': Proveedor.objects.filter(estado='ACTIVO').count(),
         'total_movimientos': MovimientoInventario.objects.count(),
         'productos_bajo_stock': Producto.objects.filter(alerta_bajo_stock=True).count(),
+        'productos_por_vencer': Producto.objects.filter(alerta_por_vencer=True, activo=True).count(),
+        'productos_por_reponer': SugerenciaReposicion.objects.count(),
+        'demanda_semana': PronosticoDemanda.objects.aggregate(total=Sum('demanda_semana'))['total'] or 0,
         'permisos_dashboard': permisos_dashboard,
         'rol_usuario': rol,
     }
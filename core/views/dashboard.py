@@ -13,33 +13,16 @@ def reportes_view(request):
     # ========================================
     # 1. ESTADÍSTICAS GENERALES
     # ========================================
-    from ..models import Producto, MovimientoInventario, Proveedor
-    from datetime import datetime, timedelta
+    from ..models import Producto, Proveedor
     import json
     total_productos = Producto.objects.filter(activo=True).count()
     productos_bajo_stock = Producto.objects.filter(alerta_bajo_stock=True, activo=True).count()
-    hoy = datetime.now()
-    primer_dia_mes = hoy.replace(day=1)
-    movimientos_mes = MovimientoInventario.objects.filter(fecha__gte=primer_dia_mes, fecha__lte=hoy).count()
+    movimientos_mes = conteo_movimientos(*_dias_mes_actual())
     proveedores_activos = Proveedor.objects.filter(estado='ACTIVO').count()
-    seis_meses_atras = hoy - timedelta(days=180)
-    movimientos_raw = MovimientoInventario.objects.filter(fecha__gte=seis_meses_atras).values('tipo_movimiento', 'fecha__month').annotate(total=Count('id'))
-    meses_nombres = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-    meses_labels = []
-    ingresos_data = []
-    salidas_data = []
-    ajustes_data = []
-    for i in range(5, -1, -1):
-        mes = (hoy.month - i) % 12
-        if mes == 0:
-            mes = 12
-        meses_labels.append(meses_nombres[mes - 1])
-        ingresos = sum(m['total'] for m in movimientos_raw if m['fecha__month'] == mes and m['tipo_movimiento'] == 'ingreso')
-        salidas = sum(m['total'] for m in movimientos_raw if m['fecha__month'] == mes and m['tipo_movimiento'] == 'salida')
-        ajustes = sum(m['total'] for m in movimientos_raw if m['fecha__month'] == mes and m['tipo_movimiento'] == 'ajuste')
-        ingresos_data.append(ingresos)
-        salidas_data.append(salidas)
-        ajustes_data.append(ajustes)
+    meses_labels, series = movimientos_por_mes(6)
+    ingresos_data = series['ingreso']
+    salidas_data = series['salida']
+    ajustes_data = series['ajuste']
     productos_totales = Producto.objects.filter(activo=True)
     stock_ok = productos_totales.filter(alerta_bajo_stock=False, stock_actual__gt=0).count()
     sin_stock = productos_totales.filter(stock_actual=0).count()
@@ -60,13 +43,20 @@ Vista del Dashboard con estadísticas y gráficos
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count, Q, Sum
-from django.db.models.functions import TruncMonth
-from datetime import datetime, timedelta
+from django.utils import timezone
 from decimal import Decimal
 import json
 
-from ..models import Producto, MovimientoInventario, Proveedor, Usuario
+from ..models import Producto, Proveedor, Usuario
 from ..decorators import lector_o_superior
+from ..services.consultas import movimientos_por_mes
+from ..services.fechas import mes_actual_local
+from ..services.resumen import conteo_movimientos, top_productos, top_proveedores
+
+
+def _dias_mes_actual():
+    """Primer día del mes actual y del siguiente (hora local), para el resumen diario"""
+    return tuple(timezone.localtime(limite).date() for limite in mes_actual_local())
 
 
 @login_required
@@ -85,13 +75,8 @@ def dashboard_view(request):
         activo=True
     ).count()
     
-    # Movimientos del mes actual
-    hoy = datetime.now()
-    primer_dia_mes = hoy.replace(day=1)
-    movimientos_mes = MovimientoInventario.objects.filter(
-        fecha__gte=primer_dia_mes,
-        fecha__lte=hoy
-    ).count()
+    # Movimientos del mes actual (días locales, desde el resumen diario)
+    movimientos_mes = conteo_movimientos(*_dias_mes_actual())
     
     # Proveedores activos
     proveedores_activos = Proveedor.objects.filter(
@@ -101,40 +86,11 @@ def dashboard_view(request):
     # ========================================
     # 2. DATOS PARA GRÁFICO DE MOVIMIENTOS POR MES
     # ========================================
-    # Últimos 6 meses
-    seis_meses_atras = hoy - timedelta(days=180)
-    
-    # Obtener movimientos agrupados por tipo y mes
-    movimientos_raw = MovimientoInventario.objects.filter(
-        fecha__gte=seis_meses_atras
-    ).values('tipo_movimiento', 'fecha__month').annotate(
-        total=Count('id')
-    )
-    
-    # Preparar estructura para los últimos 6 meses
-    meses_nombres = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-    meses_labels = []
-    ingresos_data = []
-    salidas_data = []
-    ajustes_data = []
-    
-    for i in range(5, -1, -1):  # Últimos 6 meses
-        mes = (hoy.month - i) % 12
-        if mes == 0:
-            mes = 12
-        meses_labels.append(meses_nombres[mes - 1])
-        
-        # Contar movimientos de cada tipo para este mes
-        ingresos = sum(m['total'] for m in movimientos_raw 
-                      if m['fecha__month'] == mes and m['tipo_movimiento'] == 'ingreso')
-        salidas = sum(m['total'] for m in movimientos_raw 
-                     if m['fecha__month'] == mes and m['tipo_movimiento'] == 'salida')
-        ajustes = sum(m['total'] for m in movimientos_raw 
-                     if m['fecha__month'] == mes and m['tipo_movimiento'] == 'ajuste')
-        
-        ingresos_data.append(ingresos)
-        salidas_data.append(salidas)
-        ajustes_data.append(ajustes)
+    # Últimos 6 meses, por tipo, en una sola consulta sobre el resumen diario
+    meses_labels, series = movimientos_por_mes(6)
+    ingresos_data = series['ingreso']
+    salidas_data = series['salida']
+    ajustes_data = series['ajuste']
     
     # ========================================
     # 3. DATOS PARA GRÁFICO DE ESTADO DEL STOCK
@@ -155,26 +111,18 @@ def dashboard_view(request):
     # ========================================
     # 4. TOP 5 PRODUCTOS CON MÁS MOVIMIENTOS
     # ========================================
-    top_productos = MovimientoInventario.objects.values(
-        'producto__nombre'
-    ).annotate(
-        total=Count('id')
-    ).order_by('-total')[:5]
+    productos_top = top_productos(5)
     
-    top_productos_labels = [p['producto__nombre'][:25] for p in top_productos]  # Limitar largo
-    top_productos_data = [p['total'] for p in top_productos]
+    top_productos_labels = [nombre[:25] for nombre, _ in productos_top]  # Limitar largo
+    top_productos_data = [total for _, total in productos_top]
     
     # ========================================
     # 5. PROVEEDORES MÁS ACTIVOS
     # ========================================
-    top_proveedores = MovimientoInventario.objects.filter(
-        proveedor__isnull=False
-    ).values('proveedor__razon_social').annotate(
-        total=Count('id')
-    ).order_by('-total')[:4]
+    proveedores_top = top_proveedores(4)
     
-    proveedores_labels = [p['proveedor__razon_social'][:20] for p in top_proveedores]
-    proveedores_data = [p['total'] for p in top_proveedores]
+    proveedores_labels = [razon_social[:20] for razon_social, _ in proveedores_top]
+    proveedores_data = [total for _, total in proveedores_top]
     
     # ========================================
     # 6. PERMISOS SEGÚN ROL
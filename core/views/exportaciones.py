@@ -0,0 +1,74 @@
+"""
+Exportaciones en segundo plano: encolar, consultar avance y descargar
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from ..models import TrabajoExportacion
+from ..services.exportacion import exportar_entidad, formato_solicitado
+from ..services.trabajos import encolar_exportacion
+
+
+def responder_exportacion(request, entidad):
+    """
+    Exportación de una lista: en línea (streaming) o, con ?asincrono=1, encolada
+    para el worker procesar_exportaciones.
+    """
+    if request.GET.get('asincrono') in ('1', 'true', 'si'):
+        trabajo = encolar_exportacion(entidad, request.GET, formato_solicitado(request.GET), request.user)
+        return JsonResponse(_trabajo_a_dict(trabajo), status=202)
+    return exportar_entidad(entidad, request.GET)
+
+
+def _trabajo_a_dict(trabajo):
+    return {
+        'id': trabajo.pk,
+        'entidad': trabajo.entidad,
+        'formato': trabajo.formato,
+        'estado': trabajo.estado,
+        'progreso': trabajo.progreso,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'total_filas': trabajo.total_filas,
+        'error': trabajo.error,
+        'creado': trabajo.fecha_creacion.isoformat() if trabajo.fecha_creacion else None,
+        'url_estado': reverse('core:estado_exportacion', args=[trabajo.pk]),
+        'url_descarga': (
+            reverse('core:descargar_exportacion', args=[trabajo.pk])
+            if trabajo.estado == 'COMPLETADO' else None
+        ),
+    }
+
+
+def _trabajo_del_usuario(request, pk):
+    trabajo = get_object_or_404(TrabajoExportacion, pk=pk)
+    if trabajo.usuario_id != request.user.pk and not request.user.is_superuser:
+        raise Http404
+    return trabajo
+
+
+@login_required
+def mis_exportaciones(request):
+    """Últimas exportaciones del usuario (JSON)"""
+    trabajos = TrabajoExportacion.objects.filter(usuario=request.user)[:20]
+    return JsonResponse({'trabajos': [_trabajo_a_dict(t) for t in trabajos]})
+
+
+@login_required
+def estado_exportacion(request, pk):
+    """Avance de una exportación (JSON, para consultar periódicamente)"""
+    return JsonResponse(_trabajo_a_dict(_trabajo_del_usuario(request, pk)))
+
+
+@login_required
+def descargar_exportacion(request, pk):
+    """Descarga del archivo generado por el worker"""
+    trabajo = _trabajo_del_usuario(request, pk)
+    if trabajo.estado != 'COMPLETADO' or not trabajo.archivo:
+        raise Http404('La exportación aún no está disponible')
+    try:
+        archivo = trabajo.archivo.open('rb')
+    except FileNotFoundError:
+        raise Http404('El archivo de la exportación ya no existe')
+    return FileResponse(archivo, as_attachment=True, filename=trabajo.archivo.name.rsplit('/', 1)[-1])
@@ -3,22 +3,30 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from datetime import datetime
 from decimal import Decimal
-from django.core.paginator import Paginator
 from django.http import HttpResponse, JsonResponse
 import csv
+import uuid
 from django.db import models
 from django.utils.functional import cached_property
 from django.views.decorators.http import require_POST
-from io import BytesIO
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 
 from ..decorators import bodeguero_required
-from ..models import MovimientoInventario, Producto, Bodega, Proveedor, Usuario
+from ..models import MovimientoInventario, Producto, Bodega, Proveedor, Usuario, Lote
 from ..forms import MovimientoPaso1Form, MovimientoPaso2Form, MovimientoPaso3Form
+from ..services.consultas import consultas_movimientos, contadores_movimientos, parsear_fecha
+from ..services.snapshots import stock_a_fecha
+from ..services.kardex import kardex_desde_params
+from ..services.sugerencias import SUGERENCIAS_LIMITE, sugerir_productos, sugerir_proveedores
+from ..services.idempotencia import ejecutar_una_vez, resultado_previo
+from ..services.transferencias import anular_transferencia, lineas_por_sku, registrar_transferencia
+from ..services.paginacion import paginar_por_cursor, total_de_pagina
+from .exportaciones import responder_exportacion
+from ..services.inventario import (
+    anular_movimiento, modificar_movimiento, registrar_movimiento, stock_por_bodega,
+)
 from ..decorators import admin_required, editor_o_admin_required, lector_o_superior
 from ..decorators import admin_o_bodega_required
 from core.models.auditoria import EventoAuditoria
@@ -32,204 +40,57 @@ def lista_movimientos(request):
     tipo = request.GET.get('tipo', '')
     desde = request.GET.get('desde', '')
     hasta = request.GET.get('hasta', '')
-    page_size = int(request.GET.get('page_size', 100))
-
-    base_qs = MovimientoInventario.objects.select_related('producto', 'bodega', 'proveedor')
+    page_size_choices = [100, 200, 300]
+    try:
+        page_size = int(request.GET.get('page_size', 100))
+    except (TypeError, ValueError):
+        page_size = 100
+    if page_size not in page_size_choices:
+        page_size = 100
 
-    if search:
-        base_qs = base_qs.filter(
-            models.Q(producto__sku__icontains=search) |
-            models.Q(producto__nombre__icontains=search) |
-            models.Q(proveedor__rut__icontains=search) |
-            models.Q(proveedor__razon_social__icontains=search)
-        )
     tipo = request.GET.get('tipo')
-    if tipo:
-        base_qs = base_qs.filter(tipo_movimiento=tipo)
-    if desde:
-        base_qs = base_qs.filter(fecha__date__gte=desde)
-    if hasta:
-        base_qs = base_qs.filter(fecha__date__lte=hasta)
-
-    total = base_qs.count()
-    ingresos = base_qs.filter(tipo_movimiento='ingreso').count()
-    salidas = base_qs.filter(tipo_movimiento='salida').count()
-    este_mes = base_qs.filter(fecha__month=timezone.now().month, fecha__year=timezone.now().year).count()
-
-    # Paginación
-    paginator = Paginator(base_qs.order_by('-fecha'), page_size)
-    page_number = request.GET.get('page')
-    movimientos = paginator.get_page(page_number)
-    elided_range = movimientos.paginator.get_elided_page_range(movimientos.number)
-    base_qs = request.GET.urlencode()  # Para mantener los filtros en la URL
+    # Tabla activa y, si el rango llega antes del corte de archivo, también el archivo
+    consultas = consultas_movimientos(request.GET)
+
+    contadores = contadores_movimientos(request.GET)
+
+    # Paginación por cursor (keyset sobre fecha, id): sin OFFSET
+    movimientos = paginar_por_cursor(consultas, request.GET.get('cursor'), page_size)
+    params = request.GET.copy()
+    for clave in ('cursor', 'page'):
+        params.pop(clave, None)
+    filtros_qs = params.urlencode()  # Para mantener los filtros en la URL
 
     contexto = {
         'movimientos': movimientos,
-        'total_movimientos': total,
-        'total_ingresos': ingresos,
-        'total_salidas': salidas,
-        'total_mes': este_mes,
+        'total_movimientos': contadores['total'],
+        'total_ingresos': contadores['ingresos'],
+        'total_salidas': contadores['salidas'],
+        'total_mes': contadores['este_mes'],
         'search': search,
         'tipo': tipo,
         'desde': desde,
         'hasta': hasta,
         'page_size': page_size,
-        'page_size_choices': [100, 200, 300],
+        'page_size_choices': page_size_choices,
+        'base_qs': filtros_qs,
     }
     return render(request, 'inventario/lista_movimientos.html', contexto)
 
-from io import BytesIO
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from datetime import datetime
-from django.utils import timezone
-from django.http import HttpResponse
-
 @login_required
 def exportar_movimientos_excel(request):
-    qs = MovimientoInventario.objects.select_related(
-        'producto', 'bodega', 'proveedor', 'usuario__user'
-    ).order_by('-fecha')
-    print("Movimientos exportados:", qs.count())
-    from ..decorators import admin_o_bodega_required
-
-    search = (request.GET.get('search') or '').strip()
-    tipo   = (request.GET.get('tipo') or '').strip()
-    desde  = (request.GET.get('desde') or '').strip()
-    hasta  = (request.GET.get('hasta') or '').strip()
-
-    if search:
-        qs = qs.filter(
-            models.Q(producto__sku__icontains=search) |
-            models.Q(producto__nombre__icontains=search) |
-            models.Q(proveedor__rut__icontains=search) |
-            models.Q(proveedor__razon_social__icontains=search)
-        )
+    """Exporta los movimientos filtrados (?formato=xlsx|csv|jsonl; ?asincrono=1 la encola)"""
+    return responder_exportacion(request, 'movimientos')
 
-    # Ignora filtro si tipo es vacío o "None"
-    if tipo and tipo.lower() != "none":
-        qs = qs.filter(tipo_movimiento=tipo)
 
-    # Soporta 'YYYY-MM-DD' y también 'DD-MM-AAAA' si te llega así desde el input
-    def _norm_fecha(s):
-        if not s:
-            return None
-        for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
-            try:
-                return datetime.strptime(s, fmt).date()
-            except Exception:
-                pass
-        return None  # formato inválido -> ignora filtro
-
-    d1 = _norm_fecha(desde)
-    d2 = _norm_fecha(hasta)
-
-    if d1:
-        qs = qs.filter(fecha__date__gte=d1)
-    if d2:
-        qs = qs.filter(fecha__date__lte=d2)
-
-    # === Orden igual que la tabla (últimos primero) y SIN paginar ===
-    qs = qs.order_by('-fecha')
-
-    # === Si quieres confirmar que llegan datos, descomenta temporalmente:
-    # return JsonResponse({"count": qs.count(), "params": {"search": search, "tipo": tipo, "desde": desde, "hasta": hasta}})
-
-    # ===== Excel (puedes pegar aquí tu bloque de estilos si ya lo tenías) =====
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Movimientos"
-
-    headers = [
-        "Fecha", "Tipo", "SKU", "Producto", "Proveedor", "Bodega",
-        "Cantidad", "Lote", "Serie", "Vence", "Doc Ref", "Usuario"
-    ]
-    col_widths = [20, 12, 14, 36, 28, 14, 12, 14, 14, 14, 16, 24]
-
-    red_dark = PatternFill("solid", fgColor="B91C1C")
-    red_header = PatternFill("solid", fgColor="DC2626")
-    title_font = Font(color="FFFFFF", bold=True, size=16)
-    th_font = Font(color="FFFFFF", bold=True, size=11)
-    subtitle_font = Font(italic=True, size=11)
-    center = Alignment(horizontal="center", vertical="center")
-    left = Alignment(horizontal="left", vertical="center")
-    thin = Side(border_style="thin", color="CCCCCC")
-    border = Border(top=thin, left=thin, right=thin, bottom=thin)
-    zebra = PatternFill("solid", fgColor="FFF5F5")
-
-    total_cols = len(headers)
-
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=total_cols)
-    ws["A1"].value = "REPORTE DE MOVIMIENTOS - DULCERÍA LILIS"
-    ws["A1"].fill = red_dark
-    ws["A1"].font = title_font
-    ws["A1"].alignment = center
-
-    ws.merge_cells(start_row=2, start_column=1, end_row=2, end_column=total_cols)
-    ws["A2"].value = f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
-    ws["A2"].font = subtitle_font
-    ws["A2"].alignment = center
-
-    r = 4
-    for i, (h, w) in enumerate(zip(headers, col_widths), start=1):
-        c = ws.cell(row=r, column=i, value=h)
-        c.fill = red_header
-        c.font = th_font
-        c.alignment = center
-        ws.column_dimensions[get_column_letter(i)].width = w
-    ws.row_dimensions[r].height = 22
-    r += 1
-    start_data = r
-
-    tz = timezone.get_current_timezone()
-    r = start_data
-
-    for idx, m in enumerate(qs, start=1):
-        row = [
-            (timezone.make_naive(m.fecha.astimezone(tz)) if timezone.is_aware(m.fecha) else m.fecha).strftime('%Y-%m-%d %H:%M')
-                if m.fecha else "",
-            m.get_tipo_movimiento_display() if hasattr(m, 'get_tipo_movimiento_display') else m.tipo_movimiento,
-            m.producto.sku if m.producto else "",
-            m.producto.nombre if m.producto else "",
-            f"{m.proveedor.rut} - {m.proveedor.razon_social}" if m.proveedor else "",
-            m.bodega.codigo if m.bodega else "",
-            m.cantidad,
-            m.lote or "",
-            m.numero_serie or "",
-            m.fecha_vencimiento.strftime('%Y-%m-%d') if m.fecha_vencimiento else "",
-            m.documento_numero or "",
-            (m.usuario.user.get_full_name() if hasattr(m.usuario.user, 'get_full_name') else m.usuario.user.username) if getattr(m, "usuario_id", None) else "",
-        ]
-        for col, val in enumerate(row, start=1):
-            cell = ws.cell(row=r, column=col, value=val)
-            cell.border = border
-            cell.alignment = left if col in (3, 4, 5, 11, 12) else center
-        if idx % 2 == 0:
-            for col in range(1, total_cols + 1):
-                ws.cell(row=r, column=col).fill = zebra
-        r += 1
-
-    ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=total_cols-1)
-    ws.cell(row=r, column=1, value="TOTAL DE MOVIMIENTOS:").font = Font(bold=True)
-    ws.cell(row=r, column=total_cols, value=qs.count()).font = Font(bold=True)
-    for col in range(1, total_cols + 1):
-        ws.cell(row=r, column=col).border = border
-
-    ws.auto_filter.ref = f"A4:{get_column_letter(total_cols)}{r}"
-    ws.freeze_panes = "A5"
-
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    filename = f"movimientos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    resp = HttpResponse(
-        out.getvalue(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    resp["Content-Disposition"] = f'attachment; filename=\"{filename}\"'
-    return resp
 
+# Clave de sesión del movimiento en curso en el asistente de 3 pasos
+BORRADOR_MOVIMIENTO = 'movimiento_borrador'
+
+
+def _clave_idempotencia(request):
+    """Clave de la solicitud: cabecera Idempotency-Key o campo oculto del formulario"""
+    return (request.headers.get('Idempotency-Key') or request.POST.get('clave_idempotencia') or '').strip()
 
 
 @login_required
@@ -241,11 +102,8 @@ def crear_movimiento(request):
 
 @login_required
 @editor_o_admin_required
-@transaction.atomic
 def movimiento_paso1(request):
-    productos = Producto.objects.all()
     bodegas = Bodega.objects.all()
-    proveedores = Proveedor.objects.all()
     data = {}
     error_db = None
 
@@ -256,6 +114,7 @@ def movimiento_paso1(request):
         producto_sku = request.POST.get('producto')
         proveedor_rut = request.POST.get('proveedor')
         bodega_codigo = request.POST.get('bodega')
+        costo_unitario = (request.POST.get('costo_unitario') or '').strip()
 
         data = {
             'fecha': fecha,
@@ -264,6 +123,8 @@ def movimiento_paso1(request):
             'producto': producto_sku,
             'proveedor': proveedor_rut,
             'bodega': bodega_codigo,
+            'costo_unitario': costo_unitario,
+            'clave_idempotencia': _clave_idempotencia(request),
         }
 
         # Validación de campos obligatorios
@@ -271,9 +132,18 @@ def movimiento_paso1(request):
             messages.error(request, "Todos los campos obligatorios deben estar completos.")
             return render(request, 'inventario/movimiento_paso1.html', {
                 'data': data,
-                'productos': productos,
                 'bodegas': bodegas,
-                'proveedores': proveedores,
+            })
+
+        # Las transferencias mueven stock entre dos bodegas en pares: tienen su propio formulario
+        if tipo == 'transferencia':
+            messages.info(request, "Las transferencias se registran indicando bodega de origen y destino.")
+            return redirect('core:transferencia_bodegas')
+        if tipo not in dict(MovimientoInventario.TIPO_CHOICES):
+            messages.error(request, "Tipo de movimiento inválido.")
+            return render(request, 'inventario/movimiento_paso1.html', {
+                'data': data,
+                'bodegas': bodegas,
             })
 
         # Validación de fecha
@@ -284,18 +154,14 @@ def movimiento_paso1(request):
             messages.error(request, "Formato de fecha inválido.")
             return render(request, 'inventario/movimiento_paso1.html', {
                 'data': data,
-                'productos': productos,
                 'bodegas': bodegas,
-                'proveedores': proveedores,
             })
 
         if fecha_dt > timezone.now():
             messages.error(request, "No se puede registrar un movimiento con fecha futura.")
             return render(request, 'inventario/movimiento_paso1.html', {
                 'data': data,
-                'productos': productos,
                 'bodegas': bodegas,
-                'proveedores': proveedores,
             })
 
         # Buscar relaciones
@@ -305,9 +171,7 @@ def movimiento_paso1(request):
             messages.error(request, f'El producto con SKU "{producto_sku}" no existe.')
             return render(request, 'inventario/movimiento_paso1.html', {
                 'data': data,
-                'productos': productos,
                 'bodegas': bodegas,
-                'proveedores': proveedores,
             })
 
         try:
@@ -316,9 +180,7 @@ def movimiento_paso1(request):
             messages.error(request, f'La bodega con código "{bodega_codigo}" no existe.')
             return render(request, 'inventario/movimiento_paso1.html', {
                 'data': data,
-                'productos': productos,
                 'bodegas': bodegas,
-                'proveedores': proveedores,
             })
 
         proveedor = None
@@ -335,140 +197,167 @@ def movimiento_paso1(request):
             messages.error(request, "Cantidad inválida.")
             return render(request, 'inventario/movimiento_paso1.html', {
                 'data': data,
-                'productos': productos,
-                'bodegas': bodegas,
-                'proveedores': proveedores,
-            })
-
-        # Obtener el usuario de inventario
-        try:
-            usuario_inventario = Usuario.objects.get(user=request.user)
-        except Usuario.DoesNotExist:
-            messages.error(request, "No se encontró el perfil de usuario.")
-            return render(request, 'inventario/movimiento_paso1.html', {
-                'data': data,
-                'productos': productos,
                 'bodegas': bodegas,
-                'proveedores': proveedores,
             })
 
-        # Crear el movimiento
-        try:
-            movimiento = MovimientoInventario.objects.create(
-                fecha=fecha_dt,
-                tipo_movimiento=tipo.lower(),
-                cantidad=cantidad_int,
-                producto=producto,
-                bodega=bodega,
-                usuario=usuario_inventario,
-                proveedor=proveedor,
-            )
-            # Auditoría crear movimiento
-            EventoAuditoria.objects.create(
-                usuario=request.user,
-                accion='CREAR',
-                objeto='Movimiento',
-                detalle=f'Movimiento creado: {movimiento.id} ({movimiento.tipo_movimiento}, {movimiento.cantidad}, {producto.nombre})'
-            )
-        except Exception as e:
-            error_db = str(e)
-            messages.error(request, f"Error al guardar en la base de datos: {error_db}")
-            return render(request, 'inventario/movimiento_paso1.html', {
-                'data': data,
-                'productos': productos,
-                'bodegas': bodegas,
-                'proveedores': proveedores,
-                'error_db': error_db,
-            })
+        # Costo unitario opcional (solo ingresos; vacío = costo del proveedor o promedio)
+        costo_dec = None
+        if costo_unitario and tipo == 'ingreso':
+            try:
+                costo_dec = Decimal(costo_unitario)
+                if costo_dec < 0:
+                    raise ValueError
+            except (ArithmeticError, ValueError):
+                messages.error(request, "Costo unitario inválido.")
+                return render(request, 'inventario/movimiento_paso1.html', {
+                    'data': data,
+                    'bodegas': bodegas,
+                })
 
-        # ACTUALIZAR STOCK SEGÚN TIPO
-        cantidad_decimal = Decimal(cantidad_int)
-        if tipo.lower() in ['ingreso', 'devolucion']:
-            producto.stock_actual += cantidad_decimal
-        elif tipo.lower() == 'salida':
-            producto.stock_actual -= cantidad_decimal
-        elif tipo.lower() == 'ajuste':
-            producto.stock_actual = cantidad_decimal
-        producto.save()
-
-        request.session['movimiento_id'] = movimiento.id
+        # El movimiento se arma en la sesión y se contabiliza al confirmar el paso 3
+        # (al volver al paso 1 se conservan los datos de los pasos 2 y 3)
+        request.session[BORRADOR_MOVIMIENTO] = {
+            **request.session.get(BORRADOR_MOVIMIENTO, {}),
+            'fecha': fecha_dt.isoformat(),
+            'tipo_movimiento': tipo,
+            'cantidad': cantidad_int,
+            'producto_id': producto.pk,
+            'bodega_id': bodega.pk,
+            'proveedor_id': proveedor.pk if proveedor else None,
+            'costo_unitario': str(costo_dec) if costo_dec is not None else None,
+            'clave_idempotencia': data['clave_idempotencia'] or uuid.uuid4().hex,
+        }
         return redirect('core:movimiento_paso2')
 
-    # Si es GET, muestra el formulario vacío
+    # Si es GET, muestra el formulario vacío con una clave nueva para la solicitud
+    data['clave_idempotencia'] = uuid.uuid4().hex
     return render(request, 'inventario/movimiento_paso1.html', {
         'data': data,
-        'productos': productos,
         'bodegas': bodegas,
-        'proveedores': proveedores,
     })
 
 @login_required
 @editor_o_admin_required
-@transaction.atomic
 def movimiento_paso2(request):
-    """Paso 2: Lote y serie"""
-    movimiento_id = request.session.get('movimiento_id')
-    if not movimiento_id:
+    """Paso 2: Lote y serie (solo actualiza el borrador)"""
+    borrador = request.session.get(BORRADOR_MOVIMIENTO)
+    if not borrador:
         messages.error(request, 'Debes completar el Paso 1 primero')
         return redirect('core:movimiento_paso1')
-    
-    movimiento = get_object_or_404(MovimientoInventario, pk=movimiento_id)
-    
+
     if request.method == 'POST':
-        print("Paso 2 datos:", request.POST)
-        form = MovimientoPaso2Form(request.POST, instance=movimiento)
+        form = MovimientoPaso2Form(request.POST)
         if form.is_valid():
-            form.save()
-            messages.success(request, '✓ Paso 2 completado')
-            return redirect('core:movimiento_paso3')
+            lote = form.cleaned_data['lote']
+            if lote and Lote.objects.filter(numero_lote=lote).exclude(producto_id=borrador['producto_id']).exists():
+                form.add_error('lote', f'El lote {lote} pertenece a otro producto')
+                messages.error(request, f'El lote {lote} pertenece a otro producto.')
+            else:
+                vencimiento = form.cleaned_data['fecha_vencimiento']
+                borrador.update(
+                    lote=lote,
+                    numero_serie=form.cleaned_data['numero_serie'],
+                    fecha_vencimiento=vencimiento.isoformat() if vencimiento else None,
+                )
+                request.session[BORRADOR_MOVIMIENTO] = borrador
+                messages.success(request, '✓ Paso 2 completado')
+                return redirect('core:movimiento_paso3')
+        data = request.POST
     else:
-        form = MovimientoPaso2Form(instance=movimiento)
-    
+        form = MovimientoPaso2Form()
+        data = borrador
+
     return render(request, 'inventario/movimiento_paso2.html', {
         'form': form,
-        'movimiento': movimiento
+        'data': data,
     })
 
 @login_required
 @editor_o_admin_required
 @transaction.atomic
 def movimiento_paso3(request):
-    """Paso 3: Documentos"""
-    movimiento_id = request.session.get('movimiento_id')
-    if not movimiento_id:
+    """
+    Paso 3: Documentos. Confirma el asistente: el movimiento, su efecto sobre
+    el stock y la auditoría se escriben juntos en esta transacción.
+    """
+    borrador = request.session.get(BORRADOR_MOVIMIENTO)
+    if not borrador:
+        clave = _clave_idempotencia(request)
+        if request.method == 'POST' and clave and resultado_previo(request.user, clave) is not None:
+            # Reintento de una confirmación que ya se contabilizó
+            messages.info(request, 'El movimiento ya estaba registrado.')
+            return redirect('core:lista_movimientos')
         messages.error(request, 'Debes completar el Paso 1 primero')
         return redirect('core:movimiento_paso1')
-    
-    movimiento = get_object_or_404(MovimientoInventario, pk=movimiento_id)
-    
+
     if request.method == 'POST':
-        print("Paso 3 datos:", request.POST)
-        form = MovimientoPaso3Form(request.POST, instance=movimiento)
+        form = MovimientoPaso3Form(request.POST)
         if form.is_valid():
-            form.save()
-            del request.session['movimiento_id']
-            messages.success(request, '✓ Movimiento registrado')
-            return redirect('core:lista_movimientos')
+            def contabilizar():
+                producto = Producto.objects.get(pk=borrador['producto_id'])
+                movimiento = registrar_movimiento(
+                    fecha=parse_datetime(borrador['fecha']),
+                    tipo_movimiento=borrador['tipo_movimiento'],
+                    cantidad=borrador['cantidad'],
+                    producto=producto,
+                    bodega=Bodega.objects.get(pk=borrador['bodega_id']),
+                    usuario=Usuario.objects.get(user=request.user),
+                    proveedor=Proveedor.objects.filter(pk=borrador['proveedor_id']).first() if borrador['proveedor_id'] else None,
+                    costo_unitario=Decimal(borrador['costo_unitario']) if borrador['costo_unitario'] else None,
+                    lote=borrador.get('lote'),
+                    numero_serie=borrador.get('numero_serie'),
+                    fecha_vencimiento=parse_date(borrador['fecha_vencimiento']) if borrador.get('fecha_vencimiento') else None,
+                    **form.cleaned_data
+                )
+                # Auditoría crear movimiento
+                EventoAuditoria.objects.create(
+                    usuario=request.user,
+                    accion='CREAR',
+                    objeto='Movimiento',
+                    detalle=f'Movimiento creado: {movimiento.id} ({movimiento.tipo_movimiento}, {movimiento.cantidad}, {producto.nombre})'
+                )
+                return movimiento.id
+
+            try:
+                # Un reintento con la misma clave no vuelve a contabilizar
+                _, repetida = ejecutar_una_vez(
+                    request.user, _clave_idempotencia(request) or borrador['clave_idempotencia'],
+                    'movimiento', contabilizar,
+                )
+            except Usuario.DoesNotExist:
+                messages.error(request, "No se encontró el perfil de usuario.")
+            except (Producto.DoesNotExist, Bodega.DoesNotExist):
+                messages.error(request, "El producto o la bodega del movimiento ya no existen.")
+            except Exception as e:
+                messages.error(request, f"Error al guardar en la base de datos: {e}")
+            else:
+                del request.session[BORRADOR_MOVIMIENTO]
+                if repetida:
+                    messages.info(request, 'El movimiento ya estaba registrado.')
+                else:
+                    messages.success(request, '✓ Movimiento registrado')
+                return redirect('core:lista_movimientos')
+        data = request.POST
     else:
-        form = MovimientoPaso3Form(instance=movimiento)
-    
+        form = MovimientoPaso3Form()
+        data = borrador
+
     return render(request, 'inventario/movimiento_paso3.html', {
         'form': form,
-        'movimiento': movimiento
+        'data': data,
+        'clave_idempotencia': borrador['clave_idempotencia'],
     })
 
 
-def editar_movimiento(request, pk):
-    movimiento = get_object_or_404(MovimientoInventario, pk=pk)
-    return render(request, 'inventario/editar_movimiento.html', {'movimiento': movimiento})
 @login_required
 @editor_o_admin_required
 @transaction.atomic
 def editar_movimiento(request, pk):
     movimiento = get_object_or_404(MovimientoInventario, pk=pk)
-    productos = Producto.objects.all()
+    if movimiento.transferencia_id:
+        messages.error(request, 'El movimiento es parte de una transferencia; anula la transferencia completa.')
+        return redirect('core:lista_movimientos')
     bodegas = Bodega.objects.all()
-    proveedores = Proveedor.objects.all()
 
     if request.method == 'POST':
         # Parsear fecha (YYYY-MM-DDTHH:MM)
@@ -479,15 +368,15 @@ def editar_movimiento(request, pk):
         except Exception:
             messages.error(request, "Formato de fecha inválido.")
             return render(request, 'inventario/editar_movimiento.html', {
-                'movimiento': movimiento, 'productos': productos, 'bodegas': bodegas, 'proveedores': proveedores
+                'movimiento': movimiento, 'bodegas': bodegas
             })
 
         # Tipo
         tipo = (request.POST.get('tipo_movimiento') or '').lower()
-        if tipo not in dict(MovimientoInventario.TIPO_CHOICES):
+        if tipo not in dict(MovimientoInventario.TIPO_CHOICES) or tipo == 'transferencia':
             messages.error(request, "Tipo de movimiento inválido.")
             return render(request, 'inventario/editar_movimiento.html', {
-                'movimiento': movimiento, 'productos': productos, 'bodegas': bodegas, 'proveedores': proveedores
+                'movimiento': movimiento, 'bodegas': bodegas
             })
         movimiento.tipo_movimiento = tipo
 
@@ -497,7 +386,7 @@ def editar_movimiento(request, pk):
         except (TypeError, ValueError):
             messages.error(request, "Cantidad inválida.")
             return render(request, 'inventario/editar_movimiento.html', {
-                'movimiento': movimiento, 'productos': productos, 'bodegas': bodegas, 'proveedores': proveedores
+                'movimiento': movimiento, 'bodegas': bodegas
             })
 
         # Relaciones
@@ -508,7 +397,7 @@ def editar_movimiento(request, pk):
             except Producto.DoesNotExist:
                 messages.error(request, f"Producto SKU {sku} no existe.")
                 return render(request, 'inventario/editar_movimiento.html', {
-                    'movimiento': movimiento, 'productos': productos, 'bodegas': bodegas, 'proveedores': proveedores
+                    'movimiento': movimiento, 'bodegas': bodegas
                 })
 
         codigo = request.POST.get('bodega')
@@ -518,7 +407,7 @@ def editar_movimiento(request, pk):
             except Bodega.DoesNotExist:
                 messages.error(request, f"Bodega {codigo} no existe.")
                 return render(request, 'inventario/editar_movimiento.html', {
-                    'movimiento': movimiento, 'productos': productos, 'bodegas': bodegas, 'proveedores': proveedores
+                    'movimiento': movimiento, 'bodegas': bodegas
                 })
 
         rut = request.POST.get('proveedor')
@@ -542,7 +431,7 @@ def editar_movimiento(request, pk):
             except Exception:
                 messages.error(request, "Fecha de vencimiento inválida.")
                 return render(request, 'inventario/editar_movimiento.html', {
-                    'movimiento': movimiento, 'productos': productos, 'bodegas': bodegas, 'proveedores': proveedores
+                    'movimiento': movimiento, 'bodegas': bodegas
                 })
         else:
             movimiento.fecha_vencimiento = None
@@ -553,7 +442,14 @@ def editar_movimiento(request, pk):
         movimiento.motivo = request.POST.get('motivo') or None
         movimiento.observaciones = request.POST.get('observaciones') or None
 
-        movimiento.save()
+        # Revierte el efecto original sobre el stock y aplica el nuevo
+        try:
+            modificar_movimiento(movimiento)
+        except ValueError as exc:
+            messages.error(request, str(exc))
+            return render(request, 'inventario/editar_movimiento.html', {
+                'movimiento': movimiento, 'bodegas': bodegas
+            })
         # Auditoría editar movimiento
         EventoAuditoria.objects.create(
             usuario=request.user,
@@ -566,9 +462,7 @@ def editar_movimiento(request, pk):
 
     return render(request, 'inventario/editar_movimiento.html', {
         'movimiento': movimiento,
-        'productos': productos,
         'bodegas': bodegas,
-        'proveedores': proveedores,
     })
 
 @require_POST
@@ -577,17 +471,25 @@ def editar_movimiento(request, pk):
 def eliminar_movimiento(request, pk):
     try:
         movimiento = MovimientoInventario.objects.get(pk=pk)
-        movimiento.delete()
+        if movimiento.transferencia_id:
+            # Los dos tramos de cada línea se anulan juntos
+            eliminados = anular_transferencia(movimiento.transferencia_id)
+            detalle = f'Transferencia anulada: {movimiento.transferencia_id} ({eliminados} movimientos)'
+        else:
+            anular_movimiento(movimiento)
+            detalle = f'Movimiento eliminado: {pk}'
         # Auditoría borrar movimiento
         EventoAuditoria.objects.create(
             usuario=request.user,
             accion='BORRAR',
             objeto='Movimiento',
-            detalle=f'Movimiento eliminado: {pk}'
+            detalle=detalle
         )
         return JsonResponse({'ok': True})
     except MovimientoInventario.DoesNotExist:
         return JsonResponse({'ok': False, 'error': 'No encontrado'}, status=404)
+    except ValueError as exc:
+        return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
 
 from django.http import JsonResponse
 from core.models import Producto
@@ -618,6 +520,175 @@ def proveedor_por_producto(request):
             pass
     return JsonResponse({'proveedor': proveedor})
 
+@login_required
+def stock_producto(request):
+    """Stock total y por bodega de un producto (sin recorrer movimientos)"""
+    sku = request.GET.get('producto')
+    producto = Producto.objects.filter(sku=sku).only('id', 'stock_actual').first() if sku else None
+    if not producto:
+        return JsonResponse({'total': 0, 'bodegas': []})
+    return JsonResponse({
+        'total': producto.stock_actual,
+        'bodegas': [
+            {'codigo': s.bodega.codigo, 'nombre': s.bodega.nombre, 'cantidad': s.cantidad}
+            for s in stock_por_bodega(producto)
+        ],
+    })
+
+
+@login_required
+def stock_producto_a_fecha(request):
+    """
+    Stock de un producto en una fecha pasada (snapshot diario + movimientos posteriores).
+    ?producto=SKU&fecha=YYYY-MM-DD (cierre del día) o YYYY-MM-DDTHH:MM [&bodega=CODIGO]
+    """
+    sku = request.GET.get('producto')
+    valor = (request.GET.get('fecha') or '').strip()
+    producto = Producto.objects.filter(sku=sku).only('id').first() if sku else None
+    if not producto:
+        return JsonResponse({'error': 'Producto no encontrado'}, status=404)
+
+    momento = parsear_fecha(valor)
+    if momento is None:
+        try:
+            momento = timezone.make_aware(datetime.strptime(valor, "%Y-%m-%dT%H:%M"))
+        except ValueError:
+            return JsonResponse({'error': 'Fecha inválida'}, status=400)
+
+    bodega = None
+    if request.GET.get('bodega'):
+        bodega = Bodega.objects.filter(codigo=request.GET['bodega']).first()
+        if bodega is None:
+            return JsonResponse({'error': 'Bodega no encontrada'}, status=404)
+
+    saldos = stock_a_fecha(producto, momento, bodega=bodega)
+    bodegas = Bodega.objects.filter(pk__in=saldos).order_by('nombre')
+    return JsonResponse({
+        'fecha': valor,
+        'total': sum(saldos.values()),
+        'bodegas': [
+            {'codigo': b.codigo, 'nombre': b.nombre, 'cantidad': saldos[b.pk]}
+            for b in bodegas
+        ],
+    })
+
+@login_required
+@lector_o_superior
+def kardex_producto(request):
+    """
+    Kardex de un producto con saldo y costo promedio acumulados.
+    ?producto=SKU [&bodega=CODIGO] [&desde=&hasta=] [&page_size=] [&cursor=]
+    """
+    try:
+        page_size = min(max(int(request.GET.get('page_size', 100)), 1), 500)
+    except ValueError:
+        page_size = 100
+
+    kardex = pagina = None
+    error = ''
+    if request.GET.get('producto'):
+        try:
+            kardex = kardex_desde_params(request.GET)
+        except ValueError as exc:
+            error = str(exc)
+        else:
+            pagina = kardex.pagina(page_size)
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    contexto = {
+        'kardex': kardex,
+        'producto': kardex.producto if kardex else None,
+        'lineas': pagina,
+        'error': error,
+        'bodegas': Bodega.objects.filter(activo=True).order_by('nombre'),
+        'sku': request.GET.get('producto', ''),
+        'bodega': request.GET.get('bodega', ''),
+        'desde': request.GET.get('desde', ''),
+        'hasta': request.GET.get('hasta', ''),
+        'page_size': page_size,
+        'base_qs': params.urlencode(),
+    }
+    return render(request, 'inventario/kardex.html', contexto)
+
+
+@login_required
+@lector_o_superior
+def exportar_kardex(request):
+    """Exporta el kardex completo del filtro (?formato=xlsx|csv|jsonl; ?asincrono=1 lo encola)"""
+    try:
+        kardex_desde_params(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=404)
+    return responder_exportacion(request, 'kardex')
+
+@login_required
+@editor_o_admin_required
+def transferencia_bodegas(request):
+    """
+    Transferencia entre bodegas: una línea "SKU cantidad" por producto (cientos
+    de líneas en un mismo documento). Se contabiliza completa o no se contabiliza.
+    """
+    bodegas = Bodega.objects.filter(activo=True)
+    data = {}
+    if request.method == 'POST':
+        data = {
+            'origen': request.POST.get('origen', ''),
+            'destino': request.POST.get('destino', ''),
+            'lineas': request.POST.get('lineas', ''),
+            'documento_numero': request.POST.get('documento_numero', '').strip(),
+            'motivo': request.POST.get('motivo', '').strip(),
+            'clave_idempotencia': _clave_idempotencia(request),
+        }
+        try:
+            origen = Bodega.objects.get(codigo=data['origen'])
+            destino = Bodega.objects.get(codigo=data['destino'])
+            usuario_inventario = Usuario.objects.get(user=request.user)
+            filas = [
+                linea.replace(';', ' ').replace(',', ' ').split()
+                for linea in data['lineas'].splitlines() if linea.strip()
+            ]
+            if any(len(fila) != 2 for fila in filas):
+                raise ValueError('Cada línea debe tener "SKU cantidad"')
+            lineas = lineas_por_sku(filas)
+            transferencia_id, repetida = ejecutar_una_vez(
+                request.user, data['clave_idempotencia'], 'transferencia',
+                lambda: registrar_transferencia(
+                    origen=origen,
+                    destino=destino,
+                    lineas=lineas,
+                    usuario=usuario_inventario,
+                    documento_tipo='TRANSFERENCIA',
+                    documento_numero=data['documento_numero'] or None,
+                    motivo=data['motivo'] or None,
+                ),
+            )
+        except Bodega.DoesNotExist:
+            messages.error(request, 'Selecciona una bodega de origen y una de destino válidas.')
+        except Usuario.DoesNotExist:
+            messages.error(request, 'No se encontró el perfil de usuario.')
+        except ValueError as exc:
+            messages.error(request, str(exc))
+        else:
+            if repetida:
+                messages.info(request, 'La transferencia ya estaba registrada.')
+                return redirect('core:lista_movimientos')
+            EventoAuditoria.objects.create(
+                usuario=request.user,
+                accion='CREAR',
+                objeto='Movimiento',
+                detalle=f'Transferencia {transferencia_id}: {origen.codigo} → {destino.codigo}, {len(filas)} líneas'
+            )
+            messages.success(request, f'✓ Transferencia registrada ({len(filas)} líneas)')
+            return redirect('core:lista_movimientos')
+    else:
+        data['clave_idempotencia'] = uuid.uuid4().hex
+
+    return render(request, 'inventario/transferencia.html', {
+        'bodegas': bodegas,
+        'data': data,
+    })
+
 def proveedores_por_producto(request):
     sku = request.GET.get('producto')
     proveedores = []
@@ -634,34 +705,45 @@ def proveedores_por_producto(request):
             pass
     return JsonResponse({'proveedores': proveedores})
 
+def _limite_sugerencias(request):
+    try:
+        return int(request.GET.get('limite', SUGERENCIAS_LIMITE))
+    except ValueError:
+        return SUGERENCIAS_LIMITE
+
+
+@login_required
+def sugerencias_productos(request):
+    """Typeahead de productos por prefijo de SKU o nombre: ?q= [&despues=último SKU] [&limite=]"""
+    resultados, siguiente = sugerir_productos(
+        request.GET.get('q'), request.GET.get('despues'), _limite_sugerencias(request)
+    )
+    return JsonResponse({'resultados': resultados, 'siguiente': siguiente})
+
+
+@login_required
+def sugerencias_proveedores(request):
+    """Typeahead de proveedores por prefijo de RUT o razón social: ?q= [&despues=último RUT] [&limite=]"""
+    resultados, siguiente = sugerir_proveedores(
+        request.GET.get('q'), request.GET.get('despues'), _limite_sugerencias(request)
+    )
+    return JsonResponse({'resultados': resultados, 'siguiente': siguiente})
+
 @login_required
 @lector_o_superior
 def buscar_movimientos_ajax(request):
-    """Búsqueda en tiempo real vía AJAX con paginación y filtros"""
-    search = request.GET.get('q', '').strip()
-    tipo = request.GET.get('tipo', '').strip()
-    desde = request.GET.get('desde', '').strip()
-    hasta = request.GET.get('hasta', '').strip()
-    page_size = int(request.GET.get('page_size', 5))
-    page_number = int(request.GET.get('page', 1))
-
-    base_qs = MovimientoInventario.objects.select_related('producto', 'bodega', 'proveedor')
-    if search:
-        base_qs = base_qs.filter(
-            models.Q(producto__sku__icontains=search) |
-            models.Q(producto__nombre__icontains=search) |
-            models.Q(proveedor__rut__icontains=search) |
-            models.Q(proveedor__razon_social__icontains=search)
-        )
-    if tipo:
-        base_qs = base_qs.filter(tipo_movimiento=tipo)
-    if desde:
-        base_qs = base_qs.filter(fecha__date__gte=desde)
-    if hasta:
-        base_qs = base_qs.filter(fecha__date__lte=hasta)
+    """
+    Búsqueda en tiempo real vía AJAX con paginación por cursor y filtros.
+    ?cursor= viene de la respuesta anterior; ?total=exacto|estimado|no.
+    """
+    try:
+        page_size = min(max(int(request.GET.get('page_size', 5)), 1), 500)
+    except ValueError:
+        page_size = 5
 
-    paginator = Paginator(base_qs.order_by('-fecha'), page_size)
-    page_obj = paginator.get_page(page_number)
+    consultas = consultas_movimientos(request.GET, campo_busqueda='q')
+    pagina = paginar_por_cursor(consultas, request.GET.get('cursor'), page_size)
+    total, total_estimado = total_de_pagina(consultas, request.GET.get('total', 'estimado'))
 
     resultados = [{
         'id': m.id,
@@ -673,11 +755,13 @@ def buscar_movimientos_ajax(request):
         'tipo': m.tipo_movimiento,
         'cantidad': m.cantidad,
         'usuario': m.usuario.user.username if m.usuario else '',
-    } for m in page_obj.object_list]
+        'archivado': m.archivado,
+    } for m in pagina]
 
     return JsonResponse({
         'movimientos': resultados,
-        'total': paginator.count,
-        'num_pages': paginator.num_pages,
-        'page': page_obj.number,
+        'siguiente': pagina.siguiente,
+        'anterior': pagina.anterior,
+        'total': total,
+        'total_estimado': total_estimado,
     })
@@ -6,15 +6,15 @@ from django.db.models import Q
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from ..decorators import admin_required, editor_o_admin_required, lector_o_superior
 from ..decorators import vendedor_o_admin, admin_required
-from ..models import Producto, Categoria, UnidadMedida
+from ..models import Producto, Categoria, UnidadMedida, Usuario
 from ..models.proveedores import ProveedorProducto
 from ..forms import ProductoPaso1Form, ProductoPaso2Form, ProductoPaso3Form
+from ..services.consultas import filtrar_productos
+from ..services.inventario import registrar_movimiento
+from .exportaciones import responder_exportacion
 from core.models.auditoria import EventoAuditoria
 
 def buscar_productos_ajax(request):
@@ -22,6 +22,7 @@ def buscar_productos_ajax(request):
     q = request.GET.get('q', '').strip()
     categoria = request.GET.get('categoria')
     estado = request.GET.get('estado')
+    clase = (request.GET.get('clase') or '').upper()
     page_size = int(request.GET.get('page_size', 50))
     page = int(request.GET.get('page', 1))
     orden = request.GET.get('orden', 'nombre')
@@ -40,6 +41,8 @@ def buscar_productos_ajax(request):
         productos = productos.filter(alerta_bajo_stock=False)
     elif estado == 'INACTIVO':
         productos = productos.filter(alerta_bajo_stock=True)
+    if clase in ('A', 'B', 'C'):
+        productos = productos.filter(clase_abc=clase)
     if dir == 'desc':
         orden = '-' + orden
     productos = productos.order_by(orden)
@@ -90,6 +93,7 @@ def lista_productos(request):
     buscar = request.GET.get('buscar', '').strip()
     categoria_filtro = request.GET.get('categoria', '').strip()
     estado_filtro = request.GET.get('estado', '').strip()
+    clase_filtro = request.GET.get('clase', '').strip().upper()
 
     # ========================================
     # 2. PAGINADOR CONFIGURABLE
@@ -116,66 +120,10 @@ def lista_productos(request):
     if direccion not in ['asc', 'desc']:
         direccion = 'asc'
     
-    # Prefijo para ordenamiento descendente
-    dir_prefix = '' if direccion == 'asc' else '-'
-    
-    # Mapeo de campos para ordenamiento
-    orden_map = {
-        'sku': 'sku',
-        'nombre': 'nombre',
-        'categoria': 'categoria__nombre',
-        'stock': 'stock_actual',
-        'precio': 'precio_venta',
-        'estado': 'alerta_bajo_stock',
-    }
-    
-    # Campo de ordenamiento (default: nombre)
-    orden_field = orden_map.get(orden, 'nombre')
-
-    # ========================================
-    # 4. QUERY BASE
-    # ========================================
-    productos = Producto.objects.select_related(
-        'categoria', 'uom_compra', 'uom_venta'
-    ).filter(activo=True)
-
-    # ========================================
-    # 5. APLICAR FILTROS DE BÚSQUEDA
-    # ========================================
-    if buscar:
-        precio_q = Q()
-        try:
-            valor = Decimal(buscar.replace('$', '').replace(',', '.'))
-            precio_q = Q(precio_venta=valor)
-        except (InvalidOperation, AttributeError):
-            pass
-
-        productos = productos.filter(
-            Q(sku__icontains=buscar) |
-            Q(nombre__icontains=buscar) |
-            Q(descripcion__icontains=buscar) |
-            Q(categoria__nombre__icontains=buscar) |
-            Q(marca__icontains=buscar) |
-            Q(modelo__icontains=buscar) |
-            precio_q
-        )
-    
-    if categoria_filtro:
-        productos = productos.filter(categoria_id=categoria_filtro)
-    
-    if estado_filtro:
-        if estado_filtro == 'ACTIVO':
-            productos = productos.filter(alerta_bajo_stock=False)
-        elif estado_filtro == 'INACTIVO':
-            productos = productos.filter(alerta_bajo_stock=True)
-
     # ========================================
-    # 6. APLICAR ORDENAMIENTO
+    # 4-6. QUERY, FILTROS Y ORDEN (compartidos con la exportación)
     # ========================================
-    productos = productos.order_by(
-        f'{dir_prefix}{orden_field}',
-        'nombre'  # Ordenamiento secundario
-    )
+    productos = filtrar_productos(request.GET)
 
     # ========================================
     # 7. PAGINACIÓN
@@ -227,6 +175,8 @@ def lista_productos(request):
         'buscar': buscar,
         'categoria_filtro': categoria_filtro,
         'estado_filtro': estado_filtro,
+        'clase_filtro': clase_filtro,
+        'clase_abc_choices': Producto.CLASE_ABC_CHOICES,
         'categorias': categorias,
         
         # Ordenamiento
@@ -329,11 +279,24 @@ def producto_paso2(request):
         messages.error(request, 'Debes completar el Paso 1 primero.')
         return redirect('core:producto_paso1')
 
+    modo = request.session.get('producto_modo', 'create')
+    # El stock inicial entra como ingreso, y solo mientras el producto no tenga movimientos
+    con_stock_inicial = modo != 'edit' and not producto.movimientos.exists()
+
     if request.method == 'POST':
-        form = ProductoPaso2Form(request.POST, instance=producto)
+        form = ProductoPaso2Form(request.POST, instance=producto, con_stock_inicial=con_stock_inicial)
         if form.is_valid():
             form.save()
-            modo = request.session.get('producto_modo', 'create')
+            cantidad = form.cleaned_data.get('stock_inicial')
+            if cantidad:
+                registrar_movimiento(
+                    tipo_movimiento='ingreso',
+                    producto=producto,
+                    bodega=form.cleaned_data['bodega_inicial'],
+                    cantidad=cantidad,
+                    usuario=Usuario.objects.get(user=request.user),
+                    observaciones='Stock inicial',
+                )
 
             if modo == 'edit':
                 messages.success(request, '✓ Parámetros de stock actualizados correctamente.')
@@ -345,7 +308,7 @@ def producto_paso2(request):
             return redirect('core:producto_paso3')
         messages.error(request, '⚠️ Por favor corrige los errores del formulario.')
     else:
-        form = ProductoPaso2Form(instance=producto)
+        form = ProductoPaso2Form(instance=producto, con_stock_inicial=con_stock_inicial)
 
     return render(request, 'productos/producto_paso2.html', {'form': form, 'producto': producto})
 
@@ -372,11 +335,8 @@ def producto_paso3(request):
     # --- Cálculo de campos derivados ---
     stock_actual = producto.stock_actual
     alerta_bajo_stock = "SI" if stock_actual < producto.stock_minimo else "NO"
-    alerta_por_vencer = "NO"
-    if getattr(producto, 'es_perecedero', False) and getattr(producto, 'fecha_vencimiento', None):
-        dias_restantes = (producto.fecha_vencimiento - datetime.now().date()).days
-        if dias_restantes <= 7:
-            alerta_por_vencer = "SI"
+    # Calculada por el comando alertas_vencimiento a partir de lotes e ingresos
+    alerta_por_vencer = "SI" if producto.alerta_por_vencer else "NO"
 
     if request.method == 'POST':
         form = ProductoPaso3Form(request.POST)
@@ -489,127 +449,5 @@ def eliminar_producto(request, pk):
 
 @vendedor_o_admin
 def exportar_productos_excel(request):
-    """Exportar productos a Excel con formato profesional"""
-    
-    # Aplicar los mismos filtros que en la lista
-    buscar = request.GET.get('buscar', '').strip()
-    categoria_filtro = request.GET.get('categoria', '')
-    estado_filtro = request.GET.get('estado', '')
-    orden = request.GET.get('orden', 'nombre')
-    
-    productos = Producto.objects.select_related('categoria').filter(activo=True)
-    
-    # Aplicar filtros
-    if buscar:
-        productos = productos.filter(
-            Q(sku__icontains=buscar) |
-            Q(nombre__icontains=buscar) |
-            Q(categoria__nombre__icontains=buscar)
-        )
-    
-    if categoria_filtro:
-        productos = productos.filter(categoria_id=categoria_filtro)
-    
-    if estado_filtro == 'ACTIVO':
-        productos = productos.filter(alerta_bajo_stock=False)
-    elif estado_filtro == 'INACTIVO':
-        productos = productos.filter(alerta_bajo_stock=True)
-    
-    # Ordenar
-    orden_map = {
-        'nombre': 'nombre',
-        '-nombre': '-nombre',
-        'sku': 'sku',
-        '-sku': '-sku',
-        'precio': 'precio_venta',
-        '-precio': '-precio_venta',
-        'stock': 'stock_actual',
-        '-stock': '-stock_actual',
-    }
-    productos = productos.order_by(orden_map.get(orden, 'nombre'))
-    
-    # Crear workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Productos"
-    
-    # Título principal
-    ws.merge_cells('A1:H1')
-    titulo = ws['A1']
-    titulo.value = 'REPORTE DE PRODUCTOS - DULCERÍA LILIS'
-    titulo.font = Font(size=16, bold=True, color='FFFFFF')
-    titulo.fill = PatternFill(start_color='FF0000', end_color='FF0000', fill_type='solid')
-    titulo.alignment = Alignment(horizontal='center', vertical='center')
-    ws.row_dimensions[1].height = 30
-    
-    # Fecha y hora
-    ws.merge_cells('A2:H2')
-    fecha = ws['A2']
-    fecha.value = f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}'
-    fecha.font = Font(size=10, italic=True)
-    fecha.alignment = Alignment(horizontal='center')
-    
-    # Espacio
-    ws.append([])
-    
-    # Encabezados
-    headers = ['SKU', 'Nombre', 'Categoría', 'Stock Actual', 'Stock Mínimo', 
-               'Precio Venta', 'Estado Stock', 'Marca']
-    ws.append(headers)
-    
-    # Estilo de encabezados
-    header_fill = PatternFill(start_color='FF0000', end_color='FF0000', fill_type='solid')
-    header_font = Font(bold=True, color='FFFFFF', size=11)
-    
-    for cell in ws[4]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Datos
-    for p in productos:
-        estado = '⚠️ Stock Bajo' if p.alerta_bajo_stock else '✅ Stock OK'
-        ws.append([
-            p.sku,
-            p.nombre,
-            p.categoria.nombre if p.categoria else 'Sin categoría',
-            float(p.stock_actual),
-            float(p.stock_minimo),
-            float(p.precio_venta),
-            estado,
-            p.marca or 'N/A'
-        ])
-    
-    # Ajustar anchos de columna
-    column_widths = {
-        'A': 15, 'B': 35, 'C': 20, 'D': 15, 
-        'E': 15, 'F': 15, 'G': 18, 'H': 15
-    }
-    
-    for col, width in column_widths.items():
-        ws.column_dimensions[col].width = width
-    
-    # Formato de celdas de datos
-    for row in ws.iter_rows(min_row=5, max_row=ws.max_row):
-        for cell in row:
-            cell.alignment = Alignment(horizontal='left', vertical='center')
-            if cell.column in [4, 5, 6]:  # Columnas numéricas
-                cell.alignment = Alignment(horizontal='right', vertical='center')
-    
-    # Agregar totales
-    ws.append([])
-    total_row = ws.max_row + 1
-    ws[f'A{total_row}'] = 'TOTAL DE PRODUCTOS:'
-    ws[f'A{total_row}'].font = Font(bold=True, size=11)
-    ws[f'D{total_row}'] = productos.count()
-    ws[f'D{total_row}'].font = Font(bold=True, size=11)
-    
-    # Preparar respuesta
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    filename = f'productos_dulceria_lilis_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    
-    wb.save(response)
-    return response
\ No newline at end of file
+    """Exportar productos con los filtros de la lista (?formato=xlsx|csv|jsonl; ?asincrono=1 la encola)"""
+    return responder_exportacion(request, 'productos')
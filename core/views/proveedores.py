@@ -5,9 +5,6 @@ from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_http_methods
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from datetime import datetime
 from django.utils.http import urlencode
 from django.db import transaction
 from ..decorators import admin_required, editor_o_admin_required, lector_o_superior
@@ -19,6 +16,8 @@ from ..forms.proveedores import (
     ProveedorProductoFormSet,
 )
 from ..models.proveedores import Proveedor, ProveedorProducto
+from ..services.consultas import filtrar_proveedores
+from .exportaciones import responder_exportacion
 from ..decorators import admin_required
 
 
@@ -42,37 +41,8 @@ def lista_proveedores(request):
 
     orden = (request.GET.get('orden') or 'nombre').lower()
     direccion = (request.GET.get('dir') or 'asc').lower()
-    dir_prefix = '' if direccion == 'asc' else '-'
-    orden_map = {
-        'nombre': 'nombre_fantasia',
-        'razon': 'razon_social',
-        'rut': 'rut',
-        'email': 'email',
-        'telefono': 'telefono',
-        'estado': 'estado',
-        'creado': 'created_at',
-    }
-    orden_field = orden_map.get(orden, 'nombre_fantasia')
-
-    proveedores = Proveedor.objects.all().annotate(total_productos=Count('productos', distinct=True))
-
-    if buscar:
-        proveedores = proveedores.filter(
-            Q(nombre_fantasia__icontains=buscar) |
-            Q(razon_social__icontains=buscar) |
-            Q(rut__icontains=buscar) |
-            Q(email__icontains=buscar) |
-            Q(telefono__icontains=buscar) |
-            Q(direccion__icontains=buscar)
-        )
-
-    if estado_filtro in dict(Proveedor.ESTADO_CHOICES):
-        proveedores = proveedores.filter(estado=estado_filtro)
 
-    if orden_field == 'nombre_fantasia':
-        proveedores = proveedores.order_by(f'{dir_prefix}nombre_fantasia', f'{dir_prefix}razon_social')
-    else:
-        proveedores = proveedores.order_by(f'{dir_prefix}{orden_field}', 'razon_social')
+    proveedores = filtrar_proveedores(request.GET)
 
     paginator = Paginator(proveedores, page_size)
     page_number = request.GET.get('page', 1)
@@ -103,156 +73,11 @@ def lista_proveedores(request):
     return render(request, 'proveedores/lista_proveedores.html', context)
 
 
-from io import BytesIO
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from django.db.models import Q, Count
-from datetime import datetime
-from django.http import HttpResponse
-
 @login_required
 @admin_required
 def exportar_proveedores_excel(request):
-    # ====== Query base + filtros iguales a la lista ======
-    buscar = (request.GET.get('buscar') or request.GET.get('q') or '').strip()
-    estado_filtro = (request.GET.get('estado') or '').strip().upper()
-    orden = (request.GET.get('orden') or 'nombre').lower()
-    direccion = (request.GET.get('dir') or 'asc').lower()
-    dir_prefix = '' if direccion == 'asc' else '-'
-
-    orden_map = {
-        'nombre': 'nombre_fantasia',
-        'razon': 'razon_social',
-        'rut': 'rut',
-        'email': 'email',
-        'telefono': 'telefono',
-        'estado': 'estado',
-        'creado': 'created_at',
-    }
-    orden_field = orden_map.get(orden, 'nombre_fantasia')
-
-    qs = (
-        Proveedor.objects
-        .all()
-        .annotate(total_productos=Count('productos', distinct=True))
-    )
-
-    if buscar:
-        qs = qs.filter(
-            Q(nombre_fantasia__icontains=buscar) |
-            Q(razon_social__icontains=buscar) |
-            Q(rut__icontains=buscar) |
-            Q(email__icontains=buscar) |
-            Q(telefono__icontains=buscar) |
-            Q(direccion__icontains=buscar)
-        )
-
-    if estado_filtro in dict(Proveedor.ESTADO_CHOICES):
-        qs = qs.filter(estado=estado_filtro)
-
-    if orden_field == 'nombre_fantasia':
-        qs = qs.order_by(f'{dir_prefix}nombre_fantasia', f'{dir_prefix}razon_social')
-    else:
-        qs = qs.order_by(f'{dir_prefix}{orden_field}', 'razon_social')
-
-    # ====== Excel con formato ======
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Proveedores"
-
-    # Paleta/estilos
-    red_dark = PatternFill("solid", fgColor="B91C1C")
-    red_header = PatternFill("solid", fgColor="DC2626")
-    title_font = Font(color="FFFFFF", bold=True, size=16)
-    th_font = Font(color="FFFFFF", bold=True, size=11)
-    subtitle_font = Font(italic=True, size=11)
-    bold = Font(bold=True)
-    center = Alignment(horizontal="center", vertical="center")
-    left = Alignment(horizontal="left", vertical="center")
-    thin = Side(border_style="thin", color="CCCCCC")
-    border = Border(top=thin, left=thin, right=thin, bottom=thin)
-    zebra = PatternFill("solid", fgColor="FFF5F5")
-
-    headers = [
-        "ID", "Nombre (fantasía / razón social)", "RUT",
-        "Email", "Teléfono", "Dirección",
-        "Estado", "Productos", "Creado"
-    ]
-    col_widths = [8, 46, 16, 30, 16, 34, 12, 12, 18]
-    total_cols = len(headers)
-
-    # Título
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=total_cols)
-    ws["A1"].value = "REPORTE DE PROVEEDORES - DULCERÍA LILIS"
-    ws["A1"].fill = red_dark
-    ws["A1"].font = title_font
-    ws["A1"].alignment = center
-
-    # Subtítulo (fecha)
-    ws.merge_cells(start_row=2, start_column=1, end_row=2, end_column=total_cols)
-    ws["A2"].value = f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
-    ws["A2"].font = subtitle_font
-    ws["A2"].alignment = center
-
-    # Encabezados
-    r = 4
-    for i, (h, w) in enumerate(zip(headers, col_widths), start=1):
-        cell = ws.cell(row=r, column=i, value=h)
-        cell.fill = red_header
-        cell.font = th_font
-        cell.alignment = center
-        ws.column_dimensions[get_column_letter(i)].width = w
-    ws.row_dimensions[r].height = 22
-    r += 1
-    start_data = r
-
-    # Datos
-    for idx, p in enumerate(qs, start=1):
-        nombre = p.nombre_display  # asumes propiedad en tu modelo
-        row = [
-            p.id,
-            nombre,
-            p.rut,
-            p.email or "",
-            p.telefono or "",
-            p.direccion or "",
-            p.get_estado_display(),
-            getattr(p, "total_productos", 0),
-            p.created_at.strftime("%Y-%m-%d %H:%M") if getattr(p, "created_at", None) else "",
-        ]
-        for col, val in enumerate(row, start=1):
-            cell = ws.cell(row=r, column=col, value=val)
-            cell.border = border
-            cell.alignment = left if col in (2, 4, 5, 6) else center
-        # Zebra
-        if idx % 2 == 0:
-            for col in range(1, total_cols + 1):
-                ws.cell(row=r, column=col).fill = zebra
-        r += 1
-
-    # Total al final
-    ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=total_cols-1)
-    ws.cell(row=r, column=1, value="TOTAL DE PROVEEDORES:").font = bold
-    ws.cell(row=r, column=total_cols, value=qs.count()).font = bold
-    for col in range(1, total_cols + 1):
-        ws.cell(row=r, column=col).border = border
-
-    # Mejoras de usabilidad
-    ws.auto_filter.ref = f"A4:{get_column_letter(total_cols)}{r}"
-    ws.freeze_panes = "A5"
-
-    # Respuesta HTTP
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    filename = f"proveedores_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    resp = HttpResponse(
-        out.getvalue(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return resp
+    """Exporta proveedores con los filtros de la lista (?formato=xlsx|csv|jsonl; ?asincrono=1 la encola)"""
+    return responder_exportacion(request, 'proveedores')
 
 
 
@@ -161,6 +161,9 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Movimientos más antiguos que este horizonte (días) pasan al archivo (archivar_movimientos)
+ARCHIVO_MOVIMIENTOS_DIAS = config('ARCHIVO_MOVIMIENTOS_DIAS', cast=int, default=365)
+
 # Login URL
 LOGIN_URL = 'core:login'
 LOGIN_REDIRECT_URL = 'core:dashboard'